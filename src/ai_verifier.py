@@ -1,17 +1,277 @@
+import hashlib
+import json
+import math
 import os
-import openai
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from state_store import atomic_write_json
+
+try:
+    import openai
+except ImportError:
+    openai = None
+
+AI_CACHE_PATH = os.path.join(os.path.dirname(__file__), "data", "ai_cache.json")
+AI_MODEL = "gpt-3.5-turbo"
+AI_CACHE_TTL = 900  # 같은 프롬프트/시장 상황 응답 재사용 시간(초), 종목별로 다르게 주려면 dict
+AI_STALE_KEEP = 86400  # 만료된 응답도 이 시간(초)까지는 시간 초과 시 대체 판단용으로 보관
+AI_MAX_CONCURRENCY = 4  # verify_many 동시 LLM 호출 수
+AI_DEADLINE = 10.0  # verify_many 전체 대기 시간(초), 넘으면 이전 판단 사용
+AI_CALL_TIMEOUT = 30.0  # LLM 요청 1건 HTTP 타임아웃(초)
+
+# AI_VERIFIER_STUB=1 이면 OpenAI 대신 StubLLM 사용 (오프라인 실행/테스트)
+USE_STUB = os.getenv("AI_VERIFIER_STUB", "0") == "1"
+
+
+def is_positive_answer(answer):
+    # 간단한 긍정 판별 예시
+    return ("매수" in answer) or ("긍정" in answer)
+
+
+def price_bucket(price, step=0.02):
+    # 가격을 step(비율) 간격 구간 번호로 (구간이 바뀔 만큼 움직여야 캐시 키가 바뀜)
+    if not price or price <= 0:
+        return None
+    return int(math.floor(math.log(price) / math.log1p(step)))
+
+
+def context_fingerprint(context):
+    # 시장 상황(dict 등)을 캐시 키용 짧은 해시로, 값은 호출하는 쪽에서 구간화해서 넘김
+    if context is None:
+        return ""
+    raw = json.dumps(context, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode()).hexdigest()[:12]
+
+
+class StubLLM:
+    """
+    오프라인용 가짜 LLM (prompt → 답변)
+    - answers: {프롬프트에 포함된 문자열: 답변}, 없으면 default
+    - delay: 응답 지연(초), calls: 호출 횟수
+    """
+    def __init__(self, answers=None, default="매수 신호 긍정적입니다.", delay=0.0):
+        self.answers = answers or {}
+        self.default = default
+        self.delay = delay
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, prompt):
+        with self.lock:
+            self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        for key, answer in self.answers.items():
+            if key in prompt:
+                return answer
+        return self.default
+
 
 class AIVerifier:
-    def __init__(self, openai_api_key):
+    """
+    LLM 매수 검증 (응답 캐시)
+    - 캐시 키: 모델 + 프롬프트 + 시장 상황 지문(context), 종목별 TTL 안에서는 LLM 을 다시 부르지 않음
+    - 캐시는 AI_CACHE_PATH 에도 저장해 재시작 후에도 유지 (cache_path=None 이면 메모리만)
+    - OpenAI 클라이언트는 처음 한 번만 만들어 재사용, llm(prompt → 답변)을 넘기면 그걸 사용
+    - verify_many(): 여러 종목 동시 검증 (동시 호출 수 제한, 시간 초과 시 마지막 판단으로 대체)
+    - stats(): hits / misses / hit_rate / LLM 호출 시간 / 시간 초과
+    """
+    def __init__(self, openai_api_key, model=AI_MODEL, ttl=AI_CACHE_TTL, cache_path=AI_CACHE_PATH, llm=None,
+                 max_concurrency=AI_MAX_CONCURRENCY):
         self.api_key = openai_api_key
+        self.model = model
+        self.ttl = ttl
+        self.cache_path = cache_path
+        self.llm = llm or (StubLLM() if USE_STUB else None)
+        self.client = None
+        self.lock = threading.RLock()
+        self.cache = self._load_cache()
+        self.max_concurrency = max_concurrency
+        self.executor = None
+        self.inflight = {}  # 캐시 키 → 진행 중인 Future (시간 초과된 호출은 다음 루프에 이어서 사용)
+        # 통계
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.fallbacks = 0
+        self.llm_time = 0.0
+
+    def _load_cache(self):
+        if not self.cache_path:
+            return {}
+        try:
+            with open(self.cache_path) as f:
+                cache = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print(f"[AI] 캐시 읽기 실패, 새로 시작: {e}")
+            return {}
+        now = time.time()
+        return {k: v for k, v in cache.items() if v.get("expires", 0) + AI_STALE_KEEP > now}
+
+    def _save_cache(self):
+        if not self.cache_path:
+            return
+        os.makedirs(os.path.dirname(self.cache_path) or '.', exist_ok=True)
+        atomic_write_json(self.cache_path, self.cache)
+
+    def ttl_for(self, market):
+        if isinstance(self.ttl, dict):
+            return self.ttl.get(market, self.ttl.get("default", AI_CACHE_TTL))
+        return self.ttl
 
-    def llm_check(self, prompt):
-        client = openai.OpenAI(api_key=self.api_key)
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
+    def cache_key(self, prompt, context=None):
+        raw = f"{self.model}\n{prompt}\n{context_fingerprint(context)}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def prompt_key(self, prompt):
+        return hashlib.sha256(f"{self.model}\n{prompt}".encode()).hexdigest()[:16]
+
+    def _ask(self, prompt):
+        if self.llm is not None:
+            return self.llm(prompt)
+        if self.client is None:
+            if openai is None:
+                raise RuntimeError("openai 패키지가 없습니다. (pip install openai 또는 AI_VERIFIER_STUB=1)")
+            self.client = openai.OpenAI(api_key=self.api_key, timeout=AI_CALL_TIMEOUT, max_retries=1)
+        response = self.client.chat.completions.create(
+            model=self.model,
             messages=[{"role": "user", "content": prompt}]
         )
-        answer = response.choices[0].message.content
-        # 간단한 긍정 판별 예시
-        is_positive = ("매수" in answer) or ("긍정" in answer)
-        return is_positive, answer
\ No newline at end of file
+        return response.choices[0].message.content
+
+    def cached(self, prompt, market=None, context=None):
+        # 유효한 캐시 응답 (is_positive, answer), 없으면 None (LLM 호출 안 함)
+        with self.lock:
+            entry = self.cache.get(self.cache_key(prompt, context))
+            if entry and entry["expires"] > time.time():
+                return entry["positive"], entry["answer"]
+        return None
+
+    def last_verdict(self, prompt, market=None):
+        # 같은 종목/프롬프트의 가장 최근 응답 (만료/다른 시장 상황 포함), 없으면 None
+        pkey = self.prompt_key(prompt)
+        with self.lock:
+            entries = [v for v in self.cache.values() if v.get("prompt") == pkey and v.get("market") == market]
+        if not entries:
+            return None
+        latest = max(entries, key=lambda v: v["created"])
+        return latest["positive"], latest["answer"]
+
+    def llm_check(self, prompt, market=None, context=None):
+        """
+        (is_positive, answer) 반환
+        - market: 종목별 TTL 적용용, context: 시장 상황 (값이 바뀌면 캐시를 쓰지 않고 다시 질문)
+        """
+        key = self.cache_key(prompt, context)
+        with self.lock:
+            entry = self.cache.get(key)
+            if entry and entry["expires"] > time.time():
+                self.hits += 1
+                return entry["positive"], entry["answer"]
+            self.misses += 1
+        started = time.perf_counter()
+        try:
+            answer = self._ask(prompt)
+        except Exception:
+            with self.lock:
+                self.errors += 1
+            raise
+        is_positive = is_positive_answer(answer)
+        with self.lock:
+            self.llm_time += time.perf_counter() - started
+            now = time.time()
+            self.cache[key] = {
+                "market": market,
+                "prompt": self.prompt_key(prompt),
+                "answer": answer,
+                "positive": is_positive,
+                "created": now,
+                "expires": now + self.ttl_for(market),
+            }
+            # 대체 판단 보관 기간도 지난 항목 정리 후 저장
+            self.cache = {k: v for k, v in self.cache.items() if v["expires"] + AI_STALE_KEEP > now}
+            self._save_cache()
+        return is_positive, answer
+
+    def verify_many(self, requests, deadline=AI_DEADLINE, on_wait=None, poll=1.0):
+        """
+        여러 종목 동시 검증, 최대 deadline 초만 대기
+        - requests: {market: (prompt, context)}
+        - on_wait: 기다리는 동안 poll 초마다 호출할 함수 (예: 손절/익절 점검)
+        - 캐시 응답은 바로 사용, 나머지는 최대 max_concurrency 개씩 동시에 LLM 호출
+        - 시간 안에 못 받거나 오류면 마지막 판단(last_verdict), 그것도 없으면 (False, 사유)
+        - 시간 초과된 호출은 백그라운드에서 계속 진행되어 끝나면 캐시에 저장 (다음 호출에서 중복 요청 안 함)
+        반환: {market: (is_positive, answer)}
+        """
+        results = {}
+        pending = {}
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="ai-verify")
+            for market, (prompt, context) in requests.items():
+                key = self.cache_key(prompt, context)
+                entry = self.cache.get(key)
+                if entry and entry["expires"] > time.time():
+                    self.hits += 1
+                    results[market] = entry["positive"], entry["answer"]
+                    continue
+                future = self.inflight.get(key)
+                if future is None:
+                    future = self.executor.submit(self.llm_check, prompt, market, context)
+                    self.inflight[key] = future
+                    future.add_done_callback(lambda f, key=key: self._done(key, f))
+                pending[market] = future
+        until = time.monotonic() + deadline
+        while pending:
+            remaining = until - time.monotonic()
+            if remaining <= 0:
+                break
+            done, not_done = wait(pending.values(), timeout=min(poll, remaining) if on_wait else remaining)
+            if not not_done:
+                break
+            if on_wait:
+                on_wait()
+        for market, future in pending.items():
+            prompt, _ = requests[market]
+            if future.done() and future.exception() is None:
+                results[market] = future.result()
+                continue
+            with self.lock:
+                if future.done():
+                    print(f"[AI] {market} 검증 오류: {future.exception()}")
+                else:
+                    self.timeouts += 1
+                    print(f"[AI] {market} 응답 {deadline:g}초 초과")
+                self.fallbacks += 1
+            last = self.last_verdict(prompt, market)
+            results[market] = last if last is not None else (False, "AI 검증 응답 없음")
+        return results
+
+    def _done(self, key, future):
+        with self.lock:
+            if self.inflight.get(key) is future:
+                del self.inflight[key]
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def stats(self):
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "errors": self.errors,
+                "timeouts": self.timeouts,
+                "fallbacks": self.fallbacks,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+                "cached": len(self.cache),
+                "llm_time": round(self.llm_time, 3),
+            }
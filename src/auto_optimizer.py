@@ -1,28 +1,168 @@
-from backtest.simulator import BacktestSimulator
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
 
-def auto_optimize(strategy_fn, data_dict, rebalance_dates, param_grid):
+import numpy as np
+import pandas as pd
+
+from backtest.simulator import BacktestSimulator, MarketArrays
+from backtest.features import FeaturePanel, bind_features
+
+
+def prepare_strategy(strategy_fn, data_dict):
+    # 피처를 선언한 전략(@uses_features)이면 피처 패널을 한 번 계산해 연결
+    if hasattr(strategy_fn, 'features'):
+        return bind_features(strategy_fn, FeaturePanel(data_dict, strategy_fn.features))
+    return strategy_fn
+
+
+def evaluate_params(strategy_fn, data_dict, rebalance_dates, params, arrays):
+    # 파라미터 1개 조합 백테스트 → (수익률, 기록), strategy_fn 은 prepare_strategy 를 거친 함수
+    sim = BacktestSimulator(
+        initial_balance=1000000,
+        max_coin_ratio=params.get('max_coin_ratio', 0.2)
+    )
+    test_dates = rebalance_dates[::params.get('rebalance_period', 30)]
+    history = sim.run(
+        lambda date, pos, bal, data: strategy_fn(date, pos, bal, data, params),
+        data_dict,
+        test_dates,
+        arrays=arrays
+    )
+    start = history[0]['total_value']
+    end = history[-1]['total_value']
+    return (end - start) / start, history
+
+
+class SharedMarketData:
+    """
+    data_dict(종목별 DataFrame)를 공유 메모리 1개 블록에 올려 워커 프로세스와 공유
+    - 워커에는 작은 설명자(descriptor)만 전달되고, 각 워커는 블록을 복사 없이 DataFrame 으로 봄
+    - 숫자 컬럼만 공유 (인덱스는 datetime64[ns])
+    """
+    def __init__(self, data_dict):
+        layout = []
+        offset = 0
+        for market, df in data_dict.items():
+            columns = [c for c in df.columns if pd.api.types.is_numeric_dtype(df[c])]
+            n = len(df)
+            layout.append((market, columns, offset, n))
+            offset += n * (len(columns) + 1)
+        self.shm = shared_memory.SharedMemory(create=True, size=max(offset, 1) * 8)
+        buf = np.ndarray((offset,), dtype=np.float64, buffer=self.shm.buf)
+        for (market, columns, start, n), df in zip(layout, data_dict.values()):
+            buf[start:start + n].view(np.int64)[:] = df.index.values.astype('datetime64[ns]').view(np.int64)
+            block = buf[start + n:start + n * (len(columns) + 1)].reshape(len(columns), n)
+            for k, col in enumerate(columns):
+                block[k] = df[col].to_numpy(dtype=float)
+        self.descriptor = (self.shm.name, offset, layout)
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+def attach_shared_data(descriptor):
+    # 워커에서 공유 메모리 블록을 DataFrame dict 로 복원 (값 복사 없음)
+    name, size, layout = descriptor
+    # 풀 워커는 부모와 같은 resource_tracker 를 쓰므로 블록 해제는 부모의 close() 가 담당
+    shm = shared_memory.SharedMemory(name=name)
+    buf = np.ndarray((size,), dtype=np.float64, buffer=shm.buf)
+    data_dict = {}
+    for market, columns, start, n in layout:
+        index = pd.DatetimeIndex(buf[start:start + n].view('datetime64[ns]'), name='date')
+        block = buf[start + n:start + n * (len(columns) + 1)].reshape(len(columns), n)
+        data_dict[market] = pd.DataFrame(block.T, index=index, columns=columns, copy=False)
+    return shm, data_dict
+
+
+# 워커 프로세스 전역 상태 (initializer 에서 한 번만 설정)
+_worker = {}
+
+
+def _init_worker(descriptor, strategy_fn, rebalance_dates):
+    shm, data_dict = attach_shared_data(descriptor)
+    _worker['shm'] = shm
+    _worker['data_dict'] = data_dict
+    _worker['strategy_fn'] = prepare_strategy(strategy_fn, data_dict)
+    _worker['rebalance_dates'] = rebalance_dates
+    _worker['arrays'] = MarketArrays(data_dict, rebalance_dates)
+
+
+def _run_worker(i, params, lo=0, hi=None):
+    ret, _ = evaluate_params(_worker['strategy_fn'], _worker['data_dict'], _worker['rebalance_dates'][lo:hi],
+                             params, _worker['arrays'])
+    return i, ret
+
+
+def evaluate_tasks_parallel(strategy_fn, data_dict, rebalance_dates, tasks, workers=None, progress=None):
+    """
+    (파라미터, 시작, 끝) 작업을 프로세스 풀에서 병렬 평가
+    - 각 작업은 rebalance_dates[시작:끝] 구간 백테스트 (끝이 None 이면 마지막까지)
+    - data_dict 는 공유 메모리로 한 번만 올리고 워커는 설명자만 받음
+    - strategy_fn 은 모듈 최상위 함수여야 함 (pickle 가능)
+    - progress(done, total) 콜백으로 진행 상황 보고
+    반환: tasks 순서와 같은 수익률 리스트
+    """
+    workers = workers or os.cpu_count()
+    shared = SharedMarketData(data_dict)
+    results = [None] * len(tasks)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(shared.descriptor, strategy_fn, list(rebalance_dates))) as executor:
+            futures = [executor.submit(_run_worker, i, params, lo, hi) for i, (params, lo, hi) in enumerate(tasks)]
+            for done, future in enumerate(as_completed(futures), 1):
+                i, ret = future.result()
+                results[i] = ret
+                if progress:
+                    progress(done, len(tasks))
+    finally:
+        shared.close()
+    return results
+
+
+def evaluate_grid_parallel(strategy_fn, data_dict, rebalance_dates, param_grid, workers=None, progress=None):
+    # 파라미터 조합을 전체 기간으로 병렬 평가, param_grid 순서와 같은 수익률 리스트 반환
+    tasks = [(params, 0, None) for params in param_grid]
+    return evaluate_tasks_parallel(strategy_fn, data_dict, rebalance_dates, tasks, workers, progress)
+
+
+def print_progress(done, total):
+    step = max(1, total // 20)
+    if done % step == 0 or done == total:
+        print(f"[최적화] {done}/{total} 완료 ({done / total:.0%})")
+
+
+def auto_optimize(strategy_fn, data_dict, rebalance_dates, param_grid, workers=1, progress=print_progress):
+    """
+    파라미터 조합별 백테스트 후 최고 수익률 조합 선택
+    - workers > 1 이면 프로세스 풀 병렬 평가 (결과/선택 순서는 순차 실행과 동일)
+    """
+    # 시세 배열/피처는 한 번만 계산해 모든 파라미터 조합에서 재사용
+    arrays = MarketArrays(data_dict, rebalance_dates)
+    prepared = prepare_strategy(strategy_fn, data_dict)
     best_ret = -float('inf')
     best_param = None
     best_history = None
 
-    for params in param_grid:
-        sim = BacktestSimulator(
-            initial_balance=1000000,
-            max_coin_ratio=params.get('max_coin_ratio', 0.2)
-        )
-        test_dates = rebalance_dates[::params.get('rebalance_period', 30)]
-        history = sim.run(
-            lambda date, pos, bal, data: strategy_fn(date, pos, bal, data, params),
-            data_dict,
-            test_dates
-        )
-        start = history[0]['total_value']
-        end = history[-1]['total_value']
-        ret = (end - start) / start
-        if ret > best_ret:
-            best_ret = ret
-            best_param = params
-            best_history = history
+    if workers > 1 and len(param_grid) > 1:
+        rets = evaluate_grid_parallel(strategy_fn, data_dict, rebalance_dates, param_grid, workers, progress)
+        for params, ret in zip(param_grid, rets):
+            if ret > best_ret:
+                best_ret = ret
+                best_param = params
+        # 최적 조합의 기록만 다시 계산 (결과는 결정적)
+        if best_param is not None:
+            _, best_history = evaluate_params(prepared, data_dict, rebalance_dates, best_param, arrays)
+    else:
+        for done, params in enumerate(param_grid, 1):
+            ret, history = evaluate_params(prepared, data_dict, rebalance_dates, params, arrays)
+            if ret > best_ret:
+                best_ret = ret
+                best_param = params
+                best_history = history
+            if progress:
+                progress(done, len(param_grid))
 
     print(f"최적 파라미터: {best_param}, 예상 수익률: {best_ret:.2%}")
-    return best_param, best_history
\ No newline at end of file
+    return best_param, best_history
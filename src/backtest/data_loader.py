@@ -1,25 +1,200 @@
-import pandas as pd
+import json
 import os
+import shutil
+import uuid
+
+import numpy as np
+import pandas as pd
+
+import http_client
+
+# 저장 컬럼 (time: KST 기준 캔들 시작 시각, int64 ns)
+COLUMNS = ['open', 'high', 'low', 'close', 'volume', 'value']
+CANDLE_KEYS = {
+    'open': 'opening_price',
+    'high': 'high_price',
+    'low': 'low_price',
+    'close': 'trade_price',
+    'volume': 'candle_acc_trade_volume',
+    'value': 'candle_acc_trade_price',
+}
+PAGE_SIZE = 200  # 업비트 캔들 조회 1회 최대 개수
+
 
 class DataLoader:
-    def __init__(self, data_dir="data"):
+    """
+    업비트 과거 캔들 로더 (컬럼별 .npy 캐시 + 메모리 맵 로드)
+    - timeframe: "days", "minutes/1", "minutes/60" 등 (업비트 캔들 URL 경로)
+    - data_dir/{timeframe}/{market}/ 아래에 컬럼별 .npy 와 조회 범위(meta.json) 저장
+      (컬럼은 새 하위 디렉터리에 모두 쓴 뒤 meta.json 교체 한 번으로 전환 — 중간에 종료돼도 이전 캐시 유지)
+    - 요청 구간 중 캐시 앞/뒤로 빠진 구간만 업비트에서 페이지 단위로 조회해 보충
+    - base_url 에 로컬 테스트 서버 주소 지정 가능
+    """
+    def __init__(self, data_dir="data", base_url=http_client.UPBIT_API_URL):
         self.data_dir = data_dir
+        self.base_url = base_url
         os.makedirs(data_dir, exist_ok=True)
 
-    def get_ohlcv(self, market: str, start: str, end: str) -> pd.DataFrame:
+    def get_ohlcv(self, market: str, start: str, end: str, timeframe: str = "days") -> pd.DataFrame:
         """
-        지정한 마켓의 일별 OHLCV 데이터 반환 (start, end: 'YYYY-MM-DD')
-        실제 구현에서는 Upbit API 또는 csv/pickle 등에서 로드
+        지정한 마켓의 OHLCV 데이터 반환 (start, end: 'YYYY-MM-DD', 날짜만 주면 end 당일 포함)
+        컬럼: open, high, low, close, volume, value(거래대금), 인덱스: date (KST)
         """
-        # 예시: 임시 더미 데이터
-        dates = pd.date_range(start, end)
-        df = pd.DataFrame({
-            'date': dates,
-            'open': 1000,
-            'high': 1100,
-            'low': 900,
-            'close': 1050,
-            'volume': 1000
-        })
-        df.set_index('date', inplace=True)
+        start_ts, end_ts = self.time_range(start, end)
+        self.update(market, start_ts, end_ts, timeframe)
+        arrays = self.load_arrays(market, timeframe)
+        times = arrays['time']
+        lo = np.searchsorted(times, start_ts.value, side='left')
+        hi = np.searchsorted(times, end_ts.value, side='left')
+        df = pd.DataFrame({col: np.array(arrays[col][lo:hi]) for col in COLUMNS},
+                          index=pd.DatetimeIndex(np.array(times[lo:hi]).astype('datetime64[ns]'), name='date'))
         return df
+
+    def load_arrays(self, market, timeframe="days"):
+        # 캐시된 컬럼을 메모리 맵으로 로드 (파싱/복사 없음), 없거나 컬럼 길이가 다르면 빈 배열
+        arrays = self._read_columns(market, timeframe, self._load_meta(market, timeframe))
+        if arrays is None:
+            arrays = {col: np.empty(0) for col in COLUMNS}
+            arrays['time'] = np.empty(0, dtype='int64')
+        return arrays
+
+    def _read_columns(self, market, timeframe, meta):
+        # meta['dir'] 이 가리키는 컬럼 파일 (이전 형식은 종목 디렉터리 바로 아래), 없거나 깨졌으면 None
+        path = self._path(market, timeframe)
+        if meta and meta.get('dir'):
+            path = os.path.join(path, meta['dir'])
+        try:
+            arrays = {col: np.load(os.path.join(path, f'{col}.npy'), mmap_mode='r') for col in ['time'] + COLUMNS}
+        except (OSError, ValueError):
+            return None
+        if len({len(a) for a in arrays.values()}) != 1:
+            print(f"[데이터] {market} {timeframe} 캐시 컬럼 길이 불일치, 캐시 무시")
+            return None
+        return arrays
+
+    def update(self, market, start_ts, end_ts, timeframe="days"):
+        """
+        [start_ts, end_ts) 구간 중 캐시에 없는 앞/뒤 구간만 조회해 저장
+        - 마지막 캐시 캔들은 조회 당시 진행 중이었을 수 있으므로 다시 조회
+        """
+        end_ts = min(end_ts, self._now())
+        meta = self._load_meta(market, timeframe)
+        if meta is not None and self._read_columns(market, timeframe, meta) is None:
+            meta = None  # 컬럼 파일이 없거나 깨졌으면 전체 다시 조회
+        ranges = []
+        if meta is None:
+            ranges.append((start_ts, end_ts))
+        else:
+            covered_start = pd.Timestamp(meta['start'])
+            covered_end = pd.Timestamp(meta['end'])
+            if start_ts < covered_start:
+                ranges.append((start_ts, covered_start))
+            last = self.load_arrays(market, timeframe)['time']
+            refetch_from = pd.Timestamp(int(last[-1])) if len(last) else covered_end
+            if end_ts > covered_end:
+                ranges.append((min(refetch_from, covered_end), end_ts))
+        if not ranges:
+            return
+        frames = [self._fetch_range(market, timeframe, lo, hi) for lo, hi in ranges if lo < hi]
+        new_start = start_ts if meta is None else min(start_ts, pd.Timestamp(meta['start']))
+        new_end = end_ts if meta is None else max(end_ts, pd.Timestamp(meta['end']))
+        self._merge_save(market, timeframe, frames, meta, {'start': str(new_start), 'end': str(new_end)})
+
+    def _fetch_range(self, market, timeframe, start_ts, end_ts):
+        # 업비트 캔들을 end_ts 부터 과거 방향으로 페이지 조회 (to 는 미포함)
+        url = f"{self.base_url}/v1/candles/{timeframe}"
+        rows = []
+        to = end_ts
+        while True:
+            params = {"market": market, "count": PAGE_SIZE, "to": to.strftime('%Y-%m-%dT%H:%M:%S') + "+09:00"}
+            res = http_client.get(url, params=params, group="quotation")
+            candles = res.json()
+            if not isinstance(candles, list) or not candles:
+                break
+            page = [(pd.Timestamp(c['candle_date_time_kst']).value, [float(c[CANDLE_KEYS[col]]) for col in COLUMNS])
+                    for c in candles]
+            rows.extend(r for r in page if start_ts.value <= r[0] < end_ts.value)
+            oldest = min(r[0] for r in page)
+            if oldest <= start_ts.value or len(candles) < PAGE_SIZE:
+                break
+            to = pd.Timestamp(oldest)
+        times = np.array([r[0] for r in rows], dtype='int64')
+        values = np.array([r[1] for r in rows], dtype=float).reshape(-1, len(COLUMNS))
+        return times, values
+
+    def _merge_save(self, market, timeframe, frames, old_meta, meta):
+        """
+        기존 캐시 + 새 캔들 병합 (같은 시각은 새 값 우선)
+        - 모든 컬럼을 새 하위 디렉터리에 쓴 뒤 meta.json(조회 범위 + 디렉터리 이름)을 원자적으로 교체
+        - 컬럼 집합과 조회 범위가 한 번에 바뀌므로 중간에 종료돼도 길이가 다른 컬럼을 읽지 않음
+        """
+        old = self._read_columns(market, timeframe, old_meta) if old_meta is not None else None
+        times = [t for t, _ in frames]
+        values = [v for _, v in frames]
+        if old is not None:
+            times.insert(0, np.asarray(old['time']))
+            values.insert(0, np.column_stack([np.asarray(old[col]) for col in COLUMNS]).reshape(-1, len(COLUMNS)))
+        times = np.concatenate(times) if times else np.empty(0, dtype='int64')
+        values = np.concatenate(values) if values else np.empty((0, len(COLUMNS)))
+        # 뒤쪽(새 값)을 남기도록 역순에서 unique
+        rev_t = times[::-1]
+        _, idx = np.unique(rev_t, return_index=True)
+        keep = len(times) - 1 - idx
+        times = times[keep]
+        values = values[keep]
+        path = self._path(market, timeframe)
+        name = f"v-{uuid.uuid4().hex[:12]}"
+        target = os.path.join(path, name)
+        os.makedirs(target)
+        np.save(os.path.join(target, 'time.npy'), times)
+        for i, col in enumerate(COLUMNS):
+            np.save(os.path.join(target, f'{col}.npy'), np.ascontiguousarray(values[:, i]))
+        self._save_meta(market, timeframe, dict(meta, dir=name))
+        self._remove_old(path, keep=name)
+
+    @staticmethod
+    def _remove_old(path, keep):
+        # 교체된 이전 컬럼 파일/디렉터리 정리 (실패해도 무시, 다음 저장 때 다시 시도)
+        for entry in os.listdir(path):
+            full = os.path.join(path, entry)
+            if entry == keep or entry.startswith('meta.json'):
+                continue
+            try:
+                if os.path.isdir(full):
+                    shutil.rmtree(full)
+                elif entry.endswith('.npy'):
+                    os.remove(full)
+            except OSError:
+                pass
+
+    def _path(self, market, timeframe):
+        return os.path.join(self.data_dir, timeframe.replace('/', '_'), market)
+
+    def _load_meta(self, market, timeframe):
+        try:
+            with open(os.path.join(self._path(market, timeframe), 'meta.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save_meta(self, market, timeframe, meta):
+        path = self._path(market, timeframe)
+        os.makedirs(path, exist_ok=True)
+        tmp = os.path.join(path, 'meta.json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(path, 'meta.json'))
+
+    @staticmethod
+    def time_range(start, end):
+        # 'YYYY-MM-DD' 등 → [start_ts, end_ts) Timestamp (날짜만 주면 end 당일 포함)
+        start_ts = pd.Timestamp(start)
+        end_ts = pd.Timestamp(end)
+        if end_ts == end_ts.normalize():
+            end_ts += pd.Timedelta(days=1)  # 날짜만 주면 당일 포함
+        return start_ts, end_ts
+
+    @staticmethod
+    def _now():
+        # 현재 KST 시각 (tz 없는 Timestamp)
+        return pd.Timestamp.now(tz='Asia/Seoul').tz_localize(None)
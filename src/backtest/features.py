@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+
+
+def uses_features(**specs):
+    """
+    전략이 필요한 피처 선언 데코레이터
+    예: @uses_features(mom=('momentum', 30), ma20=('ma', 20), mom_rank=('rank', 'mom'))
+    선언된 전략은 data_dict 대신 날짜별 FeatureView 를 받음
+    """
+    def decorator(fn):
+        fn.features = specs
+        return fn
+    return decorator
+
+
+def _market_feature(close, kind, n):
+    # 종목 자체 인덱스(거래일) 기준 시계열 피처
+    if kind == 'momentum':
+        # 현재 포함 최근 n개 구간 수익률 (기존 df.loc[:date].iloc[-n] 기준, n개 미만이면 NaN)
+        base = close.shift(n - 1)
+        return (close - base) / base
+    if kind == 'return':
+        base = close.shift(n)
+        return (close - base) / base
+    if kind == 'ma':
+        return close.rolling(n).mean()
+    if kind == 'std':
+        return close.rolling(n).std()
+    raise ValueError(f"알 수 없는 피처: {kind}")
+
+
+class FeaturePanel:
+    """
+    전략 피처를 한 번에 계산해 (날짜 × 종목) 배열로 정렬한 패널
+    - 피처는 종목별 자체 거래일 기준으로 계산 후 전체 날짜(합집합)에 맞춰 정렬
+    - 종류: ('momentum', n), ('return', n), ('ma', n), ('std', n),
+            ('value_ma', n): 거래대금 이동평균, ('rank', 피처명): 날짜별 내림차순 순위(1부터)
+    - view(date) 는 날짜 → 행 번호 dict 조회만 하므로 O(1)
+    """
+    def __init__(self, data_dict, specs):
+        self.data_dict = data_dict
+        self.markets = list(data_dict)
+        self.market_index = {m: j for j, m in enumerate(self.markets)}
+        dates = pd.DatetimeIndex([])
+        for df in data_dict.values():
+            dates = dates.union(df.index)
+        self.dates = dates
+        self.date_index = {d: i for i, d in enumerate(dates)}
+        self.close = self._align({m: df['close'] for m, df in data_dict.items()})
+        self.mask = ~np.isnan(self.close)
+        self.features = {}
+        for name, spec in specs.items():
+            kind, arg = spec
+            if kind == 'rank':
+                continue
+            column, kind = ('value', 'ma') if kind == 'value_ma' else ('close', kind)
+            self.features[name] = self._align({
+                m: _market_feature(df[column].astype(float), kind, arg)
+                for m, df in data_dict.items() if column in df.columns
+            })
+        for name, (kind, base) in specs.items():
+            if kind == 'rank':
+                self.features[name] = pd.DataFrame(self.features[base]).rank(
+                    axis=1, ascending=False, method='first').to_numpy()
+
+    def _align(self, series_by_market):
+        out = np.full((len(self.dates), len(self.markets)), np.nan)
+        for m, s in series_by_market.items():
+            pos = self.dates.get_indexer(s.index)
+            out[pos, self.market_index[m]] = s.to_numpy(dtype=float)
+        return out
+
+    def view(self, date):
+        return FeatureView(self, self.date_index[pd.Timestamp(date)])
+
+
+class FeatureView:
+    """
+    특정 날짜의 피처 단면 (종목 순서는 panel.markets)
+    - view['피처명'], view.close: 종목별 배열
+    - view.valid: 해당 날짜 데이터가 있는 종목 여부
+    - view.data: 원본 data_dict (필요 시)
+    """
+    def __init__(self, panel, row):
+        self.panel = panel
+        self.row = row
+        self.date = panel.dates[row]
+        self.markets = panel.markets
+        self.data = panel.data_dict
+
+    @property
+    def close(self):
+        return self.panel.close[self.row]
+
+    @property
+    def valid(self):
+        return self.panel.mask[self.row]
+
+    def __getitem__(self, name):
+        return self.panel.features[name][self.row]
+
+    def price(self, market):
+        return self.panel.close[self.row, self.panel.market_index[market]]
+
+
+def bind_features(strategy_fn, panel):
+    # FeatureView 를 받는 전략을 기존 시그니처(date, positions, balance, data_dict, params)로 감싸기
+    def wrapped(date, positions, balance, data_dict, params):
+        return strategy_fn(date, positions, balance, panel.view(date), params)
+    return wrapped
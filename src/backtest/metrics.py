@@ -0,0 +1,145 @@
+import numpy as np
+import pandas as pd
+
+# 성과 지표 (NumPy 벡터 연산)
+# - 평가금액 인자는 1차원(곡선 1개) 또는 2차원(곡선 여러 개 × 시점)이며 마지막 축이 시간
+# - 최적화 결과 여러 개를 한 번에 계산할 때는 2차원 배열로 전달
+
+DAYS_PER_YEAR = 365  # 코인 시장은 휴장 없음
+
+
+def drawdown_series(total_value):
+    # 시점별 고점 대비 하락률 (0 이하)
+    values = np.asarray(total_value, dtype=float)
+    peak = np.maximum.accumulate(values, axis=-1)
+    return values / peak - 1
+
+
+def max_drawdown(total_value):
+    if np.size(total_value) == 0:
+        return 0.0
+    return drawdown_series(total_value).min(axis=-1)
+
+
+def period_returns(total_value):
+    values = np.asarray(total_value, dtype=float)
+    return values[..., 1:] / values[..., :-1] - 1
+
+
+def years_between(dates):
+    if len(dates) < 2:
+        return 0.0
+    return (pd.Timestamp(dates[-1]) - pd.Timestamp(dates[0])).total_seconds() / (DAYS_PER_YEAR * 86400)
+
+
+def periods_per_year(dates):
+    # 기록 간격(중앙값) 기준 연간 기간 수
+    if len(dates) < 2:
+        return 1.0
+    gaps = np.diff(pd.DatetimeIndex(dates).asi8) / 1e9
+    step = np.median(gaps)
+    return DAYS_PER_YEAR * 86400 / step if step > 0 else 1.0
+
+
+def cagr(total_value, dates):
+    values = np.asarray(total_value, dtype=float)
+    years = years_between(dates)
+    if years <= 0:
+        return np.zeros(values.shape[:-1]) if values.ndim > 1 else 0.0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (values[..., -1] / values[..., 0]) ** (1 / years) - 1
+
+
+def sharpe_ratio(returns, annual_periods):
+    returns = np.asarray(returns, dtype=float)
+    std = returns.std(axis=-1, ddof=1) if returns.shape[-1] > 1 else np.zeros(returns.shape[:-1])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ratio = returns.mean(axis=-1) / std * np.sqrt(annual_periods)
+    return np.where(std > 0, ratio, 0.0)
+
+
+def sortino_ratio(returns, annual_periods):
+    # 하방 편차: 음수 수익률만 제곱 평균 (목표 수익률 0)
+    returns = np.asarray(returns, dtype=float)
+    if returns.shape[-1] == 0:
+        return np.zeros(returns.shape[:-1])
+    downside = np.sqrt(np.mean(np.minimum(returns, 0) ** 2, axis=-1))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ratio = returns.mean(axis=-1) / downside * np.sqrt(annual_periods)
+    return np.where(downside > 0, ratio, 0.0)
+
+
+def calmar_ratio(cagr_value, mdd):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(mdd < 0, cagr_value / np.abs(mdd), 0.0)
+
+
+def market_contribution(positions, prices, initial_balance):
+    """
+    종목별 손익 기여도 (초기 자본 대비)
+    - 시점 i 보유 수량 × (시점 i+1 종가 - 시점 i 종가) 합계, 수수료/슬리피지 제외
+    """
+    positions = np.asarray(positions, dtype=float)
+    moves = np.diff(np.asarray(prices, dtype=float), axis=0)
+    pnl = np.nan_to_num(positions[:-1] * moves).sum(axis=0)
+    return pnl / initial_balance
+
+
+def compute_metrics(history, initial_balance=None):
+    """
+    BacktestHistory(컬럼형) 성과 지표 dict
+    - 포지션 dict 를 만들지 않고 배열만 사용 (수백만 행도 벡터 연산)
+    - turnover: 연환산 회전율 (체결 금액 / 평균 평가금액), fee_drag: 수수료+슬리피지 / 초기 자본
+    - exposure: 평균 코인 비중, contribution: {종목: 기여도} (0 이 아닌 종목만)
+    """
+    values = np.asarray(history.total_value, dtype=float)
+    dates = history.dates
+    initial = initial_balance or getattr(history, 'initial_balance', None) or (values[0] if len(values) else 1.0)
+    if len(values) == 0:
+        return {}
+    returns = period_returns(values)
+    annual = periods_per_year(dates)
+    years = years_between(dates)
+    mdd = float(max_drawdown(values))
+    growth = float(cagr(values, dates))
+    metrics = {
+        'total_return': values[-1] / values[0] - 1,
+        'cagr': growth,
+        'max_drawdown': mdd,
+        'sharpe': float(sharpe_ratio(returns, annual)),
+        'sortino': float(sortino_ratio(returns, annual)),
+        'calmar': float(calmar_ratio(growth, mdd)),
+        'volatility': float(returns.std(ddof=1) * np.sqrt(annual)) if len(returns) > 1 else 0.0,
+    }
+    if hasattr(history, 'turnover'):
+        traded = history.turnover.sum()
+        costs = history.fees.sum() + history.slippage.sum()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            exposure = np.where(values > 0, 1 - np.asarray(history.balance) / values, 0.0)
+        metrics['turnover'] = traded / values.mean() / years if years > 0 else 0.0
+        metrics['fee_drag'] = costs / initial
+        metrics['exposure'] = float(exposure.mean())
+        contribution = market_contribution(history.positions, history.prices, initial)
+        metrics['contribution'] = {history.markets[j]: float(contribution[j]) for j in np.flatnonzero(contribution)}
+    return metrics
+
+
+def sweep_metrics(histories):
+    """
+    같은 날짜로 실행한 여러 백테스트(최적화 결과)의 지표를 2차원 배열로 한 번에 계산
+    반환: 지표별 배열 DataFrame (행 = history 순서)
+    """
+    values = np.vstack([np.asarray(h.total_value, dtype=float) for h in histories])
+    dates = histories[0].dates
+    returns = period_returns(values)
+    annual = periods_per_year(dates)
+    mdd = max_drawdown(values)
+    growth = cagr(values, dates)
+    return pd.DataFrame({
+        'total_return': values[:, -1] / values[:, 0] - 1,
+        'cagr': growth,
+        'max_drawdown': mdd,
+        'sharpe': sharpe_ratio(returns, annual),
+        'sortino': sortino_ratio(returns, annual),
+        'calmar': calmar_ratio(growth, mdd),
+    })
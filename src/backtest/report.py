@@ -1,21 +1,51 @@
 import pandas as pd
 import matplotlib.pyplot as plt
 
+from backtest.metrics import compute_metrics, drawdown_series
+
 class BacktestReport:
     def __init__(self, history):
-        self.history = pd.DataFrame(history)
+        # BacktestHistory(컬럼형)는 포지션 dict 없이 바로 DataFrame 변환
+        self.source = history
+        self.history = history.to_frame() if hasattr(history, 'to_frame') else pd.DataFrame(history)
+
+    def metrics(self):
+        # 컬럼형 기록이면 전체 지표, dict 리스트면 평가금액 기반 지표만
+        if hasattr(self.source, 'to_frame'):
+            return compute_metrics(self.source)
+        frame = self.history
+        return compute_metrics(_ValueHistory(frame['date'].tolist(), frame['total_value'].to_numpy(dtype=float)))
+
+    def drawdown(self):
+        return pd.Series(drawdown_series(self.history['total_value'].to_numpy(dtype=float)),
+                         index=self.history['date'], name='drawdown')
 
     def summary(self):
         # 누적 수익률, MDD 등 요약
-        start = self.history['total_value'].iloc[0]
-        end = self.history['total_value'].iloc[-1]
-        ret = (end - start) / start
-        summary_text = f"누적 수익률: {ret*100:.2f}%"
+        m = self.metrics()
+        lines = [
+            f"누적 수익률: {m['total_return']*100:.2f}%",
+            f"CAGR: {m['cagr']*100:.2f}%",
+            f"MDD: {m['max_drawdown']*100:.2f}%",
+            f"샤프: {m['sharpe']:.2f} / 소르티노: {m['sortino']:.2f} / 칼마: {m['calmar']:.2f}",
+        ]
+        if 'turnover' in m:
+            lines.append(f"회전율(연): {m['turnover']:.1f}배 / 비용: {m['fee_drag']*100:.2f}% / 평균 코인 비중: {m['exposure']*100:.1f}%")
+            top = sorted(m['contribution'].items(), key=lambda x: abs(x[1]), reverse=True)[:5]
+            if top:
+                lines.append("종목 기여도: " + ", ".join(f"{k} {v*100:+.2f}%" for k, v in top))
+        summary_text = "\n".join(lines)
         print(summary_text)
         return summary_text
-        # 추가 지표 계산 가능
 
     def plot(self):
         self.history.set_index('date')['total_value'].plot()
         plt.title('누적 수익률 곡선')
         plt.show()  # 이 줄이 반드시 필요합니다!
+
+
+class _ValueHistory:
+    # dict 리스트 기록용 (평가금액만 있는 경우)
+    def __init__(self, dates, total_value):
+        self.dates = dates
+        self.total_value = total_value
@@ -1,5 +1,108 @@
+import numpy as np
 import pandas as pd
 
+from backtest.metrics import max_drawdown
+from backtest.streaming import ChunkView
+
+
+class MarketArrays:
+    """
+    data_dict 를 (날짜 × 종목) 배열로 한 번만 정렬한 결과
+    - close/value: 종가/거래대금 (해당 날짜 데이터가 없으면 NaN)
+    - mask: 해당 날짜가 종목 인덱스에 있는지 여부 (기존 `date in df.index`)
+    - has_value: 종목 데이터에 value(거래대금) 컬럼이 있는지 여부
+    """
+    def __init__(self, data_dict, dates):
+        self.markets = list(data_dict)
+        self.market_index = {m: j for j, m in enumerate(self.markets)}
+        self.dates = list(dates)
+        self.date_index = {d: i for i, d in enumerate(self.dates)}
+        shape = (len(self.dates), len(self.markets))
+        self.close = np.full(shape, np.nan)
+        self.value = np.full(shape, np.nan)
+        self.mask = np.zeros(shape, dtype=bool)
+        self.has_value = np.zeros(len(self.markets), dtype=bool)
+        for j, market in enumerate(self.markets):
+            df = data_dict[market]
+            pos = df.index.get_indexer(pd.Index(self.dates))
+            found = pos >= 0
+            self.mask[found, j] = True
+            self.close[found, j] = df['close'].to_numpy(dtype=float)[pos[found]]
+            if 'value' in df.columns:
+                self.has_value[j] = True
+                self.value[found, j] = df['value'].to_numpy(dtype=float)[pos[found]]
+
+    def rows(self, dates):
+        # 날짜 리스트 → 행 번호 배열
+        return np.array([self.date_index[d] for d in dates], dtype=np.int64)
+
+
+class BacktestHistory:
+    """
+    백테스트 기록 (컬럼형 배열)
+    - dates, balance, total_value: 리밸런싱 시점별 값
+    - positions: (시점 × 종목) 보유 수량 행렬, markets 순서
+    - prices: (시점 × 종목) 종가 행렬 (데이터 없으면 NaN)
+    - turnover, fees, slippage: 시점별 체결 금액 합계 / 수수료 / 슬리피지 비용
+    - history[i] 로 기존 형식의 dict(date, balance, positions, total_value) 조회 가능
+    """
+    def __init__(self, markets, n, initial_balance=None):
+        self.markets = list(markets)
+        self.initial_balance = initial_balance
+        self.dates = [None] * n
+        self.balance = np.zeros(n)
+        self.total_value = np.zeros(n)
+        self.positions = np.zeros((n, len(self.markets)), dtype=np.int64)
+        self.prices = np.full((n, len(self.markets)), np.nan)
+        self.turnover = np.zeros(n)
+        self.fees = np.zeros(n)
+        self.slippage = np.zeros(n)
+
+    def __len__(self):
+        return len(self.dates)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[k] for k in range(*i.indices(len(self)))]
+        row = self.positions[i]
+        return {
+            'date': self.dates[i],
+            'balance': self.balance[i],
+            'positions': {self.markets[j]: int(row[j]) for j in np.flatnonzero(row)},
+            'total_value': self.total_value[i],
+        }
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def scalars(self):
+        # 포지션/종가 행렬을 뺀 기록 (스트리밍 시 메모리 절약)
+        out = BacktestHistory([], 0, self.initial_balance)
+        out.dates = self.dates
+        for name in ('balance', 'total_value', 'turnover', 'fees', 'slippage'):
+            setattr(out, name, getattr(self, name))
+        out.positions = np.zeros((len(self), 0), dtype=np.int64)
+        out.prices = np.zeros((len(self), 0))
+        return out
+
+    @classmethod
+    def concat(cls, parts):
+        # 같은 종목 순서의 기록 이어 붙이기 (dates 는 DatetimeIndex)
+        out = cls(parts[0].markets if parts else [], 0, parts[0].initial_balance if parts else None)
+        if not parts:
+            return out
+        out.dates = pd.DatetimeIndex([d for p in parts for d in p.dates])
+        for name in ('balance', 'total_value', 'turnover', 'fees', 'slippage', 'positions', 'prices'):
+            setattr(out, name, np.concatenate([getattr(p, name) for p in parts]))
+        return out
+
+    def to_frame(self):
+        # 시점별 스칼라 컬럼 DataFrame (포지션 dict 생성 없음)
+        return pd.DataFrame({'date': self.dates, 'balance': self.balance, 'total_value': self.total_value,
+                             'turnover': self.turnover, 'fees': self.fees, 'slippage': self.slippage})
+
+
 class BacktestSimulator:
     def __init__(self, initial_balance, fee_rate=0.0005, max_coin_ratio=0.2, max_loss=-0.1, slippage=0.001, min_volume=10000000):
         self.initial_balance = initial_balance
@@ -17,75 +120,144 @@ class BacktestSimulator:
         self.total_value = self.initial_balance
         self.max_drawdown = 0
 
-    def run(self, strategy_fn, data_dict, rebalance_dates):
-        for date in rebalance_dates:
+    def run(self, strategy_fn, data_dict, rebalance_dates, arrays=None):
+        """
+        리밸런싱 날짜별 시뮬레이션
+        - 시세는 MarketArrays(날짜 × 종목 배열)에서 정수 인덱스로 조회
+        - arrays: 미리 정렬한 MarketArrays (여러 번 실행 시 재사용), 없으면 rebalance_dates 로 생성
+        반환: BacktestHistory
+        """
+        if arrays is None:
+            arrays = MarketArrays(data_dict, rebalance_dates)
+        rows = arrays.rows(rebalance_dates)
+        self.history = history = BacktestHistory(arrays.markets, len(rows), self.initial_balance)
+        history.prices[:] = arrays.close[rows]
+
+        for step, (date, r) in enumerate(zip(rebalance_dates, rows)):
             orders = strategy_fn(date, self.positions, self.balance, data_dict)
+            costs = self._step(orders, arrays, r)
+            # 기록
+            self._record(history, step, date, costs, arrays.market_index)
+        self.max_drawdown = max_drawdown(history.total_value)
+        return history
+
+    def run_stream(self, strategy_fn, chunks, interval=None, sink=None, keep_positions=False):
+        """
+        시간순 청크(MarketChunk) 스트림 시뮬레이션 (분봉 등 메모리보다 큰 데이터)
+        - 잔고/포지션은 청크 경계를 넘어 유지, 청크는 처리 후 버려짐
+        - strategy_fn(date, positions, balance, view): view 는 ChunkView (lookback 행 포함 과거 조회 가능)
+        - interval: 리밸런싱 간격 (예: '1h'), None 이면 모든 행
+        - sink(history): 청크별 BacktestHistory(포지션/종가 포함) 콜백 (파일 저장 등)
+        반환: 전체 기간 BacktestHistory (keep_positions=False 면 시점별 스칼라 컬럼만)
+        """
+        interval = pd.Timedelta(interval).value if interval is not None else 0
+        next_time = None
+        parts = []
+        for chunk in chunks:
+            rows = []
+            for r in range(chunk.start, len(chunk)):
+                t = chunk.times[r]
+                if next_time is None or t >= next_time:
+                    rows.append(r)
+                    next_time = t + interval
+            history = BacktestHistory(chunk.markets, len(rows), self.initial_balance)
+            history.prices[:] = chunk.close[rows]
+            for step, r in enumerate(rows):
+                date = chunk.dates[r]
+                orders = strategy_fn(date, self.positions, self.balance, ChunkView(chunk, r))
+                costs = self._step(orders, chunk, r)
+                self._record(history, step, date, costs, chunk.market_index)
+            if sink:
+                sink(history)
+            parts.append(history if keep_positions else history.scalars())
+        self.history = history = BacktestHistory.concat(parts)
+        self.max_drawdown = max_drawdown(history.total_value)
+        return history
+
+    def _step(self, orders, arrays, r):
+        """
+        arrays 의 r 번째 행 시세로 주문 1회 처리 (잔고/포지션 갱신)
+        - arrays: close/value/mask/has_value/market_index 를 가진 객체 (MarketArrays, MarketChunk)
+        반환: (체결 금액, 수수료, 슬리피지 비용)
+        """
+        market_index = arrays.market_index
+        close, value, mask, has_value = arrays.close, arrays.value, arrays.mask, arrays.has_value
+        max_cost = self.initial_balance * self.max_coin_ratio
+        turnover = fee_cost = slip_cost = 0.0
 
-            # 1. 렌딩(코인빌려주기) 전략 처리
-            if 'LENDING' in orders:
-                daily_rate = orders['LENDING']
-                self.balance *= (1 + daily_rate)
-                self.positions = {}  # 모든 코인 청산
-                # 평가금액 = 현금
-                self.total_value = self.balance
-            else:
-                # 2. 기존 포지션 전량 매도(리밸런싱)
-                for market, amount in list(self.positions.items()):
-                    if amount > 0 and market in data_dict and date in data_dict[market].index:
-                        price = data_dict[market].loc[date]['close']
-                        # 슬리피지 적용(매도는 -)
-                        price *= (1 - self.slippage)
-                        proceeds = amount * price
-                        proceeds -= proceeds * self.fee_rate
-                        self.balance += proceeds
-                self.positions = {}
-
-                # 3. 매수(목표 포트폴리오)
-                for market, amount in orders.items():
-                    if market in data_dict and date in data_dict[market].index and amount > 0:
-                        price = data_dict[market].loc[date]['close']
-                        # 거래량 필터
-                        volume = data_dict[market].loc[date]['value'] if 'value' in data_dict[market].columns else None
-                        if volume is not None and volume < self.min_volume:
-                            continue
-                        # 슬리피지 적용(매수는 +)
-                        price *= (1 + self.slippage)
+        # 1. 렌딩(코인빌려주기) 전략 처리
+        if 'LENDING' in orders:
+            daily_rate = orders['LENDING']
+            self.balance *= (1 + daily_rate)
+            self.positions = {}  # 모든 코인 청산
+            # 평가금액 = 현금
+            self.total_value = self.balance
+        else:
+            # 2. 기존 포지션 전량 매도(리밸런싱)
+            for market, amount in list(self.positions.items()):
+                j = market_index.get(market)
+                # 매도/평가는 종가만 있으면 됨 (분봉 청크는 캔들 없는 분도 직전 종가로 채워져 있음)
+                if amount > 0 and j is not None and not np.isnan(close[r, j]):
+                    # 슬리피지 적용(매도는 -)
+                    price = close[r, j] * (1 - self.slippage)
+                    proceeds = amount * price
+                    turnover += proceeds
+                    slip_cost += amount * close[r, j] - proceeds
+                    fee_cost += proceeds * self.fee_rate
+                    proceeds -= proceeds * self.fee_rate
+                    self.balance += proceeds
+            self.positions = {}
+
+            # 3. 매수(목표 포트폴리오)
+            for market, amount in orders.items():
+                j = market_index.get(market)
+                if j is not None and mask[r, j] and amount > 0:
+                    price = close[r, j]
+                    # 거래량 필터
+                    if has_value[j] and value[r, j] < self.min_volume:
+                        continue
+                    # 슬리피지 적용(매수는 +)
+                    price *= (1 + self.slippage)
+                    cost = amount * price
+                    if cost > self.balance:
+                        amount = int(self.balance // price)
                         cost = amount * price
-                        if cost > self.balance:
-                            amount = int(self.balance // price)
+                    if amount > 0 and cost > 0:
+                        # 최대 비중 제한
+                        if cost > max_cost:
+                            cost = max_cost
+                            amount = int(cost // price)
                             cost = amount * price
                         if amount > 0 and cost > 0:
-                            # 최대 비중 제한
-                            if cost > self.initial_balance * self.max_coin_ratio:
-                                cost = self.initial_balance * self.max_coin_ratio
-                                amount = int(cost // price)
-                                cost = amount * price
-                            if amount > 0 and cost > 0:
-                                self.balance -= cost
-                                self.balance -= cost * self.fee_rate
-                                # 잔돈(소수점 이하) 버림
-                                self.positions[market] = int(amount)
-
-                # 4. 평가금액 계산
-                total_value = self.balance
-                for market, amount in self.positions.items():
-                    if market in data_dict and date in data_dict[market].index:
-                        price = data_dict[market].loc[date]['close']
-                        total_value += amount * price
-                self.total_value = total_value
-
-            # 5. 최대 손실(청산) 체크
-            ret = (self.total_value - self.initial_balance) / self.initial_balance
-            if ret <= self.max_loss:
-                self.balance = self.total_value
-                self.positions = {}
-                self.total_value = self.balance
-
-            # 6. 기록
-            self.history.append({
-                'date': date,
-                'balance': self.balance,
-                'positions': self.positions.copy(),
-                'total_value': self.total_value
-            })
-        return self.history
+                            turnover += cost
+                            slip_cost += cost - amount * close[r, j]
+                            fee_cost += cost * self.fee_rate
+                            self.balance -= cost
+                            self.balance -= cost * self.fee_rate
+                            # 잔돈(소수점 이하) 버림
+                            self.positions[market] = int(amount)
+
+            # 4. 평가금액 계산
+            total_value = self.balance
+            for market, amount in self.positions.items():
+                j = market_index[market]
+                if not np.isnan(close[r, j]):
+                    total_value += amount * close[r, j]
+            self.total_value = total_value
+
+        # 5. 최대 손실(청산) 체크
+        ret = (self.total_value - self.initial_balance) / self.initial_balance
+        if ret <= self.max_loss:
+            self.balance = self.total_value
+            self.positions = {}
+            self.total_value = self.balance
+
+        return turnover, fee_cost, slip_cost
+
+    def _record(self, history, step, date, costs, market_index):
+        history.dates[step] = date
+        history.balance[step] = self.balance
+        history.total_value[step] = self.total_value
+        history.turnover[step], history.fees[step], history.slippage[step] = costs
+        for market, amount in self.positions.items():
+            history.positions[step, market_index[market]] = amount
@@ -0,0 +1,134 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+
+class MarketChunk:
+    """
+    시간순 청크 1개의 (시각 × 종목) 시세 배열 (MarketArrays 와 같은 속성 이름)
+    - times: int64 ns (KST), dates: DatetimeIndex
+    - close: 캔들이 없는 시각은 직전 종가로 채움 (청크 경계 포함), mask 는 실제 캔들이 있는지 여부
+    - start: 앞쪽 lookback 행(이전 청크 꼬리) 다음의 첫 신규 행 번호
+    """
+    def __init__(self, markets, times, close, value, mask, has_value, start=0):
+        self.markets = list(markets)
+        self.market_index = {m: j for j, m in enumerate(self.markets)}
+        self.times = times
+        self.dates = pd.DatetimeIndex(times.astype('datetime64[ns]'))
+        self.close = close
+        self.value = value
+        self.mask = mask
+        self.has_value = has_value
+        self.start = start
+
+    def __len__(self):
+        return len(self.times)
+
+    def tail(self, n):
+        # 다음 청크 lookback 용 마지막 n 행
+        if n <= 0:
+            return None
+        return self.times[-n:], self.close[-n:], self.value[-n:], self.mask[-n:]
+
+
+class ChunkView:
+    """
+    스트리밍 전략에 전달되는 특정 시각 단면
+    - view.close / view.value / view.valid: 종목별 배열 (종목 순서는 view.markets)
+    - view.window(n): 현재 포함 최근 n 행 (n × 종목), 청크 경계는 lookback 행으로 이어짐
+    """
+    def __init__(self, chunk, row):
+        self.chunk = chunk
+        self.row = row
+        self.date = chunk.dates[row]
+        self.markets = chunk.markets
+
+    @property
+    def close(self):
+        return self.chunk.close[self.row]
+
+    @property
+    def value(self):
+        return self.chunk.value[self.row]
+
+    @property
+    def valid(self):
+        return self.chunk.mask[self.row]
+
+    def window(self, n, column='close'):
+        return getattr(self.chunk, column)[max(0, self.row - n + 1):self.row + 1]
+
+    def price(self, market):
+        return self.chunk.close[self.row, self.chunk.market_index[market]]
+
+
+def iter_chunks(loader, markets, start, end, timeframe="minutes/1", chunk_size="1D", lookback=0, fetch=False):
+    """
+    DataLoader 캐시(.npy 메모리 맵)에서 시간순 청크 생성 (메모리 사용량 = 청크 크기 × 종목 수)
+    - chunk_size: 청크 1개 기간 (예: '1D', '6h')
+    - lookback: 이전 청크 마지막 행을 앞에 붙일 개수 (이동평균 등 과거 조회용)
+    - fetch: True 면 먼저 캐시에 없는 구간을 업비트에서 조회
+    """
+    start_ts, end_ts = loader.time_range(start, end)
+    if fetch:
+        for market in markets:
+            loader.update(market, start_ts, end_ts, timeframe)
+    columns = {m: loader.load_arrays(m, timeframe) for m in markets}
+    has_value = np.ones(len(markets), dtype=bool)
+    step = pd.Timedelta(chunk_size).value
+    prev = None
+    last_close = np.full(len(markets), np.nan)  # 종목별 마지막 종가 (다음 청크 앞부분 채우기용)
+    for t0 in range(start_ts.value, end_ts.value, step):
+        t1 = min(t0 + step, end_ts.value)
+        slices = []
+        for m in markets:
+            times = columns[m]['time']
+            lo = np.searchsorted(times, t0, side='left')
+            hi = np.searchsorted(times, t1, side='left')
+            slices.append((lo, hi, np.asarray(times[lo:hi])))
+        # 청크 시각축: 종목별 캔들 시각의 합집합 (거래 없는 분은 캔들이 없음)
+        times = np.unique(np.concatenate([t for _, _, t in slices])) if slices else np.empty(0, dtype='int64')
+        shape = (len(times), len(markets))
+        close = np.full(shape, np.nan)
+        value = np.full(shape, np.nan)
+        mask = np.zeros(shape, dtype=bool)
+        for j, (m, (lo, hi, t)) in enumerate(zip(markets, slices)):
+            pos = np.searchsorted(times, t)
+            close[pos, j] = columns[m]['close'][lo:hi]
+            value[pos, j] = columns[m]['value'][lo:hi]
+            mask[pos, j] = True
+        # 거래 없는 분은 직전 종가로 채움 (보유 종목 매도/평가가 캔들 없는 분에 빠지지 않도록)
+        if len(times):
+            close = pd.DataFrame(np.vstack([last_close, close])).ffill().to_numpy()[1:]
+            last_close = close[-1].copy()
+        n_prev = 0
+        if prev is not None:
+            p_times, p_close, p_value, p_mask = prev
+            n_prev = len(p_times)
+            times = np.concatenate([p_times, times])
+            close = np.concatenate([p_close, close])
+            value = np.concatenate([p_value, value])
+            mask = np.concatenate([p_mask, mask])
+        chunk = MarketChunk(markets, times, close, value, mask, has_value, start=n_prev)
+        prev = chunk.tail(min(lookback, len(chunk)))
+        if len(chunk) > n_prev:
+            yield chunk
+
+
+class CsvHistorySink:
+    """
+    run_stream 의 sink: 청크별 기록을 CSV 에 이어 쓰기 (기록 전체를 메모리에 두지 않음)
+    - positions=True 면 종목별 보유 수량 컬럼도 저장
+    """
+    def __init__(self, path, positions=False):
+        self.path = path
+        self.positions = positions
+        if os.path.exists(path):
+            os.remove(path)
+
+    def __call__(self, history):
+        frame = history.to_frame()
+        if self.positions:
+            frame = pd.concat([frame, pd.DataFrame(history.positions, columns=history.markets)], axis=1)
+        frame.to_csv(self.path, mode='a', header=not os.path.exists(self.path), index=False)
@@ -1,18 +1,54 @@
 import os
+import time
+import numpy as np
 from dotenv import load_dotenv
 from backtest.data_loader import DataLoader
 from backtest.simulator import BacktestSimulator
 from backtest.report import BacktestReport
+from backtest.features import FeaturePanel, uses_features
 from auto_optimizer import auto_optimize
+from param_search import search_optimize
+from walk_forward import walk_forward
 from ai_verifier import AIVerifier
-from telegram_alert import TelegramAlert
+from telegram_alert import TelegramAlert, PRIORITY_CRITICAL, PRIORITY_ORDER
 from upbit_api import UpbitAPI
 import matplotlib.pyplot as plt
 
+# 파라미터 탐색 방식: 'grid'(param_grid 전수 조사) | 'random' | 'halving' | 'hyperband' | 'tpe'
+OPTIMIZE_METHOD = os.getenv("OPTIMIZE_METHOD", "grid")
+OPTIMIZE_TIME_BUDGET = float(os.getenv("OPTIMIZE_TIME_BUDGET", "60"))  # 초
+WALK_FORWARD = os.getenv("WALK_FORWARD") == "1"  # 학습/검증 창 롤링 표본 외 평가 추가 실행
+PARAM_SPACE = {
+    'rebalance_period': (1, 60),
+    'max_coin_ratio': (0.05, 0.5),
+    'top_n': (1, 5),
+}
+
 plt.rcParams['font.family'] = 'AppleGothic'
 plt.rcParams['axes.unicode_minus'] = False
 
-def example_strategy(date, positions, balance, data_dict, params):
+@uses_features(momentum=('momentum', 30))
+def example_strategy(date, positions, balance, features, params):
+    """
+    30일 모멘텀 상위 N개 종목 균등 매수 (피처 패널 사용, 날짜당 O(종목 수))
+    - features: 해당 날짜의 FeatureView (momentum: 최근 30개 캔들 수익률)
+    """
+    N = params.get('top_n', 3)
+    ret = features['momentum']
+    candidates = np.flatnonzero(~np.isnan(ret))
+    top = candidates[np.argsort(-ret[candidates], kind='stable')][:N]
+    invest_per_coin = balance // len(top) if len(top) else 0
+    close = features.close
+    result = {}
+    for j in top:
+        price = close[j]
+        amount = int(invest_per_coin // price)
+        if amount * price >= 5000:
+            result[features.markets[j]] = amount
+    return result
+
+def example_strategy_legacy(date, positions, balance, data_dict, params):
+    # 기존 구현 (날짜마다 df.loc[:date] 슬라이스, 비교/벤치마크용)
     N = params.get('top_n', 3)
     returns = []
     for market, df in data_dict.items():
@@ -33,6 +69,26 @@ def example_strategy(date, positions, balance, data_dict, params):
             result[market] = amount
     return result
 
+def benchmark_example_strategy(data_dict, rebalance_dates, params=None):
+    # 기존 구현 대비 피처 패널 구현의 주문 일치 여부와 소요 시간 비교
+    params = params or {'top_n': 3}
+    start = time.time()
+    panel = FeaturePanel(data_dict, example_strategy.features)
+    build_time = time.time() - start
+    legacy_time = fast_time = 0.0
+    for date in rebalance_dates:
+        start = time.time()
+        expected = example_strategy_legacy(date, {}, 1000000, data_dict, params)
+        legacy_time += time.time() - start
+        start = time.time()
+        actual = example_strategy(date, {}, 1000000, panel.view(date), params)
+        fast_time += time.time() - start
+        if expected != actual:
+            raise RuntimeError(f"피처 패널 주문 불일치 {date}: {expected} != {actual}")
+    print(f"[벤치마크] 기존 {legacy_time:.2f}초 / 피처 패널 {fast_time:.2f}초 (+계산 {build_time:.2f}초), "
+          f"{len(rebalance_dates)}일 {len(data_dict)}종목")
+    return legacy_time, fast_time + build_time
+
 def main():
     load_dotenv()
     start = '2023-01-01'
@@ -49,7 +105,14 @@ def main():
         {'rebalance_period': 30, 'max_coin_ratio': 0.2, 'top_n': 3},
         {'rebalance_period': 30, 'max_coin_ratio': 0.3, 'top_n': 5},
     ]
-    best_param, best_history = auto_optimize(example_strategy, data_dict, rebalance_dates, param_grid)
+    if WALK_FORWARD:
+        walk_forward(example_strategy, data_dict, rebalance_dates, param_grid,
+                     train_size=365, test_size=90, workers=os.cpu_count())
+    if OPTIMIZE_METHOD == 'grid':
+        best_param, best_history = auto_optimize(example_strategy, data_dict, rebalance_dates, param_grid)
+    else:
+        best_param, best_history = search_optimize(example_strategy, data_dict, rebalance_dates, PARAM_SPACE,
+                                                   method=OPTIMIZE_METHOD, time_budget=OPTIMIZE_TIME_BUDGET)
 
     # 2. AI 기반 전략 추천 및 검증
     ai = AIVerifier(openai_api_key=os.getenv("OPENAI_API_KEY"))
@@ -67,7 +130,7 @@ def main():
     telegram_chat_id = os.getenv("TELEGRAM_CHAT_ID")
     if telegram_token and telegram_chat_id:
         tg = TelegramAlert(telegram_token, telegram_chat_id)
-        tg.send(f"[백테스트 결과]\n최적 파라미터: {best_param}\n누적 수익률: {summary_text}\nAI 전략 추천: {answer}")
+        tg.send(f"[백테스트 결과]\n최적 파라미터: {best_param}\n{summary_text}\nAI 전략 추천: {answer}")
 
     # 5. 실매매 연동 (AI 검증 통과 시)
     if is_positive:
@@ -80,11 +143,11 @@ def main():
             order_result = upbit.buy_market_order("KRW-ETH", 20000)
             print("실매매 주문 결과:", order_result)
             if telegram_token and telegram_chat_id:
-                tg.send(f"실매매 주문 완료: KRW-ETH 20,000원 시장가 매수\n{order_result}")
+                tg.send(f"실매매 주문 완료: KRW-ETH 20,000원 시장가 매수\n{order_result}", PRIORITY_ORDER)
         except Exception as e:
             print("실매매 주문 오류:", e)
             if telegram_token and telegram_chat_id:
-                tg.send(f"실매매 주문 오류: {e}")
+                tg.send(f"실매매 주문 오류: {e}", PRIORITY_CRITICAL)
     else:
         print("AI 검증 미통과. 실매매를 실행하지 않습니다.")
 
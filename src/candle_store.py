@@ -0,0 +1,150 @@
+import datetime
+import os
+import sqlite3
+import threading
+
+import http_client
+
+UPBIT_API_URL = http_client.UPBIT_API_URL
+CANDLE_DB_PATH = os.path.join(os.path.dirname(__file__), "candles.db")
+
+# 업비트 캔들 응답 필드 (저장/복원 순서)
+CANDLE_FIELDS = [
+    "candle_date_time_utc",
+    "candle_date_time_kst",
+    "opening_price",
+    "high_price",
+    "low_price",
+    "trade_price",
+    "timestamp",
+    "candle_acc_trade_price",
+    "candle_acc_trade_volume",
+]
+
+# 타임프레임별 캔들 길이(초)
+UNIT_SECONDS = {"days": 86400, "weeks": 7 * 86400}
+
+
+def unit_seconds(unit):
+    # "days", "weeks", "minutes/1", "minutes/60" 등
+    if unit.startswith("minutes/"):
+        return int(unit.split("/")[1]) * 60
+    return UNIT_SECONDS[unit]
+
+
+def fetch_candles(market, count=30, unit="days", retries=3):
+    # 업비트 캔들 조회 (최신순, 요청 한도/429 재시도는 http_client 에서 처리)
+    url = f"{UPBIT_API_URL}/v1/candles/{unit}"
+    params = {"market": market, "count": count}
+    for _ in range(retries):
+        try:
+            res = http_client.get(url, params=params, group="quotation")
+        except http_client.TRANSPORT_ERRORS as e:
+            print(f"[캔들 조회 오류] {market}: {e}")
+            continue
+        if res.status_code == 429:
+            continue
+        return res.json()
+    return []
+
+
+class CandleStore:
+    """
+    마켓/타임프레임별 캔들을 SQLite에 누적 저장하는 로컬 캔들 저장소
+    - 저장된 최신 캔들 이후 구간(+진행 중인 최신 캔들)만 새로 조회
+    - 최근 N개 캔들은 저장소에서 최신순으로 반환 (업비트 응답과 같은 형식)
+    """
+    def __init__(self, db_path=CANDLE_DB_PATH):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS candles (
+                market TEXT NOT NULL,
+                unit TEXT NOT NULL,
+                {", ".join(f"{f} {'TEXT' if f.startswith('candle_date') else 'REAL'}" for f in CANDLE_FIELDS)},
+                PRIMARY KEY (market, unit, candle_date_time_utc)
+            )
+        """)
+        self.conn.commit()
+        self.fetched_candles = 0  # 누적 저장(네트워크 조회) 캔들 수
+
+    def latest_time(self, market, unit="days"):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT MAX(candle_date_time_utc) FROM candles WHERE market=? AND unit=?",
+                (market, unit),
+            ).fetchone()
+        return row[0] if row else None
+
+    def upsert(self, market, unit, candles):
+        rows = [
+            (market, unit) + tuple(c.get(f) for f in CANDLE_FIELDS)
+            for c in candles
+            if isinstance(c, dict) and c.get("candle_date_time_utc")
+        ]
+        if not rows:
+            return 0
+        placeholders = ", ".join("?" * (len(CANDLE_FIELDS) + 2))
+        with self.lock:
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO candles (market, unit, {', '.join(CANDLE_FIELDS)}) VALUES ({placeholders})",
+                rows,
+            )
+            self.conn.commit()
+            self.fetched_candles += len(rows)
+        return len(rows)
+
+    def load(self, market, count=30, unit="days"):
+        # 저장된 캔들 최신순 count개
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT {', '.join(CANDLE_FIELDS)} FROM candles WHERE market=? AND unit=? "
+                "ORDER BY candle_date_time_utc DESC LIMIT ?",
+                (market, unit, count),
+            ).fetchall()
+        return [dict(zip(CANDLE_FIELDS, row)) for row in rows]
+
+    def missing_count(self, market, count=30, unit="days"):
+        # 새로 조회해야 할 캔들 수 (마지막 저장 캔들도 아직 진행 중일 수 있으므로 다시 조회)
+        latest = self.latest_time(market, unit)
+        if latest is None:
+            return count
+        latest_dt = datetime.datetime.fromisoformat(latest).replace(tzinfo=datetime.timezone.utc)
+        now = datetime.datetime.now(datetime.timezone.utc)
+        elapsed = int((now - latest_dt).total_seconds() // unit_seconds(unit))
+        return max(1, min(count, elapsed + 1))
+
+    def get_candles(self, market, count=30, unit="days"):
+        """
+        최신순 캔들 count개 반환
+        - 저장소에 없는 최신 구간만 업비트에서 조회 후 저장
+        - 저장된 캔들이 부족하면 count개 전체를 한 번 다시 조회해 채움
+        """
+        need = self.missing_count(market, count, unit)
+        candles = fetch_candles(market, need, unit)
+        if isinstance(candles, list):
+            self.upsert(market, unit, candles)
+        stored = self.load(market, count, unit)
+        if len(stored) < count and need < count:
+            candles = fetch_candles(market, count, unit)
+            if isinstance(candles, list):
+                self.upsert(market, unit, candles)
+            stored = self.load(market, count, unit)
+        return stored
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+_default_store = None
+
+
+def get_default_store():
+    # 프로세스 공용 캔들 저장소 (src/candles.db)
+    global _default_store
+    if _default_store is None:
+        _default_store = CandleStore()
+    return _default_store
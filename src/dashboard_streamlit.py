@@ -5,6 +5,8 @@ import os
 import pandas as pd
 import time
 from streamlit_autorefresh import st_autorefresh
+from trade_journal import get_default_journal
+from state_store import load_states
 
 st.set_page_config(page_title="업비트 자동매매 대시보드", layout="wide")
 
@@ -19,14 +21,8 @@ st.title("업비트 자동매매 실시간 대시보드")
 st_autorefresh = st.experimental_rerun if hasattr(st, "experimental_rerun") else lambda: None
 st.button("새로고침", on_click=st_autorefresh)
 
-def load_states():
-    try:
-        with open(state_path) as f:
-            return json.load(f)
-    except Exception:
-        return {}
-
-coin_states = load_states()
+# 스냅샷 + 저널 (봇이 기록 중인 최신 상태)
+coin_states = load_states(state_path)
 
 if not coin_states:
     st.warning("코인 상태 데이터가 없습니다.")
@@ -61,28 +57,31 @@ if st.sidebar.button("적용"):
         }, f)
     st.success("전략 파라미터가 저장되었습니다.")
 
-import pandas as pd
 st.header("거래내역 및 수익률 분석")
-if os.path.exists("trade_history.csv"):
-    df = pd.read_csv("trade_history.csv")
+journal = get_default_journal()
+history_days = st.sidebar.number_input("거래내역 조회 기간(일)", 1, 3650, 30)
+since = (pd.Timestamp.now() - pd.Timedelta(days=int(history_days))).strftime('%Y-%m-%d %H:%M:%S')
+# 조회 기간 거래만 읽고, 일별/종목별 손익은 SQL 집계로 계산
+df = journal.query(start=since)
+if not df.empty:
     st.subheader("누적 거래내역 (실시간)")
     st.dataframe(df, use_container_width=True)
 
     # 누적 손익, 일별 손익, 종목별 누적 손익 등 다양한 누적 지표 시각화
     df['datetime'] = pd.to_datetime(df['datetime'])
-    df['profit'] = df.apply(lambda row: float(row['price']) * float(row['volume']) if row['type']=='sell' else -float(row['price']) * float(row['volume']), axis=1)
+    df['profit'] = df['price'] * df['volume']
+    df.loc[df['type'] != 'sell', 'profit'] *= -1
 
     # 누적 손익(전체)
     df['cum_profit'] = df['profit'].cumsum()
     st.line_chart(df.set_index('datetime')['cum_profit'], height=250)
 
     # 일별 손익
-    daily = df.groupby(df['datetime'].dt.date)['profit'].sum()
+    daily = journal.aggregate('day', start=since)['profit']
     st.bar_chart(daily, height=200)
 
     # 종목별 누적 손익
-    if 'market' in df.columns:
-        coin_profit = df.groupby('market')['profit'].sum().sort_values(ascending=False)
-        st.bar_chart(coin_profit, height=200)
+    coin_profit = journal.aggregate('market', start=since)['profit'].sort_values(ascending=False)
+    st.bar_chart(coin_profit, height=200)
 else:
-    st.info("거래내역이 없습니다.")
\ No newline at end of file
+    st.info("거래내역이 없습니다.")
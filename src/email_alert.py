@@ -1,20 +1,215 @@
+import atexit
 import smtplib
+import threading
+import time
 from email.mime.text import MIMEText
+from email.utils import formatdate
+
+DIGEST_INTERVAL = 300    # 일반 알림을 모아 요약 메일로 보내는 주기(초)
+DIGEST_MAX_ITEMS = 200   # 요약 메일 1통에 넣는 최대 알림 수 (넘으면 나머지는 다음 요약)
+QUEUE_SIZE = 1000        # 대기 알림 최대 개수 (넘으면 오래된 일반 알림부터 버림)
+SMTP_TIMEOUT = 10        # SMTP 연결/응답 타임아웃(초)
+NOOP_AFTER = 60          # 이 시간(초) 이상 쉰 연결은 보내기 전에 NOOP 으로 확인
+SEND_RETRIES = 2         # 연결 끊김 등 실패 시 재연결 후 재시도 횟수
+FLUSH_TIMEOUT = 10.0     # 종료 시 남은 알림 전송 대기 시간(초)
+
+
+def default_security(port):
+    # 포트로 보안 방식 추정: 465 SSL, 587 STARTTLS, 그 외 평문(로컬 테스트 서버 등)
+    return {465: "ssl", 587: "starttls"}.get(int(port), "none")
+
 
 class EmailAlert:
-    def __init__(self, smtp_server, smtp_port, user, password, to_email):
+    """
+    메일 알림 (백그라운드 전송, SMTP 연결 유지)
+    - send() 는 큐에 넣고 바로 반환, 전송은 백그라운드 스레드에서
+    - urgent=True 알림은 바로 1통씩, 일반 알림은 DIGEST_INTERVAL 마다 요약 메일 1통으로 묶어 전송
+    - 로그인한 SMTP 연결을 계속 사용 (오래 쉰 연결은 NOOP 확인, 끊겼으면 재연결 후 재시도)
+    - security: 'ssl' | 'starttls' | 'none' (기본: 포트로 추정), password 가 없으면 로그인 생략
+      (로컬 테스트: python -m aiosmtpd -n -l localhost:8025 로 띄운 서버에 평문 연결)
+    """
+    def __init__(self, smtp_server, smtp_port, user, password, to_email,
+                 security=None, digest_interval=DIGEST_INTERVAL, queue_size=QUEUE_SIZE):
         self.smtp_server = smtp_server
-        self.smtp_port = smtp_port
+        self.smtp_port = int(smtp_port)
         self.user = user
         self.password = password
         self.to_email = to_email
+        self.security = security or default_security(self.smtp_port)
+        self.digest_interval = digest_interval
+        self.queue_size = queue_size
+        self.urgent = []
+        self.digest = []
+        self.cond = threading.Condition()
+        self.server = None
+        self.last_used = 0.0
+        self.worker = None
+        self.sending = False
+        self.flushing = 0
+        self.closed = False
+        # 통계
+        self.sent = 0
+        self.digests = 0
+        self.connects = 0
+        self.dropped = 0
+        self.failed = 0
+        atexit.register(self.close)
+
+    def send(self, subject, body, urgent=False):
+        # 큐에 넣고 바로 반환, 버려지면 False
+        with self.cond:
+            if self.closed:
+                return False
+            if len(self.urgent) + len(self.digest) >= self.queue_size:
+                self.dropped += 1
+                if not self.digest:
+                    return False
+                self.digest.pop(0)
+            (self.urgent if urgent else self.digest).append((time.time(), subject, body))
+            if self.worker is None:
+                self.worker = threading.Thread(target=self._run, name="email-alert", daemon=True)
+                self.worker.start()
+            self.cond.notify()
+        return True
+
+    # --- SMTP 연결 ---
+
+    def _connect(self):
+        if self.security == "ssl":
+            server = smtplib.SMTP_SSL(self.smtp_server, self.smtp_port, timeout=SMTP_TIMEOUT)
+        else:
+            server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=SMTP_TIMEOUT)
+            if self.security == "starttls":
+                server.starttls()
+        if self.password:
+            server.login(self.user, self.password)
+        self.connects += 1
+        return server
+
+    def _disconnect(self):
+        if self.server is not None:
+            try:
+                self.server.quit()
+            except (smtplib.SMTPException, OSError):
+                self.server.close()
+            self.server = None
 
-    def send(self, subject, body):
-        msg = MIMEText(body)
+    def _connection(self):
+        # 유지 중인 연결 반환 (오래 쉬었으면 NOOP 확인, 끊겼으면 새로 연결)
+        if self.server is not None and time.monotonic() - self.last_used > NOOP_AFTER:
+            try:
+                if self.server.noop()[0] != 250:
+                    raise smtplib.SMTPServerDisconnected("NOOP 실패")
+            except (smtplib.SMTPException, OSError):
+                self._disconnect()
+        if self.server is None:
+            self.server = self._connect()
+        return self.server
+
+    def _deliver(self, subject, body):
+        msg = MIMEText(body, _charset="utf-8")
         msg['Subject'] = subject
         msg['From'] = self.user
         msg['To'] = self.to_email
+        msg['Date'] = formatdate(localtime=True)
+        for attempt in range(SEND_RETRIES + 1):
+            try:
+                self._connection().sendmail(self.user, self.to_email, msg.as_string())
+                self.last_used = time.monotonic()
+                return True
+            except (smtplib.SMTPException, OSError) as e:
+                print(f"[메일] 전송 실패 ({attempt + 1}/{SEND_RETRIES + 1}): {e}")
+                self._disconnect()
+                if attempt < SEND_RETRIES:
+                    time.sleep(2 ** attempt)
+        return False
 
-        with smtplib.SMTP_SSL(self.smtp_server, self.smtp_port) as server:
-            server.login(self.user, self.password)
-            server.sendmail(self.user, self.to_email, msg.as_string())
\ No newline at end of file
+    # --- 백그라운드 전송 ---
+
+    @staticmethod
+    def format_digest(items):
+        lines = []
+        for t, subject, body in items:
+            lines.append(f"[{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(t))}] {subject}")
+            if body:
+                lines.append(body)
+            lines.append("")
+        return "\n".join(lines)
+
+    def _next_job(self):
+        # (제목, 본문, 알림 수, 요약 여부) 또는 None (cond 잠금 상태에서 호출)
+        if self.urgent:
+            _, subject, body = self.urgent.pop(0)
+            return subject, body, 1, False
+        if self.digest and (self.flushing or self.closed
+                            or time.time() - self.digest[0][0] >= self.digest_interval):
+            items = self.digest[:DIGEST_MAX_ITEMS]
+            del self.digest[:DIGEST_MAX_ITEMS]
+            if len(items) == 1:
+                return items[0][1], items[0][2], 1, False
+            return f"[알림 요약] {len(items)}건", self.format_digest(items), len(items), True
+        return None
+
+    def _run(self):
+        while True:
+            with self.cond:
+                job = self._next_job()
+                while job is None:
+                    if self.closed:
+                        self._disconnect()
+                        return
+                    # 다음 요약 시각까지 대기 (새 알림/flush/close 시 깨어남)
+                    timeout = self.digest[0][0] + self.digest_interval - time.time() if self.digest else None
+                    self.cond.wait(timeout)
+                    job = self._next_job()
+                self.sending = True
+            subject, body, count, is_digest = job
+            try:
+                if self._deliver(subject, body):
+                    self.sent += count
+                    self.digests += is_digest
+                else:
+                    self.failed += count
+            finally:
+                with self.cond:
+                    self.sending = False
+                    self.cond.notify_all()
+
+    def flush(self, timeout=None):
+        # 요약 대기 중인 알림까지 모두 보낼 때까지 대기 (timeout 초 후 포기), 모두 보냈으면 True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.cond:
+            self.flushing += 1
+            self.cond.notify_all()
+            try:
+                while (self.urgent or self.digest or self.sending) and self.worker is not None:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self.cond.wait(remaining)
+                return not (self.urgent or self.digest)
+            finally:
+                self.flushing -= 1
+
+    def close(self, timeout=FLUSH_TIMEOUT):
+        # 새 알림 받지 않고 남은 알림(요약 포함) 전송 후 연결 종료
+        with self.cond:
+            if self.closed:
+                return
+            self.closed = True
+            self.cond.notify_all()
+        if self.worker is not None:
+            self.worker.join(timeout)
+            if self.worker.is_alive():
+                print(f"[메일] 종료 시 미전송 {len(self.urgent) + len(self.digest)}건")
+
+    def stats(self):
+        with self.cond:
+            return {
+                "pending": len(self.urgent) + len(self.digest),
+                "sent": self.sent,
+                "digests": self.digests,
+                "connects": self.connects,
+                "dropped": self.dropped,
+                "failed": self.failed,
+            }
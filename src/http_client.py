@@ -0,0 +1,123 @@
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from rate_limiter import get_limiter
+
+try:
+    import httpx  # 선택: HTTP/2, 비동기 클라이언트
+except ImportError:
+    httpx = None
+
+UPBIT_API_URL = "https://api.upbit.com"
+
+# 커넥션 풀 크기 (동시 스캔 스레드 수 이상)
+POOL_SIZE = 20
+
+# 엔드포인트 그룹별 타임아웃 (연결, 응답) 초
+TIMEOUTS = {
+    "quotation": (3, 5),   # 시세/캔들/마켓 조회
+    "exchange": (3, 10),   # 잔고/주문 조회
+    "order": (3, 10),      # 주문 생성/취소
+}
+
+# 429(요청 한도 초과) 응답 시 재시도 횟수
+RATE_LIMIT_RETRIES = 2
+
+# UPBIT_HTTP2=1 이고 httpx[http2]가 설치되어 있으면 HTTP/2 사용
+USE_HTTP2 = os.getenv("UPBIT_HTTP2", "0") == "1" and httpx is not None
+
+# 전송 계층 예외 (requests / httpx 공통 처리용)
+TRANSPORT_ERRORS = (requests.RequestException,) + ((httpx.HTTPError,) if httpx else ())
+
+_lock = threading.Lock()
+_session = None
+_async_client = None
+
+
+def endpoint_group(url, method="GET"):
+    # URL/메서드로 엔드포인트 그룹 판별
+    if "/v1/orders" in url and method.upper() in ("POST", "DELETE"):
+        return "order"
+    if "/v1/accounts" in url or "/v1/order" in url:
+        return "exchange"
+    return "quotation"
+
+
+def _create_session():
+    if USE_HTTP2:
+        limits = httpx.Limits(max_connections=POOL_SIZE, max_keepalive_connections=POOL_SIZE)
+        return httpx.Client(http2=True, limits=limits, headers={"Accept": "application/json"})
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Accept": "application/json"})
+    return session
+
+
+def get_session():
+    """
+    프로세스 공용 HTTP 세션 (keep-alive 커넥션 풀)
+    - 기본: requests.Session, UPBIT_HTTP2=1 이면 httpx HTTP/2 클라이언트
+    """
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                _session = _create_session()
+    return _session
+
+
+def request(method, url, group=None, timeout=None, **kwargs):
+    """
+    공용 세션으로 요청
+    - 그룹별 기본 타임아웃 적용
+    - 그룹별 요청 한도(rate_limiter)를 지키도록 대기, 429 응답 시 한도 보정 후 재시도
+    """
+    group = group or endpoint_group(url, method)
+    if timeout is None:
+        timeout = TIMEOUTS[group]
+    if USE_HTTP2 and isinstance(timeout, tuple):
+        timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+    limiter = get_limiter()
+    for attempt in range(RATE_LIMIT_RETRIES + 1):
+        limiter.acquire(group)
+        res = get_session().request(method, url, timeout=timeout, **kwargs)
+        limiter.update(group, res)
+        if res.status_code != 429:
+            break
+    return res
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+
+def get_async_client():
+    """
+    비동기 HTTP 클라이언트 (httpx.AsyncClient, 이벤트 루프에서 공유)
+    - httpx 미설치 시 RuntimeError
+    """
+    global _async_client
+    if httpx is None:
+        raise RuntimeError("비동기 클라이언트를 쓰려면 httpx를 설치하세요. (pip install httpx[http2])")
+    if _async_client is None:
+        limits = httpx.Limits(max_connections=POOL_SIZE, max_keepalive_connections=POOL_SIZE)
+        _async_client = httpx.AsyncClient(http2=USE_HTTP2, limits=limits, headers={"Accept": "application/json"})
+    return _async_client
+
+
+def close():
+    # 커넥션 풀 정리
+    global _session
+    with _lock:
+        if _session is not None:
+            _session.close()
+            _session = None
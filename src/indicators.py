@@ -0,0 +1,83 @@
+import numpy as np
+
+# RSI 기준값 (UpbitBot.trade 기존 공식과 동일)
+RSI_OVERSOLD = 30
+RSI_MIN_COUNT = 14
+
+
+def compute_indicators(close, value, buy_price=None):
+    """
+    전체 종목 지표를 한 번에 계산 (벡터화)
+    - close, value: (종목 수 × 일수) 종가/거래대금 행렬, 열은 과거→최근 순
+      (실매매는 최근 30일, 백테스트는 close[:, t-29:t+1] 처럼 잘라서 사용)
+    - buy_price: 종목별 매수가 배열 (없으면 NaN), 트레일링 스탑 판단용
+    반환: 지표명 → 종목별 배열 dict
+    """
+    close = np.asarray(close, dtype=float)
+    value = np.asarray(value, dtype=float)
+    price_now = close[:, -1]
+    price_old = close[:, 0]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ret = (price_now - price_old) / price_old
+        volatility = close.std(axis=1, ddof=1)
+        avg_vol = value.mean(axis=1)
+
+        # 이동평균 (MA5, MA20)
+        ma5 = close[:, -5:].mean(axis=1)
+        ma20 = close[:, -20:].mean(axis=1)
+
+        # 볼린저밴드 (20일)
+        bb_std = close[:, -20:].std(axis=1, ddof=1)
+        bb_upper = ma20 + 2 * bb_std
+        bb_lower = ma20 - 2 * bb_std
+
+        # RSI: 상승/하락 일수가 14일 미만이면 0.0001로 대체 (기존 공식 유지)
+        deltas = np.diff(close, axis=1)
+        gain_sum = np.where(deltas > 0, deltas, 0).sum(axis=1)
+        loss_sum = np.where(deltas < 0, -deltas, 0).sum(axis=1)
+        avg_gain = np.where((deltas > 0).sum(axis=1) >= RSI_MIN_COUNT, gain_sum / 14, 0.0001)
+        avg_loss = np.where((deltas < 0).sum(axis=1) >= RSI_MIN_COUNT, loss_sum / 14, 0.0001)
+        rs = np.where(avg_loss != 0, avg_gain / avg_loss, 0)
+        rsi = 100 - (100 / (1 + rs))
+
+        # 트레일링 스탑(10% 이상 수익 후 고점 대비 5% 하락)
+        if buy_price is None:
+            trailing_stop = np.zeros(len(close), dtype=bool)
+        else:
+            buy_price = np.asarray(buy_price, dtype=float)
+            has_buy = ~np.isnan(buy_price) & (buy_price != 0)
+            highest = close.max(axis=1)
+            trailing_stop = has_buy & (price_now > buy_price * 1.10) & (price_now < highest * 0.95)
+
+        # 고급 스코어
+        score = (
+            ret * 0.4 +  # 수익률
+            ((ma5 - ma20) / ma20) * 0.2 +  # 단기/장기 이동평균 갭
+            (rsi < RSI_OVERSOLD) * 0.1 +  # 과매도 신호
+            (price_now < bb_lower) * 0.1 +  # 볼린저밴드 하단 돌파
+            (avg_vol / 1e9) * 0.1 -  # 거래량
+            np.where(ret != 0, volatility / np.abs(ret), 0) * 0.1  # 변동성
+        )
+
+    return {
+        "return": ret,
+        "volatility": volatility,
+        "avg_vol": avg_vol,
+        "rsi": rsi,
+        "ma5": ma5,
+        "ma20": ma20,
+        "bb_upper": bb_upper,
+        "bb_lower": bb_lower,
+        "score": score,
+        "trailing_stop": trailing_stop,
+    }
+
+
+def indicator_records(markets, indicators):
+    # compute_indicators 결과를 종목별 dict 리스트로 변환 (UpbitBot.trade 레코드 형식)
+    columns = {k: v.tolist() for k, v in indicators.items()}
+    return [
+        {"market": market, **{k: columns[k][i] for k in columns}}
+        for i, market in enumerate(markets)
+    ]
@@ -1,69 +1,181 @@
-import pandas as pd
+import argparse
+import os
+
 import numpy as np
-from datetime import timedelta
+import pandas as pd
 
-# 샘플 거래내역 데이터 (실제는 trade_history.csv 사용)
-df = pd.read_csv("trade_history.csv")
+from trade_journal import TradeJournal, TRADE_DB_PATH, TRADE_CSV_PATH
 
 # 렌딩 이자율(연 5% 가정, 일 단위 환산)
 LENDING_RATE = 0.05 / 365
 LENDING_DAYS = 7  # 렌딩 기간(일)
 
-# 전략 시뮬레이션 결과 저장
-results = []
-
-# 코인별로 매수-매도 쌍 찾기
-for market in df['market'].unique():
-    coin_df = df[df['market'] == market].sort_values('datetime')
-    buys = coin_df[coin_df['type'] == 'buy']
-    sells = coin_df[coin_df['type'] == 'sell']
-    for idx, buy in buys.iterrows():
-        # 렌딩 만기일 계산
-        buy_time = pd.to_datetime(buy['datetime'])
-        lend_end = buy_time + timedelta(days=LENDING_DAYS)
-        # 해당 매수 이후 첫 매도 찾기
-        sell = sells[sells['datetime'] > buy['datetime']].head(1)
-        if not sell.empty:
-            sell = sell.iloc[0]
-            sell_time = pd.to_datetime(sell['datetime'])
-            # 실제 보유기간(렌딩기간과 매도시점 중 짧은 쪽)
-            hold_days = min((sell_time - buy_time).days, LENDING_DAYS)
-            # 렌딩 이자 계산
-            lending_profit = float(buy['amount']) * LENDING_RATE * hold_days
-            # 시세차익 계산
-            price_profit = (float(sell['price']) - float(buy['price'])) * float(buy['volume'])
-            total_profit = price_profit + lending_profit
-            results.append({
-                'market': market,
-                'buy_time': buy['datetime'],
-                'sell_time': sell['datetime'],
-                'hold_days': hold_days,
-                'price_profit': price_profit,
-                'lending_profit': lending_profit,
-                'total_profit': total_profit
-            })
-
-# 결과 DataFrame
-result_df = pd.DataFrame(results)
-print("\n[코인빌리기 전략 시뮬레이션 결과]")
-print(result_df)
-print("\n총 수익(시세차익+이자):", result_df['total_profit'].sum())
-
-# 누적 수익 그래프 (옵션)
-try:
-    import matplotlib.pyplot as plt
-    result_df['cum_profit'] = result_df['total_profit'].cumsum()
-    result_df['sell_time'] = pd.to_datetime(result_df['sell_time'])
-    plt.plot(result_df['sell_time'], result_df['cum_profit'])
+TRADE_COLUMNS = ['datetime', 'type', 'market', 'amount', 'price', 'volume']
+
+
+def default_trade_path():
+    # 거래 기록 DB 가 있으면 DB, 없으면 기존 CSV
+    return TRADE_DB_PATH if os.path.exists(TRADE_DB_PATH) else TRADE_CSV_PATH
+
+
+def load_trades(path=None, start=None, end=None, market=None):
+    """
+    거래내역 로드 (.db: 거래 기록 DB 에서 기간/종목 조건만 조회, 그 외: CSV)
+    - result 컬럼은 읽지 않음, datetime 파싱, amount/price/volume 숫자 변환
+    - volume 이 비어 있으면 amount / price 로 계산
+    """
+    path = path or default_trade_path()
+    if path.endswith('.db'):
+        journal = TradeJournal(path)
+        try:
+            df = journal.query(start, end, market, columns=TRADE_COLUMNS)
+        finally:
+            journal.close()
+    else:
+        df = pd.read_csv(path, usecols=lambda c: c in TRADE_COLUMNS)
+    return prepare_trades(df)
+
+
+def prepare_trades(df):
+    df = df.copy()
+    df['datetime'] = pd.to_datetime(df['datetime'])
+    for col in ('amount', 'price', 'volume'):
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    df['volume'] = df['volume'].fillna(df['amount'] / df['price'])
+    return df.sort_values('datetime', kind='stable').reset_index(drop=True)
+
+
+def pair_next_sell(trades):
+    """
+    매수마다 같은 종목의 다음 매도(매수 시각 이후 첫 매도)와 짝짓기 (merge_asof)
+    - 여러 매수가 같은 매도와 짝지어질 수 있음, 이후 매도가 없는 매수는 제외
+    반환: market, buy_time, sell_time, buy_price, sell_price, volume, amount
+    """
+    buys = trades.loc[trades['type'] == 'buy', ['datetime', 'market', 'amount', 'price', 'volume']]
+    sells = trades.loc[trades['type'] == 'sell', ['datetime', 'market', 'price']]
+    sells = sells.assign(sell_time=sells['datetime'])
+    pairs = pd.merge_asof(buys, sells, on='datetime', by='market', direction='forward',
+                          allow_exact_matches=False, suffixes=('', '_sell'))
+    pairs = pairs.dropna(subset=['sell_time'])
+    return pd.DataFrame({
+        'market': pairs['market'].to_numpy(),
+        'buy_time': pairs['datetime'].to_numpy(),
+        'sell_time': pairs['sell_time'].to_numpy(),
+        'buy_price': pairs['price'].to_numpy(),
+        'sell_price': pairs['price_sell'].to_numpy(),
+        'volume': pairs['volume'].to_numpy(),
+        'amount': pairs['amount'].to_numpy(),
+    })
+
+
+def pair_fifo(trades):
+    """
+    종목별 FIFO 로트 매칭 (먼저 산 수량부터 매도 수량에 배분)
+    - 누적 매수/매도 수량 구간이 겹치는 부분을 체결 조각으로 계산 (반복문은 종목 단위만)
+    - 매도되지 않은 잔량은 제외 (매도 누적 수량이 그 시점 매수 누적 수량을 넘지 않는다고 가정)
+    반환: pair_next_sell 과 같은 컬럼 (volume/amount 는 조각 수량/매수 금액)
+    """
+    frames = []
+    for market, group in trades.groupby('market', sort=False):
+        buys = group[group['type'] == 'buy']
+        sells = group[group['type'] == 'sell']
+        if buys.empty or sells.empty:
+            continue
+        buy_cum = np.cumsum(buys['volume'].to_numpy())
+        sell_cum = np.cumsum(sells['volume'].to_numpy())
+        total = min(buy_cum[-1], sell_cum[-1])
+        # 구간 경계: 누적 매수/매도 수량의 합집합
+        edges = np.unique(np.concatenate([[0.0], buy_cum, sell_cum]))
+        edges = edges[edges <= total]
+        lo, hi = edges[:-1], edges[1:]
+        size = hi - lo
+        keep = size > 0
+        lo, size = lo[keep], size[keep]
+        b = np.searchsorted(buy_cum, lo, side='right')
+        s = np.searchsorted(sell_cum, lo, side='right')
+        buy_price = buys['price'].to_numpy()[b]
+        frames.append(pd.DataFrame({
+            'market': market,
+            'buy_time': buys['datetime'].to_numpy()[b],
+            'sell_time': sells['datetime'].to_numpy()[s],
+            'buy_price': buy_price,
+            'sell_price': sells['price'].to_numpy()[s],
+            'volume': size,
+            'amount': size * buy_price,
+        }))
+    if not frames:
+        return pd.DataFrame(columns=['market', 'buy_time', 'sell_time', 'buy_price', 'sell_price', 'volume', 'amount'])
+    return pd.concat(frames, ignore_index=True)
+
+
+def lending_analysis(pairs, rate=LENDING_RATE, lending_days=LENDING_DAYS):
+    """
+    짝지은 매수/매도별 렌딩 이자, 보유기간, 시세차익 (벡터 연산)
+    - hold_days: 보유 일수(내림)와 렌딩 기간 중 짧은 쪽
+    - lending_profit = 매수 금액 × 일 이자율 × hold_days
+    """
+    result = pairs.copy()
+    held = pd.to_datetime(result['sell_time']) - pd.to_datetime(result['buy_time'])
+    result['hold_period'] = held
+    result['hold_days'] = np.minimum(held.dt.days, lending_days)
+    result['lending_profit'] = result['amount'] * rate * result['hold_days']
+    result['price_profit'] = (result['sell_price'] - result['buy_price']) * result['volume']
+    result['total_profit'] = result['price_profit'] + result['lending_profit']
+    return result
+
+
+def summarize(result):
+    # 종목별 합계/평균 보유기간
+    return result.groupby('market').agg(
+        trades=('total_profit', 'size'),
+        price_profit=('price_profit', 'sum'),
+        lending_profit=('lending_profit', 'sum'),
+        total_profit=('total_profit', 'sum'),
+        avg_hold_days=('hold_period', lambda x: x.mean().total_seconds() / 86400),
+    ).sort_values('total_profit', ascending=False)
+
+
+def run(path=None, method='next', rate=LENDING_RATE, lending_days=LENDING_DAYS, start=None, end=None):
+    trades = load_trades(path, start, end)
+    pairs = pair_fifo(trades) if method == 'fifo' else pair_next_sell(trades)
+    return lending_analysis(pairs, rate, lending_days)
+
+
+def plot(result):
+    try:
+        import matplotlib.pyplot as plt
+    except ImportError:
+        return
+    ordered = result.sort_values('sell_time')
+    plt.plot(ordered['sell_time'], ordered['total_profit'].cumsum())
     plt.title('누적 수익(코인빌리기 전략)')
     plt.xlabel('날짜')
     plt.ylabel('누적 수익')
     plt.show()
-except ImportError:
-    pass
-
-# 사용법 안내
-print("\n[사용법]")
-print("1. trade_history.csv에 거래내역을 기록하세요.")
-print("2. lending_backtest.py를 실행하면 코인빌리기 전략의 누적 수익을 시뮬레이션합니다.")
-print("3. 실제 자동매매에 적용하려면, 매수 후 업비트 렌딩 API(또는 수동 신청)를 호출하면 됩니다.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="코인빌리기(렌딩) 전략 거래내역 분석")
+    parser.add_argument('--path', help="거래 기록 DB(.db) 또는 CSV (기본: trades.db, 없으면 trade_history.csv)")
+    parser.add_argument('--start', help="조회 시작 (DB 만, 'YYYY-MM-DD')")
+    parser.add_argument('--end', help="조회 끝, 미포함 (DB 만)")
+    parser.add_argument('--method', choices=['next', 'fifo'], default='next',
+                        help="next: 매수 후 첫 매도와 짝짓기, fifo: 수량 기준 선입선출")
+    parser.add_argument('--annual-rate', type=float, default=LENDING_RATE * 365, help="렌딩 연 이자율")
+    parser.add_argument('--days', type=int, default=LENDING_DAYS, help="렌딩 기간(일)")
+    parser.add_argument('--plot', action='store_true', help="누적 수익 그래프 표시")
+    args = parser.parse_args()
+
+    result = run(args.path, args.method, args.annual_rate / 365, args.days, args.start, args.end)
+    print("\n[코인빌리기 전략 시뮬레이션 결과]")
+    print(result[['market', 'buy_time', 'sell_time', 'hold_days', 'price_profit', 'lending_profit', 'total_profit']])
+    if not result.empty:
+        print("\n[종목별 합계]")
+        print(summarize(result))
+    print("\n총 수익(시세차익+이자):", result['total_profit'].sum())
+    if args.plot and not result.empty:
+        plot(result)
+
+
+if __name__ == '__main__':
+    main()
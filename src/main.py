@@ -32,17 +32,24 @@ import os
 from dotenv import load_dotenv
 from upbit_api import UpbitAPI
 from strategy import simple_monthly_target_strategy
-from portfolio import get_krw_markets, get_monthly_returns, select_portfolio
+from portfolio import get_krw_markets, get_monthly_returns, select_portfolio, evaluate_balances
+from market_scanner import scan_markets, SCAN_MAX_WORKERS
+from candle_store import get_default_store
+from upbit_websocket import UpbitWebSocketFeed, PRICE_MAX_AGE
+from trade_journal import get_default_journal
+from state_store import CoinStateStore, COIN_STATE_PATH, load_states, atomic_write_json
+from scheduler import Scheduler, PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW
+from order_tracker import OrderTracker, ORDER_POLL_INTERVAL
 import statistics
+import threading
 import time
 import math
 import datetime
 import requests
-from telegram_alert import TelegramAlert
+from telegram_alert import TelegramAlert, PRIORITY_CRITICAL, PRIORITY_ORDER
 import json
 from flask import Flask, render_template
 
-import csv
 import streamlit as st
 
 # 환경변수 로드
@@ -66,27 +73,34 @@ MIN_EXPECTED_PROFIT = 0.003
 # 1일 최대 매매 횟수 제한 (제한 없음)
 MAX_TRADES_PER_DAY = float('inf')
 
-state_path = "coin_states.json"
+state_path = COIN_STATE_PATH
+
+# 작업별 실행 주기(초) (BOT_SCHEDULER=0 이면 기존처럼 trade() 반복)
+USE_SCHEDULER = os.getenv("BOT_SCHEDULER", "1") == "1"
+SCAN_INTERVAL = 300          # 전체 종목 스캔/포트폴리오 매수
+RISK_CHECK_INTERVAL = 1      # 보유 종목 손절/트레일링 스탑 (시세 수신 시에도 실행)
+BALANCE_INTERVAL = 30        # 잔고 갱신
+STATE_FLUSH_INTERVAL = 60    # 코인 상태 스냅샷 저장
+SCHEDULER_REPORT_INTERVAL = 600
+
+# 보유 종목 보호 매도 기준
+STOP_LOSS_RATE = 0.05        # 매수가 대비 -5% 손절
+TRAILING_ACTIVATE = 0.03     # 매수가 대비 +3% 이상 오른 뒤부터 트레일링 스탑 적용
+TRAILING_STOP_RATE = 0.02    # 최고가 대비 -2% 하락 시 매도
 
 app = Flask(__name__, template_folder='templates')
 
 @app.route('/')
 def status():
-    state_path = os.path.join(os.path.dirname(__file__), "coin_states.json")
-    with open(state_path) as f:
-        coin_states = json.load(f)
+    coin_states = load_states(COIN_STATE_PATH)
     return render_template("status.html", coin_states=coin_states)
 
 def load_coin_states():
-    try:
-        with open(state_path, "r") as f:
-            return json.load(f)
-    except Exception:
-        return {}
+    # 스냅샷 + 저널 (봇 실행 중에는 self.state_store 사용)
+    return load_states(state_path)
 
 def save_coin_states(states):
-    with open(state_path, "w") as f:
-        json.dump(states, f, ensure_ascii=False, indent=2)
+    atomic_write_json(state_path, states, indent=2)
 
 def simple_monthly_target_strategy(balance, ticker, trading_fee, exchange_fee):
     """
@@ -125,7 +139,7 @@ def safe_api_call(func, *args, **kwargs):
 def check_order_status(api, uuid):
     # 업비트 주문 조회 API 사용
     order = safe_api_call(api.get_order, uuid)
-    if order is None:
+    if not isinstance(order, dict) or 'state' not in order:
         return "unknown"
     if order['state'] == 'done':
         return "filled"
@@ -139,13 +153,8 @@ def check_order_status(api, uuid):
 
 
 def save_trade_history(row):
-    file_path = os.path.join(os.path.dirname(__file__), "trade_history.csv")
-    file_exists = os.path.isfile(file_path)
-    with open(file_path, "a", newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=row.keys())
-        if not file_exists:
-            writer.writeheader()
-        writer.writerow(row)
+    # 거래 기록 저장 (trades.db, 기존 CSV 는 trade_journal.py export 로 생성)
+    get_default_journal().append(row)
 
 class UpbitBot:
     def __init__(self):
@@ -159,7 +168,20 @@ class UpbitBot:
         if TELEGRAM_TOKEN and TELEGRAM_CHAT_ID:
             self.tg = TelegramAlert(TELEGRAM_TOKEN, TELEGRAM_CHAT_ID)
         
-        self.coin_states = load_coin_states()  # ← 이 줄을 추가하세요
+        # 코인 상태는 메모리에 두고 변경분만 저널에 기록
+        self.state_store = CoinStateStore(state_path)
+        self.coin_states = self.state_store.states
+        self.candle_store = get_default_store()  # 캔들 로컬 저장소 (새 캔들만 조회)
+        self.price_feed = UpbitWebSocketFeed().start()  # 보유 코인 실시간 시세
+        # 주문 체결 추적 (체결 확인 후 실제 평균 체결가로 코인 상태/거래 기록 반영)
+        self.order_tracker = OrderTracker(self.api, self.state_store, record=lambda row: save_trade_history(row),
+                                          on_finish=self.release_exit)
+        self.balances = []  # 마지막 잔고 (balance 작업이 갱신)
+        self.peak_prices = {}  # 종목별 보유 중 최고가 (트레일링 스탑)
+        self.exiting = {}  # 매도 주문 중인 종목 -> 주문 uuid (주문이 끝날 때까지 다른 작업이 다시 매도하지 않음)
+        self.exit_lock = threading.Lock()
+        self.scan_paused_until = 0
+        self.scheduler = None
 
         param_path = os.path.join(os.path.dirname(__file__), "strategy_params.json")
         if os.path.exists(param_path):
@@ -174,10 +196,160 @@ class UpbitBot:
             TOP_N = 5
 
     def run(self):
-        while True:
-            self.trade()
+        if not USE_SCHEDULER:
+            while True:
+                self.trade()
+        self.scheduler = self.build_scheduler()
+        self.scheduler.run_forever()
+
+    def build_scheduler(self):
+        """
+        작업별 주기/우선순위 스케줄러 구성
+        - risk(HIGH): 보유 종목 손절/트레일링 스탑, 1초마다 + 보유 종목 시세 수신 시
+        - scan(NORMAL): trade() 1회 (전체 스캔/매수), 스캔이 늦어져도 risk 는 별도 스레드에서 계속
+        - orders(NORMAL): 추적 중인 주문 체결 확인 (ORDER_POLL_INTERVAL 마다 일괄 조회)
+        - balance / state(LOW): 잔고 갱신, 상태 스냅샷 저장
+        """
+        scheduler = Scheduler(report_interval=SCHEDULER_REPORT_INTERVAL)
+        scheduler.add("risk", self.check_positions, RISK_CHECK_INTERVAL, PRIORITY_HIGH, min_gap=0.2)
+        scheduler.add("scan", self.scan, SCAN_INTERVAL, PRIORITY_NORMAL)
+        scheduler.add("orders", self.poll_orders, ORDER_POLL_INTERVAL, PRIORITY_NORMAL)
+        scheduler.add("balance", self.refresh_balances, BALANCE_INTERVAL, PRIORITY_LOW)
+        scheduler.add("state", self.flush_state, STATE_FLUSH_INTERVAL, PRIORITY_LOW, run_at_start=False)
+
+        def on_price(market, price):
+            if market in self.peak_prices:
+                scheduler.trigger("risk")
+        self.price_feed.add_listener(on_price)
+        return scheduler
+
+    def refresh_balances(self):
+        balances = safe_api_call(self.api.get_balance)
+        if balances is None:
+            return
+        self.balances = balances
+        held = [f"KRW-{b['currency']}" for b in balances if b['currency'] != 'KRW' and float(b['balance']) > 0]
+        self.clear_exits(held)
+        self.price_feed.subscribe(held)
+        for market in held:
+            self.peak_prices.setdefault(market, 0.0)
+        for market in list(self.peak_prices):
+            if market not in held:
+                del self.peak_prices[market]
+
+    def check_positions(self):
+        """
+        보유 종목 보호 매도 (실시간 시세 기준)
+        - 매수가 대비 STOP_LOSS_RATE 하락 시 손절
+        - 매수가 대비 TRAILING_ACTIVATE 이상 오른 뒤 최고가 대비 TRAILING_STOP_RATE 하락 시 매도
+        - 매수가: 코인 상태의 buy_price, 없으면 잔고의 평균 매수가
+        """
+        for b in self.balances:
+            if b['currency'] == 'KRW' or float(b['balance']) <= 0:
+                continue
+            market = f"KRW-{b['currency']}"
+            price = self.price_feed.get_price(market, max_age=PRICE_MAX_AGE)
+            state = self.coin_states.get(market) or {}
+            buy_price = float(state.get("buy_price") or b.get('avg_buy_price') or 0)
+            if not price or buy_price <= 0:
+                continue
+            peak = max(self.peak_prices.get(market, 0.0), price)
+            self.peak_prices[market] = peak
+            if price <= buy_price * (1 - STOP_LOSS_RATE):
+                reason = f"손절 (매수가 {buy_price} 대비 {(price / buy_price - 1) * 100:.2f}%)"
+            elif peak >= buy_price * (1 + TRAILING_ACTIVATE) and price <= peak * (1 - TRAILING_STOP_RATE):
+                reason = f"트레일링 스탑 (최고가 {peak} 대비 {(price / peak - 1) * 100:.2f}%)"
+            else:
+                continue
+            volume = float(b['balance'])
+            sell_result = self.sell_all(market, volume)
+            if sell_result is None:
+                continue
+            msg = f"{market} : {reason}, 전량 매도 결과: {sell_result}"
+            print(msg)
+            if self.tg:
+                self.tg.send(msg, PRIORITY_ORDER)
+            self.record_order(market, "sell", price * volume, sell_result)
+            b['balance'] = "0"  # 다음 잔고 갱신 전까지 중복 매도 방지
+            self.peak_prices.pop(market, None)
+
+    def clear_exits(self, held):
+        # 잔고에서 빠진(매도 체결된) 종목은 주문 추적 결과를 기다리지 않고 exiting 에서 제거
+        with self.exit_lock:
+            for market in list(self.exiting):
+                if market not in held and self.exiting[market] is not None:
+                    del self.exiting[market]
+
+    def release_exit(self, uuid, market, side, state):
+        # OrderTracker on_finish: 매도 주문이 끝나면(done/cancel/expired) 그 종목을 다시 매도할 수 있게 함
+        # (일부 매도/취소로 코인이 남아도 이후 손절/트레일링 매도가 막히지 않음)
+        with self.exit_lock:
+            if market in self.exiting and self.exiting[market] == uuid:
+                del self.exiting[market]
+
+    def sell_all(self, market, volume):
+        """
+        시장가 매도 (종목당 주문 하나씩)
+        - risk 작업과 스캔이 각자 잔고 스냅샷으로 같은 종목을 동시에 매도하지 않도록 exiting 으로 막음
+        - 이미 매도 주문이 진행 중이면 주문 없이 None
+        - 주문이 끝나면(OrderTracker → release_exit) 또는 거절되면 exiting 에서 빠져 다시 매도 가능
+        """
+        with self.exit_lock:
+            if market in self.exiting:
+                print(f"[매도] {market} 이미 매도 주문 중, 건너뜀")
+                return None
+            self.exiting[market] = None  # 주문 응답 전
+        try:
+            result = self.api.sell_market_order(market, volume)
+        except Exception:
+            with self.exit_lock:
+                self.exiting.pop(market, None)
+            raise
+        with self.exit_lock:
+            if isinstance(result, dict) and "uuid" in result:
+                self.exiting[market] = result["uuid"]
+            else:
+                self.exiting.pop(market, None)
+        return result
+
+    def record_order(self, market, side, amount, result, **fields):
+        """
+        주문 직후 처리: 정상 응답은 OrderTracker 에 등록(order_status 'pending', 체결되면 tracker 가 반영)
+        오류 응답은 바로 거래 기록에 남기고 order_status 'rejected'
+        """
+        if self.order_tracker.track(result) is not None:
+            status = "pending"
+        else:
+            status = "rejected"
+            save_trade_history({
+                "datetime": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "type": side,
+                "market": market,
+                "amount": amount,
+                "price": None,
+                "volume": None,
+                "result": str(result)
+            })
+        self.state_store.update(market, order_status=status, **fields)
+
+    def poll_orders(self):
+        # 추적 중인 주문 체결 확인 (없으면 요청 안 함)
+        if self.order_tracker.pending():
+            safe_api_call(self.order_tracker.poll)
+
+    def flush_state(self):
+        # 코인 상태 저널을 스냅샷으로 합침 (쌓인 변경이 있을 때만)
+        if self.state_store.pending:
+            self.state_store.compact()
+
+    def scan(self):
+        # 스케줄러용 trade() 1회 (대기 없음), 손실 한도 전량 매도 후에는 10분간 쉼
+        if time.time() < self.scan_paused_until:
+            return
+        self.trade(pause=False)
+        self.refresh_balances()
 
-    def trade(self):
+    def trade(self, pause=True):
         param_path = os.path.join(os.path.dirname(__file__), "strategy_params.json")
         if os.path.exists(param_path):
             with open(param_path) as f:
@@ -185,10 +357,15 @@ class UpbitBot:
             MIN_EXPECTED_PROFIT = params.get("MIN_EXPECTED_PROFIT", 0.003)
             MAX_TRADES_PER_DAY = float('inf')
             TOP_N = params.get("TOP_N", 5)
+            SCAN_WORKERS = params.get("SCAN_MAX_WORKERS", SCAN_MAX_WORKERS)
         else:
             MIN_EXPECTED_PROFIT = 0.003
             MAX_TRADES_PER_DAY = float('inf')
             TOP_N = 5
+            SCAN_WORKERS = SCAN_MAX_WORKERS
+
+        # 이전 주문 체결 반영
+        self.poll_orders()
 
         # 1. 잔고조회에 예외처리 적용
         balances = safe_api_call(self.api.get_balance)
@@ -196,22 +373,18 @@ class UpbitBot:
             return
 
         # 2. 시세조회에 예외처리 적용
-        tickers = []
-        total_krw = 0.0
-        for b in balances:
-            if b['currency'] == 'KRW':
-                total_krw += float(b['balance'])
-            elif float(b['balance']) > 0:
-                tickers.append(f"KRW-{b['currency']}")
+        tickers = [f"KRW-{b['currency']}" for b in balances if b['currency'] != 'KRW' and float(b['balance']) > 0]
+        self.clear_exits(tickers)
+        prices = {}
         if tickers:
-            prices = safe_api_call(self.api.get_ticker, ",".join(tickers))
+            # 실시간 시세 우선, 하나라도 없으면 REST 일괄 조회(1회)
+            self.price_feed.subscribe(tickers)
+            prices = {t: self.price_feed.get_ticker(t, max_age=PRICE_MAX_AGE) for t in tickers}
+            if None in prices.values():
+                prices = safe_api_call(self.api.get_tickers, tickers)
             if prices is None:
                 return
-            if isinstance(prices, dict):
-                prices = [prices]
-            for b, t in zip(balances, prices):
-                if b['currency'] == t['market'].split('-')[1]:
-                    total_krw += float(b['balance']) * float(t['trade_price'])
+        total_krw = evaluate_balances(balances, prices)
 
         msg = f"[업비트 오토봇] 전체 평가금액(원화+코인): {total_krw:.2f} KRW"
         print(msg)
@@ -219,7 +392,8 @@ class UpbitBot:
             self.tg.send(msg)
         if total_krw < 5000:
             print("매수 가능한 평가금액이 부족합니다.")
-            time.sleep(60)
+            if pause:
+                time.sleep(60)
             return
 
         # 여기에 선언!
@@ -238,7 +412,7 @@ class UpbitBot:
             msg = "누적 손실 -10% 초과! 전체 자산 현금화(매도) 실행"
             print(msg)
             if self.tg:
-                self.tg.send(msg)
+                self.tg.send(msg, PRIORITY_CRITICAL)
             # 전체 코인 시장가 매도
             for b in balances:
                 if b['currency'] != 'KRW' and float(b['balance']) > 0:
@@ -246,89 +420,30 @@ class UpbitBot:
                     msg = f"시장가 전량매도: {market} {b['balance']}개"
                     print(msg)
                     if self.tg:
-                        self.tg.send(msg)
-                    sell_result = self.api.sell_market_order(market, float(b['balance']))
+                        self.tg.send(msg, PRIORITY_ORDER)
+                    sell_result = self.sell_all(market, float(b['balance']))
+                    if sell_result is None:
+                        continue
+                    self.record_order(market, "sell", None, sell_result)
                     msg = f"매도 결과: {sell_result}"
                     print(msg)
                     if self.tg:
-                        self.tg.send(msg)
+                        self.tg.send(msg, PRIORITY_ORDER)
             msg = "10분 후 재시작"
             print(msg)
             if self.tg:
-                self.tg.send(msg)
-            time.sleep(600)
+                self.tg.send(msg, PRIORITY_CRITICAL)
+            if pause:
+                time.sleep(600)
+            else:
+                self.scan_paused_until = time.time() + 600
             return
         # 포트폴리오 자동 선정 (시장 상황 필터, 변동성/거래량/시총 고려, 기술적지표, 리밸런싱, 코인빌려주기)
         print("KRW마켓 전체 종목 조회 중...")
         markets = get_krw_markets()
         print(f"종목 수: {len(markets)}개, 수익률/변동성/거래량/시장상황 계산 중...")
-        returns = []
+        returns = scan_markets(markets, self.coin_states, max_workers=SCAN_WORKERS, store=self.candle_store)
         rsi_targets = []
-        for market in markets:
-            # 30일 캔들 조회
-            url = f"https://api.upbit.com/v1/candles/days"
-            params = {"market": market, "count": 30}
-            res = requests.get(url, params=params)
-            candles = res.json()
-            if len(candles) < 30:
-                continue
-            prices = [c['trade_price'] for c in candles]
-            vols = [c['candle_acc_trade_price'] for c in candles]
-            price_30d_ago = prices[-1]
-            price_now = prices[0]
-            ret = (price_now - price_30d_ago) / price_30d_ago
-            volatility = statistics.stdev(prices)
-            avg_vol = statistics.mean(vols)
-
-            # 이동평균 (MA5, MA20)
-            ma5 = sum(prices[:5]) / 5
-            ma20 = sum(prices[:20]) / 20
-
-            # 볼린저밴드 (20일)
-            bb_ma = ma20
-            bb_std = statistics.stdev(prices[:20])
-            bb_upper = bb_ma + 2 * bb_std
-            bb_lower = bb_ma - 2 * bb_std
-
-            # RSI 계산
-            deltas = [prices[i] - prices[i+1] for i in range(len(prices)-1)]
-            gains = [d for d in deltas if d > 0]
-            losses = [-d for d in deltas if d < 0]
-            avg_gain = sum(gains)/14 if len(gains)>=14 else 0.0001
-            avg_loss = sum(losses)/14 if len(losses)>=14 else 0.0001
-            rs = avg_gain / avg_loss if avg_loss != 0 else 0
-            rsi = 100 - (100 / (1 + rs))
-
-            # 트레일링 스탑(예시: 10% 이상 수익 후 고점 대비 5% 하락 시 매도)
-            trailing_stop = False
-            if market in self.coin_states and self.coin_states[market]["buy_price"]:
-                buy_price = float(self.coin_states[market]["buy_price"])
-                highest = max(prices)
-                if price_now > buy_price * 1.10 and price_now < highest * 0.95:
-                    trailing_stop = True
-
-            # 고급 스코어 계산
-            score = (
-                ret * 0.4 +  # 수익률
-                ((ma5 - ma20) / ma20) * 0.2 +  # 단기/장기 이동평균 갭
-                (rsi < 30) * 0.1 +  # 과매도 신호
-                ((price_now < bb_lower) * 0.1) +  # 볼린저밴드 하단 돌파
-                (avg_vol/1e9) * 0.1 -  # 거래량
-                (volatility/abs(ret) if ret!=0 else 0) * 0.1  # 변동성
-            )
-            returns.append({
-                "market": market,
-                "return": ret,
-                "volatility": volatility,
-                "avg_vol": avg_vol,
-                "rsi": rsi,
-                "ma5": ma5,
-                "ma20": ma20,
-                "bb_upper": bb_upper,
-                "bb_lower": bb_lower,
-                "score": score,
-                "trailing_stop": trailing_stop
-            })
 
         # 전체 시장 평균 수익률로 하락장 필터링
         market_avg = statistics.mean([r['return'] for r in returns])
@@ -374,17 +489,8 @@ class UpbitBot:
                     msg = f"[반등신호] {t['market']} : {amount_per_coin} KRW 매수 시도 및 코인빌려주기(렌딩) 실행"
                     print(msg)
                     if self.tg:
-                        self.tg.send(msg)
+                        self.tg.send(msg, PRIORITY_ORDER)
                     buy_result = self.api.buy_market_order(t['market'], amount_per_coin)
-                    save_trade_history({
-                        "datetime": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                        "type": "buy",
-                        "market": t['market'],
-                        "amount": amount_per_coin,
-                        "price": buy_result.get("price") if isinstance(buy_result, dict) else None,
-                        "volume": buy_result.get("volume") if isinstance(buy_result, dict) else None,
-                        "result": str(buy_result)
-                    })
                     # --- 코인빌리기(렌딩) 자동화 예시 ---
                     # 실제 업비트 렌딩 API가 있다면 아래처럼 호출
                     # self.api.lend_coin(t['market'], amount_per_coin, lend_ratio=0.8, period=7)
@@ -398,24 +504,11 @@ class UpbitBot:
                     msg = f"실제 매수 결과: {buy_result}"
                     print(msg)
                     if self.tg:
-                        self.tg.send(msg)
-                    # 매수/매도 직후에 아래 코드 추가
-                    coin_states = load_coin_states()
+                        self.tg.send(msg, PRIORITY_ORDER)
+                    # 체결가/수량은 주문 추적으로 체결 확인 후 반영 (시장가 매수 응답의 price 는 주문 금액)
                     m = t['market']
-                    if m not in coin_states:
-                        coin_states[m] = {
-                            "buy_price": None,
-                            "bought_volume": 0,
-                            "last_trade_time": 0,
-                            "trade_count_today": 0,
-                            "order_status": ""
-                        }
-                    coin_states[m]["buy_price"] = buy_result.get("price") if isinstance(buy_result, dict) else None
-                    coin_states[m]["bought_volume"] = buy_result.get("volume") if isinstance(buy_result, dict) else None
-                    coin_states[m]["last_trade_time"] = now
-                    coin_states[m]["trade_count_today"] = trade_count_per_day[today][m]
-                    coin_states[m]["order_status"] = "filled"  # 실제 체결 상태로 변경 가능
-                    save_coin_states(coin_states)
+                    self.record_order(m, "buy", amount_per_coin, buy_result,
+                                      last_trade_time=now, trade_count_today=trade_count_per_day[today][m])
             else:
                 print("RSI 30 이하 반등 신호 종목 없음. 현금 대기.")
         else:
@@ -460,17 +553,8 @@ class UpbitBot:
                 msg = f"{p['market']} : {amount} KRW (최대비중 적용)"
                 print(msg)
                 if self.tg:
-                    self.tg.send(msg)
+                    self.tg.send(msg, PRIORITY_ORDER)
                 buy_result = self.api.buy_market_order(p['market'], amount)
-                save_trade_history({
-                    "datetime": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                    "type": "buy",
-                    "market": p['market'],
-                    "amount": amount,
-                    "price": buy_result.get("price") if isinstance(buy_result, dict) else None,
-                    "volume": buy_result.get("volume") if isinstance(buy_result, dict) else None,
-                    "result": str(buy_result)
-                })
                 # --- 코인빌리기(렌딩) 자동화 예시 ---
                 # 실제 업비트 렌딩 API가 있다면 아래처럼 호출
                 # self.api.lend_coin(p['market'], amount, lend_ratio=0.8, period=7)
@@ -484,31 +568,17 @@ class UpbitBot:
                 msg = f"실제 매수 결과: {buy_result}"
                 print(msg)
                 if self.tg:
-                    self.tg.send(msg)
-                # 매수/매도 직후에 아래 코드 추가
-                coin_states = load_coin_states()
+                    self.tg.send(msg, PRIORITY_ORDER)
+                # 체결가/수량은 주문 추적으로 체결 확인 후 반영 (시장가 매수 응답의 price 는 주문 금액)
                 m = p['market']
-                if m not in coin_states:
-                    coin_states[m] = {
-                        "buy_price": None,
-                        "bought_volume": 0,
-                        "last_trade_time": 0,
-                        "trade_count_today": 0,
-                        "order_status": ""
-                    }
-                coin_states[m]["buy_price"] = buy_result.get("price") if isinstance(buy_result, dict) else None
-                coin_states[m]["bought_volume"] = buy_result.get("volume") if isinstance(buy_result, dict) else None
-                coin_states[m]["last_trade_time"] = now
-                coin_states[m]["trade_count_today"] = trade_count_per_day[today][m]
-                coin_states[m]["order_status"] = "filled"  # 실제 체결 상태로 변경 가능
-                save_coin_states(coin_states)
+                self.record_order(m, "buy", amount, buy_result,
+                                  last_trade_time=now, trade_count_today=trade_count_per_day[today][m])
 
             # --- 메일/텔레그램 알림: 수익 발생(익절/매도) 시 ---
             buy_result = None
             try:
                 # 알림 메시지 생성 전에 coin_states가 항상 정의되도록 보장
-                if 'coin_states' not in locals():
-                    coin_states = load_coin_states()
+                coin_states = self.coin_states
                 subject = "[업비트 오토봇 알림] 수익실현/매도"
                 m = market
                 buy_price = None
@@ -532,20 +602,26 @@ class UpbitBot:
                 body += f"상세내역: {buy_result}"
                 # 메일 발송 코드 완전 삭제
                 if self.tg:
-                    self.tg.send(f"{subject}\n{body}")
+                    self.tg.send(f"{subject}\n{body}", PRIORITY_ORDER)
             except Exception as e:
                 print('[수익 알림 오류]', e)
             # 현재 보유 코인 목록
             current_holdings = [b['currency'] for b in balances if b['currency'] != 'KRW' and float(b['balance']) > 0]
-            coin_states = load_coin_states()  # ← UnboundLocalError 방지: 항상 정의
+            coin_states = self.coin_states
             # 새 포트폴리오에 없는 코인은 전량 매도
             for holding in current_holdings:
                 market = f"KRW-{holding}"
                 if market not in [p['market'] for p in portfolio]:
-                    buy_price = float(coin_states[market]["buy_price"])
-                    current_price = ... # 현재가 조회
-                    if current_price > buy_price * 1.05:
-                        amount = float([b for b in balances if b['currency'] == holding][0]['balance']) / 2
+                    balance = [b for b in balances if b['currency'] == holding][0]
+                    # 매수가: 코인 상태(체결 확인 후 기록), 없으면 잔고의 평균 매수가
+                    state = coin_states.get(market) or {}
+                    buy_price = float(state.get("buy_price") or balance.get('avg_buy_price') or 0)
+                    # 현재가: 실시간 시세, 없으면 위에서 조회한 시세
+                    current_price = self.price_feed.get_price(market, max_age=PRICE_MAX_AGE)
+                    if not current_price and prices.get(market):
+                        current_price = float(prices[market]['trade_price'])
+                    if current_price and buy_price > 0 and current_price > buy_price * 1.05:
+                        amount = float(balance['balance']) / 2
                         msg = f"{market} : 5% 이상 수익, 절반 익절"
                         # --- 메일/텔레그램 알림: 수익 발생 ---
                         subject = "[업비트 오토봇 알림] 수익실현/익절"
@@ -576,11 +652,11 @@ class UpbitBot:
                         # 메일 발송 코드 완전 삭제
                         try:
                             if self.tg:
-                                self.tg.send(f"{subject}\n{body}")
+                                self.tg.send(f"{subject}\n{body}", PRIORITY_ORDER)
                         except Exception as e:
                             print('[텔레그램] 수익 알림 실패:', e)
                     else:
-                        amount = float([b for b in balances if b['currency'] == holding][0]['balance'])
+                        amount = float(balance['balance'])
                         msg = f"{market} : 포트폴리오 제외, 전량 매도"
                         # --- 메일/텔레그램 알림: 포트폴리오 제외 매도 ---
                         subject = "[업비트 오토봇 알림] 포트폴리오 제외 매도"
@@ -611,18 +687,22 @@ class UpbitBot:
                         # 메일 발송 코드 완전 삭제
                         try:
                             if self.tg:
-                                self.tg.send(f"{subject}\n{body}")
+                                self.tg.send(f"{subject}\n{body}", PRIORITY_ORDER)
                         except Exception as e:
                             print('[텔레그램] 매도 알림 실패:', e)
                     # 매도 실행
-                    sell_result = self.api.sell_market_order(market, amount)
-                    msg = f"매도 결과: {sell_result}"
-                    print(msg)
-                    if self.tg:
-                        self.tg.send(msg)
+                    sell_result = self.sell_all(market, amount)
+                    if sell_result is not None:
+                        self.record_order(market, "sell", None, sell_result)
+                        msg = f"매도 결과: {sell_result}"
+                        print(msg)
+                        if self.tg:
+                            self.tg.send(msg, PRIORITY_ORDER)
             # 이후 새 포트폴리오 종목만 매수
-        print("1분 후 다시 확인합니다...\n")
-        time.sleep(60)
+        self.poll_orders()
+        if pause:
+            print("1분 후 다시 확인합니다...\n")
+            time.sleep(60)
 
 def select_portfolio(returns, total_krw, min_amount=5000, top_n=5):
     selected = []
@@ -668,6 +748,6 @@ if __name__ == "__main__":
         # 메일 발송 코드 완전 삭제
         try:
             if 'bot' in locals() and hasattr(bot, 'tg') and bot.tg:
-                bot.tg.send(f"[업비트 오토봇 오류/정지]\n{str(e)}")
+                bot.tg.send(f"[업비트 오토봇 오류/정지]\n{str(e)}", PRIORITY_CRITICAL)
         except Exception as e3:
             print('[텔레그램] 오류/정지 알림 실패:', e3)
@@ -0,0 +1,74 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from candle_store import fetch_candles
+from rate_limiter import get_limiter
+from indicators import compute_indicators, indicator_records
+
+# 동시 조회 스레드 수 (초당 요청 한도는 rate_limiter 의 quotation 버킷이 관리)
+SCAN_MAX_WORKERS = 8
+CANDLE_COUNT = 30
+
+
+def build_matrix(markets, all_candles, count=CANDLE_COUNT):
+    """
+    캔들 리스트(최신순)를 (종목 × 일수) 종가/거래대금 행렬로 변환 (열은 과거→최근 순)
+    - 캔들이 count개 미만인 종목은 제외
+    반환: (종목 리스트, 종가 행렬, 거래대금 행렬)
+    """
+    valid = []
+    closes = []
+    values = []
+    for market, candles in zip(markets, all_candles):
+        if not isinstance(candles, list) or len(candles) < count:
+            continue
+        window = candles[:count][::-1]
+        valid.append(market)
+        closes.append([c['trade_price'] for c in window])
+        values.append([c['candle_acc_trade_price'] for c in window])
+    return valid, np.array(closes, dtype=float).reshape(-1, count), np.array(values, dtype=float).reshape(-1, count)
+
+
+def calc_indicators(markets, all_candles, coin_states):
+    # 전체 종목 수익률/변동성/거래량/MA/볼린저밴드/RSI/스코어 일괄 계산
+    valid, close, value = build_matrix(markets, all_candles)
+    if not valid:
+        return []
+    buy_price = [
+        float(coin_states[m]["buy_price"]) if m in coin_states and coin_states[m]["buy_price"] else np.nan
+        for m in valid
+    ]
+    return indicator_records(valid, compute_indicators(close, value, buy_price))
+
+
+def fetch_all_candles(markets, max_workers=SCAN_MAX_WORKERS, store=None):
+    """
+    전체 종목 캔들 동시 조회
+    - max_workers: 동시 요청 수 상한
+    - store: CandleStore 지정 시 새 캔들만 조회하고 나머지는 저장소에서 읽음
+    반환: 입력 markets 순서와 같은 캔들 리스트
+    """
+    workers = max(1, min(max_workers, len(markets)))
+
+    def fetch(market):
+        if store is not None:
+            return store.get_candles(market, CANDLE_COUNT)
+        return fetch_candles(market, CANDLE_COUNT)
+
+    if workers == 1:
+        return [fetch(market) for market in markets]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(fetch, markets))
+
+
+def scan_markets(markets, coin_states, max_workers=SCAN_MAX_WORKERS, store=None):
+    # 캔들 동시 조회 후 종목별 지표 레코드 생성 (입력 순서 유지, 캔들 부족 종목 제외)
+    start = time.time()
+    all_candles = fetch_all_candles(markets, max_workers, store)
+    returns = calc_indicators(markets, all_candles, coin_states)
+    quota = get_limiter().stats()["quotation"]
+    print(f"[스캔] {len(markets)}개 종목 조회 완료 ({time.time() - start:.1f}초, "
+          f"한도 대기 {quota['waits']}회/{quota['wait_time']:.1f}초, 429 {quota['throttled']}회)")
+    return returns
@@ -0,0 +1,184 @@
+import datetime
+import threading
+import time
+
+ORDER_POLL_INTERVAL = 2    # 미체결 주문 확인 주기(초)
+ORDER_MAX_AGE = 3600       # 이 시간(초)이 지나도 끝나지 않은 주문은 추적 중단 (state 'expired')
+FINAL_STATES = ("done", "cancel")
+
+
+def fill_time(order):
+    # 체결 시각 (마지막 체결, 없으면 주문 시각) 'YYYY-MM-DD HH:MM:SS' (KST)
+    trades = order.get("trades") or []
+    ts = trades[-1].get("created_at") if trades else order.get("created_at")
+    if ts:
+        return ts[:19].replace("T", " ")
+    return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def summarize_fills(order):
+    """
+    주문 조회 결과에서 실제 체결 요약
+    - trades 가 있으면 체결별 금액/수량 합계, 없으면 executed_funds / executed_volume
+    반환: {"volume", "funds", "avg_price", "fee"} (체결 수량이 없으면 avg_price None)
+    """
+    trades = order.get("trades") or []
+    if trades:
+        volume = sum(float(t["volume"]) for t in trades)
+        funds = sum(float(t.get("funds") or float(t["price"]) * float(t["volume"])) for t in trades)
+    else:
+        volume = float(order.get("executed_volume") or 0)
+        funds = float(order.get("executed_funds") or 0)
+    return {
+        "volume": volume,
+        "funds": funds,
+        "avg_price": funds / volume if volume > 0 and funds > 0 else None,
+        "fee": float(order.get("paid_fee") or 0),
+    }
+
+
+class OrderTracker:
+    """
+    주문 체결 추적
+    - track(주문 응답): 주문 uuid 등록, poll() 마다 추적 중인 주문을 get_orders_by_uuids 로 한 번에 조회
+    - 끝난 주문(done, 또는 일부 체결 후 cancel — 시장가 매수는 잔액 취소로 cancel 이 될 수 있음)은
+      체결 내역으로 실제 평균 체결가/수량을 계산해 코인 상태(state_store)와 거래 기록(record)에 반영
+    - record: 거래 기록 저장 함수 (row dict), 기본은 거래 기록 DB(trades.db)
+    - on_finish(uuid, market, side, state): 주문이 끝나거나(done/cancel) 추적 중단(expired)될 때 호출
+    """
+    def __init__(self, api, state_store=None, record=None, max_age=ORDER_MAX_AGE, on_finish=None):
+        self.api = api
+        self.state_store = state_store
+        if record is None:
+            from trade_journal import get_default_journal
+            record = get_default_journal().append
+        self.record = record
+        self.max_age = max_age
+        self.on_finish = on_finish
+        self.orders = {}  # uuid -> {"market", "side", "submitted"}
+        self.lock = threading.RLock()
+        self.poll_lock = threading.Lock()  # poll() 은 스케줄러/스캔 스레드에서 동시에 불려도 한 번에 하나만
+        # 통계
+        self.tracked = 0
+        self.filled = 0
+        self.cancelled = 0
+        self.expired = 0
+        self.polls = 0
+        self.requests = 0
+
+    def track(self, response):
+        # 주문 응답 등록 후 uuid 반환, 오류 응답이면 None
+        if not isinstance(response, dict) or "uuid" not in response:
+            return None
+        with self.lock:
+            self.orders[response["uuid"]] = {
+                "market": response.get("market"),
+                "side": response.get("side"),
+                "submitted": time.time(),
+            }
+            self.tracked += 1
+        return response["uuid"]
+
+    def pending(self):
+        with self.lock:
+            return list(self.orders)
+
+    def poll(self):
+        """
+        추적 중인 주문 상태 일괄 조회 후 끝난 주문 반영
+        반환: 이번에 반영한 주문 목록 [(uuid, 요약)]
+        """
+        with self.poll_lock:
+            return self._poll()
+
+    def _poll(self):
+        with self.lock:
+            uuids = list(self.orders)
+        if not uuids:
+            return []
+        self.polls += 1
+        self.requests += 1
+        orders = self.api.get_orders_by_uuids(uuids)
+        finished = []
+        for order in orders:
+            if order.get("state") in FINAL_STATES:
+                # 일괄 조회에는 체결 내역이 없어 체결 금액이 없으면 개별 조회로 보충
+                if float(order.get("executed_volume") or 0) > 0 and not order.get("executed_funds"):
+                    self.requests += 1
+                    detail = self.api.get_order(order["uuid"])
+                    if isinstance(detail, dict) and "uuid" in detail:
+                        order = detail
+                fill = self._finish(order)
+                if fill is not None:
+                    finished.append((order["uuid"], fill))
+        # 오래된 주문 정리
+        now = time.time()
+        with self.lock:
+            for uuid, info in list(self.orders.items()):
+                if now - info["submitted"] > self.max_age:
+                    print(f"[주문] {info['market']} {uuid} {self.max_age}초 동안 끝나지 않아 추적 중단")
+                    self._update_state(info["market"], order_status="expired")
+                    del self.orders[uuid]
+                    self.expired += 1
+                    self._notify(uuid, info, "expired")
+        return finished
+
+    def _notify(self, uuid, info, state):
+        if self.on_finish is not None:
+            self.on_finish(uuid, info.get("market"), info.get("side"), state)
+
+    def _update_state(self, market, **fields):
+        if self.state_store is not None and market:
+            self.state_store.update(market, **fields)
+
+    def _finish(self, order):
+        # 추적 중인 주문만 반영 (이미 반영된 주문이면 None, 같은 체결을 두 번 기록하지 않음)
+        with self.lock:
+            info = self.orders.pop(order["uuid"], None)
+        if info is None:
+            return None
+        self._notify(order["uuid"], info, order.get("state"))
+        market = order.get("market") or info["market"]
+        side = order.get("side") or info["side"]
+        fill = summarize_fills(order)
+        if fill["volume"] <= 0:
+            self.cancelled += 1
+            print(f"[주문] {market} {order['uuid']} 체결 없이 취소")
+            self._update_state(market, order_status="cancelled")
+            return fill
+        self.filled += 1
+        self.record({
+            "datetime": fill_time(order),
+            "type": "buy" if side == "bid" else "sell",
+            "market": market,
+            "amount": fill["funds"],
+            "price": fill["avg_price"],
+            "volume": fill["volume"],
+            "result": f"{order.get('state')} uuid={order['uuid']} fee={fill['fee']}",
+        })
+        if self.state_store is not None:
+            state = self.state_store.get(market) or {}
+            held = float(state.get("bought_volume") or 0)
+            held_price = float(state.get("buy_price") or 0)
+            if side == "bid":
+                # 기존 보유분과 가중 평균
+                volume = held + fill["volume"]
+                price = (held * held_price + fill["funds"]) / volume if held_price else fill["avg_price"]
+                self._update_state(market, buy_price=price, bought_volume=volume, order_status="filled")
+            else:
+                volume = max(0.0, held - fill["volume"])
+                self._update_state(market, buy_price=held_price if volume > 0 else None,
+                                   bought_volume=volume, order_status="sold")
+        return fill
+
+    def stats(self):
+        with self.lock:
+            return {
+                "pending": len(self.orders),
+                "tracked": self.tracked,
+                "filled": self.filled,
+                "cancelled": self.cancelled,
+                "expired": self.expired,
+                "polls": self.polls,
+                "requests": self.requests,
+            }
@@ -0,0 +1,250 @@
+# 파라미터 탐색 전략 (auto_optimize 의 전수 조사 대신 사용)
+# - 탐색 공간: {이름: [후보, ...]} 는 범주형, {이름: (최소, 최대)} 는 구간(정수/실수)
+#   예: {'rebalance_period': (1, 60), 'max_coin_ratio': (0.05, 0.5), 'top_n': (1, 10)}
+# - 예산: 백테스트 기간(rebalance_dates 앞부분 비율)으로 부분 평가 후 성적이 나쁜 후보를 조기 탈락
+#   (부분 평가 기간은 단계별로 하나, 그 단계 후보 중 가장 긴 주기도 MIN_EVAL_STEPS 번은 리밸런싱하도록 늘림)
+# - random / halving(successive halving) / hyperband / tpe 지원
+import math
+import random
+import time
+
+from backtest.simulator import MarketArrays
+from auto_optimizer import prepare_strategy, evaluate_params
+
+# 부분 기간 평가 시 최소 리밸런싱 횟수 (rebalance_period 가 긴 후보가 0~1회만 평가되어
+# 수익률 0 으로 비교되는 것을 막음)
+MIN_EVAL_STEPS = 4
+DEFAULT_PERIOD = 30  # evaluate_params 의 rebalance_period 기본값
+
+
+def sample_params(space, rng):
+    params = {}
+    for name, dom in space.items():
+        if isinstance(dom, list):
+            params[name] = rng.choice(dom)
+        elif isinstance(dom[0], int) and isinstance(dom[1], int):
+            params[name] = rng.randint(dom[0], dom[1])
+        else:
+            params[name] = rng.uniform(dom[0], dom[1])
+    return params
+
+
+def params_key(params):
+    return tuple(sorted(params.items()))
+
+
+def rebalance_period(params):
+    return int(params.get('rebalance_period', DEFAULT_PERIOD))
+
+
+def max_period(space):
+    # 탐색 공간에서 가능한 가장 긴 rebalance_period
+    dom = space.get('rebalance_period')
+    if dom is None:
+        return DEFAULT_PERIOD
+    return int(max(dom))
+
+
+class Objective:
+    """
+    파라미터 조합의 부분/전체 기간 백테스트 수익률 (같은 조합·기간은 캐시)
+    - fraction: rebalance_dates 중 앞에서부터 사용할 비율 (1.0 = 전체 기간)
+    - n: 사용할 날짜 수 (서로 비교하는 후보는 같은 n 으로 평가해야 함, horizon() 참고)
+    """
+    def __init__(self, strategy_fn, data_dict, rebalance_dates):
+        self.data_dict = data_dict
+        self.rebalance_dates = list(rebalance_dates)
+        self.arrays = MarketArrays(data_dict, self.rebalance_dates)
+        self.strategy_fn = prepare_strategy(strategy_fn, data_dict)
+        self.cache = {}
+        self.trials = []  # (params, fraction, ret)
+
+    def horizon(self, fraction, periods=()):
+        """
+        부분 평가 날짜 수: fraction 비율과, periods 중 가장 긴 주기로 MIN_EVAL_STEPS 번 리밸런싱할 기간 중 큰 값
+        - 같은 단계 후보들은 이 값 하나로 평가해 기간 길이가 아니라 성과로 비교
+        """
+        n = max([2, int(round(len(self.rebalance_dates) * fraction))] + [MIN_EVAL_STEPS * p + 1 for p in periods])
+        return min(n, len(self.rebalance_dates))
+
+    def __call__(self, params, fraction=1.0, n=None):
+        if n is None:
+            n = self.horizon(fraction, [rebalance_period(params)])
+        key = (params_key(params), n)
+        if key not in self.cache:
+            ret, _ = evaluate_params(self.strategy_fn, self.data_dict, self.rebalance_dates[:n], params, self.arrays)
+            if isinstance(ret, float) and math.isnan(ret):
+                ret = -float('inf')
+            self.cache[key] = ret
+            self.trials.append((params, fraction, ret))
+        return self.cache[key]
+
+    def history(self, params):
+        _, history = evaluate_params(self.strategy_fn, self.data_dict, self.rebalance_dates, params, self.arrays)
+        return history
+
+
+def _out_of_time(deadline):
+    return deadline is not None and time.time() >= deadline
+
+
+def random_search(objective, space, n_trials=50, deadline=None, seed=0):
+    # 무작위 샘플링, 전체 기간 평가
+    rng = random.Random(seed)
+    best = (-float('inf'), None)
+    for _ in range(n_trials):
+        if _out_of_time(deadline):
+            break
+        params = sample_params(space, rng)
+        ret = objective(params)
+        if ret > best[0]:
+            best = (ret, params)
+    return best
+
+
+def successive_halving(objective, space, n_trials=27, eta=3, min_fraction=None, deadline=None, seed=0, candidates=None):
+    """
+    n_trials 개 후보를 짧은 기간으로 평가 → 상위 1/eta 만 eta 배 긴 기간으로 재평가 → ... → 전체 기간
+    - min_fraction: 첫 단계 평가 기간 비율 (기본: 단계 수에 맞춰 자동)
+    """
+    rng = random.Random(seed)
+    candidates = candidates or [sample_params(space, rng) for _ in range(n_trials)]
+    rungs = max(1, int(math.log(len(candidates), eta)))
+    fraction = min_fraction or eta ** -rungs
+    best = (-float('inf'), None)
+    while candidates:
+        fraction = min(1.0, fraction)
+        # 이 단계 후보는 모두 같은 기간으로 평가
+        n = objective.horizon(fraction, [rebalance_period(p) for p in candidates])
+        scored = []
+        for params in candidates:
+            if _out_of_time(deadline) and scored:
+                break
+            scored.append((objective(params, fraction, n), params))
+        scored.sort(key=lambda x: x[0], reverse=True)
+        if fraction >= 1.0:
+            if scored and scored[0][0] > best[0]:
+                best = scored[0]
+            break
+        keep = max(1, len(scored) // eta)
+        candidates = [p for _, p in scored[:keep]]
+        # 마지막 1개가 남으면 바로 전체 기간 평가
+        fraction = 1.0 if keep == 1 else fraction * eta
+    return best
+
+
+def hyperband(objective, space, max_trials=81, eta=3, deadline=None, seed=0):
+    # 첫 평가 기간이 다른 successive halving 여러 번 (공격적 조기 탈락 ~ 전체 평가)
+    s_max = max(0, int(math.log(max_trials, eta)))
+    best = (-float('inf'), None)
+    for s in range(s_max, -1, -1):
+        if _out_of_time(deadline):
+            break
+        n = max(1, int(math.ceil((s_max + 1) / (s + 1) * eta ** s)))
+        result = successive_halving(objective, space, n_trials=n, eta=eta, min_fraction=eta ** -s,
+                                    deadline=deadline, seed=seed + s)
+        if result[0] > best[0]:
+            best = result
+    return best
+
+
+class _Parzen:
+    # 파라미터 1개의 좋은/나쁜 관측 분포 (범주형: 가중 빈도, 구간: 가우시안 커널 밀도)
+    def __init__(self, dom, values):
+        self.dom = dom
+        self.values = values
+
+    def pdf(self, x):
+        if isinstance(self.dom, list):
+            count = sum(1 for v in self.values if v == x)
+            return (count + 1) / (len(self.values) + len(self.dom))
+        lo, hi = self.dom
+        width = (hi - lo) or 1
+        bw = max(width / 10, width / (len(self.values) + 1))
+        prior = 1 / width
+        density = sum(math.exp(-0.5 * ((x - v) / bw) ** 2) / (bw * math.sqrt(2 * math.pi)) for v in self.values)
+        return (density + prior) / (len(self.values) + 1)
+
+    def sample(self, rng):
+        # 관측값 주변에서 샘플링, 1/(관측 수+1) 확률로 사전 분포(전체 공간)에서 샘플링
+        if not self.values or rng.random() < 1 / (len(self.values) + 1):
+            return sample_params({'x': self.dom}, rng)['x']
+        if isinstance(self.dom, list):
+            return rng.choice(self.values)
+        lo, hi = self.dom
+        bw = max((hi - lo) / 10, (hi - lo) / (len(self.values) + 1))
+        x = min(hi, max(lo, rng.gauss(rng.choice(self.values), bw)))
+        return int(round(x)) if isinstance(lo, int) and isinstance(hi, int) else x
+
+
+def tpe_search(objective, space, n_trials=50, n_startup=10, gamma=0.25, n_candidates=24,
+               prune_fraction=0.5, deadline=None, seed=0):
+    """
+    TPE(Tree-structured Parzen Estimator) 방식 베이지안 탐색
+    - 처음 n_startup 개는 무작위, 이후 상위 gamma 비율(좋은 조합) 분포에서 후보를 뽑아 l(x)/g(x) 최대인 조합 평가
+    - 후보는 먼저 prune_fraction 기간으로 평가해 지금까지의 중간값보다 나쁘면 전체 평가 생략
+    """
+    rng = random.Random(seed)
+    observed = []   # (ret, params) 전체 기간 평가 결과
+    partial = []    # 부분 기간 점수
+    best = (-float('inf'), None)
+    # 조기 탈락 비교용 부분 기간은 모든 후보가 같은 길이 (공간의 가장 긴 주기 기준)
+    prune_n = objective.horizon(prune_fraction, [max_period(space)]) if prune_fraction else None
+    for t in range(n_trials):
+        if _out_of_time(deadline):
+            break
+        if t < n_startup or len(observed) < 2:
+            params = sample_params(space, rng)
+        else:
+            ranked = sorted(observed, key=lambda x: x[0], reverse=True)
+            n_good = max(1, int(math.ceil(gamma * len(ranked))))
+            good = [p for _, p in ranked[:n_good]]
+            bad = [p for _, p in ranked[n_good:]] or good
+            best_score, params = -float('inf'), None
+            for _ in range(n_candidates):
+                cand = {}
+                score = 0.0
+                for name, dom in space.items():
+                    l = _Parzen(dom, [p[name] for p in good])
+                    g = _Parzen(dom, [p[name] for p in bad])
+                    cand[name] = l.sample(rng)
+                    score += math.log(l.pdf(cand[name])) - math.log(g.pdf(cand[name]))
+                if score > best_score:
+                    best_score, params = score, cand
+        # 부분 기간 평가 후 중간값 미만이면 조기 탈락
+        if prune_fraction and prune_fraction < 1.0:
+            early = objective(params, prune_fraction, prune_n)
+            median = sorted(partial)[len(partial) // 2] if partial else -float('inf')
+            partial.append(early)
+            if early < median:
+                continue
+        ret = objective(params)
+        observed.append((ret, params))
+        if ret > best[0]:
+            best = (ret, params)
+    return best
+
+
+SEARCHES = {
+    'random': random_search,
+    'halving': successive_halving,
+    'hyperband': hyperband,
+    'tpe': tpe_search,
+}
+
+
+def search_optimize(strategy_fn, data_dict, rebalance_dates, space, method='halving', time_budget=None, **kwargs):
+    """
+    탐색 전략으로 파라미터 최적화 (auto_optimize 와 같은 반환 형식)
+    - method: 'random' | 'halving' | 'hyperband' | 'tpe'
+    - time_budget: 초 단위 시간 예산 (초과 시 새 후보 평가 중단)
+    - kwargs: 각 탐색 함수 옵션 (n_trials, eta, seed 등)
+    """
+    objective = Objective(strategy_fn, data_dict, rebalance_dates)
+    deadline = time.time() + time_budget if time_budget else None
+    best_ret, best_param = SEARCHES[method](objective, space, deadline=deadline, **kwargs)
+    best_history = objective.history(best_param) if best_param is not None else None
+    full = sum(1 for _, f, _ in objective.trials if f >= 1.0)
+    print(f"[{method}] 평가 {len(objective.trials)}회(전체 기간 {full}회), "
+          f"최적 파라미터: {best_param}, 예상 수익률: {best_ret:.2%}")
+    return best_param, best_history
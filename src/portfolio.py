@@ -1,23 +1,22 @@
-import requests
 import datetime
+import http_client
+from candle_store import get_default_store
 
-UPBIT_API_URL = "https://api.upbit.com"
+UPBIT_API_URL = http_client.UPBIT_API_URL
 
 # 전체 KRW마켓 종목 조회
 def get_krw_markets():
     url = f"{UPBIT_API_URL}/v1/market/all"
-    res = requests.get(url, params={"isDetails": False})
+    res = http_client.get(url, params={"isDetails": False})
     markets = res.json()
     return [m['market'] for m in markets if m['market'].startswith('KRW-')]
 
-# 각 종목별 1개월 수익률 계산
-def get_monthly_returns(markets):
+# 각 종목별 1개월 수익률 계산 (캔들은 로컬 저장소에서 읽고 새 캔들만 조회)
+def get_monthly_returns(markets, store=None):
+    store = store or get_default_store()
     returns = []
     for market in markets:
-        url = f"{UPBIT_API_URL}/v1/candles/days"
-        params = {"market": market, "count": 30}
-        res = requests.get(url, params=params)
-        candles = res.json()
+        candles = store.get_candles(market, 30)
         if len(candles) < 30:
             continue
         price_30d_ago = candles[-1]['trade_price']
@@ -27,6 +26,18 @@ def get_monthly_returns(markets):
     returns.sort(key=lambda x: x['return'], reverse=True)
     return returns
 
+# 잔고 평가금액(원화+코인) 계산, tickers: {market: ticker}
+def evaluate_balances(balances, tickers):
+    total_krw = 0.0
+    for b in balances:
+        if b['currency'] == 'KRW':
+            total_krw += float(b['balance'])
+            continue
+        ticker = tickers.get(f"KRW-{b['currency']}")
+        if ticker and float(b['balance']) > 0:
+            total_krw += float(b['balance']) * float(ticker['trade_price'])
+    return total_krw
+
 # 포트폴리오 선정 (상위 N개, 최소매매금액 5000원 이상 분배)
 def select_portfolio(returns, total_balance, min_amount=5000, top_n=5):
     selected = returns[:top_n]
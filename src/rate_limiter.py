@@ -0,0 +1,131 @@
+import threading
+import time
+
+# 엔드포인트 그룹별 초당 요청 한도 (업비트 공지 기준)
+GROUP_RATES = {
+    "quotation": 10,  # 시세 조회 (캔들/티커/마켓)
+    "exchange": 30,   # 잔고/주문 조회
+    "order": 8,       # 주문 생성/취소
+}
+
+# 429 응답 시 해당 그룹 요청을 멈추는 시간(초)
+THROTTLE_PENALTY = 1.0
+
+
+def parse_remaining_req(header):
+    """
+    Remaining-Req 헤더 파싱
+    예: "group=default; min=1800; sec=29" → {"group": "default", "min": 1800, "sec": 29}
+    """
+    result = {}
+    if not header:
+        return result
+    for part in header.split(";"):
+        if "=" not in part:
+            continue
+        key, value = part.strip().split("=", 1)
+        result[key] = int(value) if value.isdigit() else value
+    return result
+
+
+class TokenBucket:
+    """
+    토큰 버킷 (스레드 공유)
+    - 초당 rate 개 토큰 충전, 요청마다 1개 소비 (부족하면 충전될 때까지 대기)
+    - 서버가 알려준 남은 요청 수(Remaining-Req sec)보다 토큰을 많이 쓰지 않도록 보정
+    """
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+        # 통계
+        self.requests = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+        self.throttled = 0
+        self.remaining = None
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        # 토큰 1개 예약 후 필요한 만큼 대기, 대기 시간(초) 반환
+        with self.lock:
+            self._refill(time.monotonic())
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            self.requests += 1
+            if wait > 0:
+                self.waits += 1
+                self.wait_time += wait
+                self.max_wait = max(self.max_wait, wait)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def update_remaining(self, sec):
+        # 서버 기준 이번 1초 동안 남은 요청 수로 토큰 상한 조정
+        with self.lock:
+            self._refill(time.monotonic())
+            self.remaining = sec
+            self.tokens = min(self.tokens, sec)
+
+    def penalize(self, delay=THROTTLE_PENALTY):
+        # 429 응답: delay 초 동안 새 요청이 나가지 않도록 토큰을 음수로 설정
+        with self.lock:
+            self._refill(time.monotonic())
+            self.throttled += 1
+            self.tokens = min(self.tokens, -delay * self.rate)
+
+    def stats(self):
+        with self.lock:
+            self._refill(time.monotonic())
+            return {
+                "rate": self.rate,
+                "tokens": round(self.tokens, 3),
+                "remaining": self.remaining,
+                "requests": self.requests,
+                "waits": self.waits,
+                "wait_time": round(self.wait_time, 3),
+                "avg_wait": round(self.wait_time / self.waits, 4) if self.waits else 0.0,
+                "max_wait": round(self.max_wait, 3),
+                "throttled": self.throttled,
+            }
+
+
+class RateLimiter:
+    """
+    업비트 요청 한도 관리 (quotation / exchange / order 그룹별 토큰 버킷)
+    - acquire(group): 요청 전 호출, 한도 초과 시 대기
+    - update(group, response): 응답의 Remaining-Req 헤더/429 상태로 버킷 보정
+    """
+    def __init__(self, rates=None):
+        rates = rates or GROUP_RATES
+        self.buckets = {group: TokenBucket(rate) for group, rate in rates.items()}
+
+    def acquire(self, group):
+        return self.buckets[group].acquire()
+
+    def update(self, group, response):
+        bucket = self.buckets[group]
+        if response.status_code == 429:
+            bucket.penalize()
+            return
+        remaining = parse_remaining_req(response.headers.get("Remaining-Req"))
+        if "sec" in remaining:
+            bucket.update_remaining(remaining["sec"])
+
+    def stats(self):
+        return {group: bucket.stats() for group, bucket in self.buckets.items()}
+
+
+_limiter = RateLimiter()
+
+
+def get_limiter():
+    # 프로세스 공용 요청 한도 관리자
+    return _limiter
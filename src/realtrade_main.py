@@ -2,18 +2,58 @@ import os
 import time
 import logging
 import json
+import threading
 from dotenv import load_dotenv
 from upbit_api import UpbitAPI
-from ai_verifier import AIVerifier
-from telegram_alert import TelegramAlert
+from ai_verifier import AIVerifier, AI_DEADLINE, price_bucket
+from telegram_alert import TelegramAlert, PRIORITY_CRITICAL
 from email_alert import EmailAlert
+from upbit_websocket import UpbitWebSocketFeed, PRICE_MAX_AGE
+from scheduler import Scheduler, PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW
+from state_store import atomic_write_json
 from flask import Flask, render_template
 
 app = Flask(__name__, template_folder='templates')
 
-def get_current_price(upbit, market):
-    ticker = upbit.get_ticker(market)
-    return ticker['trade_price'] if ticker else None
+LOOP_INTERVAL = 60  # AI 검증/매수 작업 주기(초)
+RISK_CHECK_INTERVAL = 1  # 실시간 손절/익절 점검 주기(초), 보유 종목 시세 수신 시에도 점검
+STATE_SAVE_INTERVAL = 30  # 상태 파일 저장 주기(초)
+SCHEDULER_REPORT_INTERVAL = 600  # 작업별 실행 통계 출력 주기(초)
+
+# risk/verify/state 작업이 각자 스레드에서 save_state 를 부르므로 파일 쓰기는 한 번에 하나만
+state_lock = threading.Lock()
+
+def get_current_prices(upbit, markets, feed=None):
+    # 실시간 시세 우선, 없거나 오래된 종목만 REST 일괄 조회(1회)
+    prices = {}
+    if feed is not None:
+        prices = {m: feed.get_price(m, max_age=PRICE_MAX_AGE) for m in markets}
+    missing = [m for m in markets if prices.get(m) is None]
+    if missing:
+        try:
+            tickers = upbit.get_tickers(missing)
+        except Exception as e:
+            # 일시적 HTTP 오류/알 수 없는 종목: 이번 회차는 시세 없음으로 처리
+            logging.error(f"시세 조회 오류: {e}")
+            tickers = {}
+        for m in missing:
+            prices[m] = tickers[m]['trade_price'] if m in tickers else None
+    return prices
+
+def check_exit(upbit, market, state, params, price):
+    # 손절/익절 조건이면 전량 매도 후 True 반환
+    if not (price and state["buy_price"] and state["bought_volume"] > 0):
+        return False
+    change = (price - state["buy_price"]) / state["buy_price"]
+    if change <= -params["stop_loss"] or change >= params["take_profit"]:
+        # 손절/익절 매도
+        sell_result = upbit.sell_market_order(market, state["bought_volume"])
+        state["buy_price"] = None
+        state["bought_volume"] = 0
+        state["last_trade_price"] = price
+        # 알림/저장 등
+        return True
+    return False
 
 def safe_api_call(func, *args, **kwargs):
     for _ in range(3):
@@ -24,14 +64,16 @@ def safe_api_call(func, *args, **kwargs):
             time.sleep(5)
     # 치명적 오류 발생 시 알림
     if tg:
-        tg.send(f"[치명적 오류] {func.__name__} 3회 연속 실패")
+        tg.send(f"[치명적 오류] {func.__name__} 3회 연속 실패", PRIORITY_CRITICAL)
     if emailer:
-        emailer.send("[치명적 오류]", f"{func.__name__} 3회 연속 실패")
+        emailer.send("[치명적 오류]", f"{func.__name__} 3회 연속 실패", urgent=True)
     raise Exception("API 3회 연속 실패")
 
 def save_state(states, filename="state.json"):
-    with open(filename, "w") as f:
-        json.dump(states, f)
+    # 종목별 상태 복사본을 임시 파일에 쓰고 교체 (동시 저장/쓰는 도중 종료돼도 파일이 깨지지 않음)
+    with state_lock:
+        snapshot = {m: dict(s) for m, s in list(states.items())}
+        atomic_write_json(filename, snapshot)
 
 def load_state(filename="state.json"):
     try:
@@ -81,56 +123,70 @@ def main():
     coin_states = load_state()
     coin_states = {m: {"buy_price": None, "bought_volume": 0, "last_trade_price": None} for m in markets}
 
+    # 실시간 시세 수신 시작 (폴링 대신 메모리 시세 테이블 사용)
+    feed = UpbitWebSocketFeed(markets).start()
+
     # 일일 손실 제한을 위한 변수
     total_daily_loss = 0
     daily_loss_limit = -0.1  # 하루 손실 한도 (-10%)
 
-    while True:
+    prices = {}  # 마지막 REST 시세 (실시간 시세가 없을 때 사용)
+
+    def risk_check():
+        # 보유 종목 손절/익절 점검 (실시간 시세 없으면 마지막 REST 시세), 매도한 종목 반환
+        exited = set()
         for market in markets:
+            price = feed.get_price(market, max_age=PRICE_MAX_AGE) or prices.get(market)
+            if check_exit(upbit, market, coin_states[market], strategy_params[market], price):
+                exited.add(market)
+        if exited:
+            save_state(coin_states)
+        return exited
+
+    def verify_and_buy():
+        prices.update(get_current_prices(upbit, markets, feed))
+
+        # AI 검증: 전 종목 동시 요청, 최대 AI_DEADLINE 초 대기 (초과 시 마지막 판단 사용)
+        # 같은 프롬프트/가격 구간이면 TTL 동안 캐시 응답 사용, 손절/익절은 risk 작업이 따로 점검
+        candidates = [m for m in markets if coin_states[m]["bought_volume"] == 0]
+        verdicts = ai.verify_many({
+            m: (ai_prompts[m], {"price": price_bucket(prices[m])}) for m in candidates
+        }, deadline=AI_DEADLINE)
+
+        for market in candidates:
             params = strategy_params[market]
-            prompt = ai_prompts[market]
-            state = coin_states.get(market, {"buy_price": None, "bought_volume": 0, "last_trade_price": None})
-
-            # 1. AI 검증
-            is_positive, answer = ai.llm_check(prompt)
+            state = coin_states[market]
+            is_positive, answer = verdicts[market]
             if not is_positive:
                 continue
 
-            # 2. 기술적 지표/조건 체크 (필요시 추가)
-
-            # 3. 손절/익절 체크
-            price = get_current_price(upbit, market)
-            if state["buy_price"] and state["bought_volume"] > 0:
-                change = (price - state["buy_price"]) / state["buy_price"]
-                if change <= -params["stop_loss"]:
-                    # 손절 매도
-                    sell_result = upbit.sell_market_order(market, state["bought_volume"])
-                    state["buy_price"] = None
-                    state["bought_volume"] = 0
-                    state["last_trade_price"] = price
-                    # 알림/저장 등
-                    continue
-                elif change >= params["take_profit"]:
-                    # 익절 매도
-                    sell_result = upbit.sell_market_order(market, state["bought_volume"])
-                    state["buy_price"] = None
-                    state["bought_volume"] = 0
-                    state["last_trade_price"] = price
-                    # 알림/저장 등
-                    continue
-
-            # 4. 매수 조건
-            if is_positive and state["bought_volume"] == 0:
-                order_result = upbit.buy_market_order(market, params["buy_amount"])
-                state["buy_price"] = price
-                state["bought_volume"] = order_result.get('volume', 0)
-                state["last_trade_price"] = price
-                # 알림/저장 등
-
-            coin_states[market] = state
+            # 기술적 지표/조건 체크 (필요시 추가)
+
+            # 매수 조건
+            price = feed.get_price(market, max_age=PRICE_MAX_AGE) or prices[market]
+            if not price:
+                continue  # 시세 조회 실패 종목은 다음 회차에 매수
+            order_result = upbit.buy_market_order(market, params["buy_amount"])
+            state["buy_price"] = price
+            state["bought_volume"] = order_result.get('volume', 0)
+            state["last_trade_price"] = price
+            # 알림/저장 등
 
         save_state(coin_states)
-        time.sleep(60)
+        logging.info(f"AI 캐시: {ai.stats()}")
+
+    # 작업별 주기: 손절/익절(1초 + 시세 수신 시), AI 검증/매수(LOOP_INTERVAL), 상태 저장
+    # AI 응답이 늦어도 손절/익절은 별도 스레드에서 계속 실행
+    scheduler = Scheduler(report_interval=SCHEDULER_REPORT_INTERVAL)
+    scheduler.add("risk", risk_check, RISK_CHECK_INTERVAL, PRIORITY_HIGH, min_gap=0.2)
+    scheduler.add("verify", verify_and_buy, LOOP_INTERVAL, PRIORITY_NORMAL)
+    scheduler.add("state", lambda: save_state(coin_states), STATE_SAVE_INTERVAL, PRIORITY_LOW, run_at_start=False)
+
+    def on_price(market, price):
+        if coin_states.get(market, {}).get("bought_volume"):
+            scheduler.trigger("risk")
+    feed.add_listener(on_price)
+    scheduler.run_forever()
 
 if __name__ == '__main__':
     main()
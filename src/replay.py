@@ -0,0 +1,435 @@
+import argparse
+import contextlib
+import datetime
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+import main
+from backtest.metrics import compute_metrics
+from backtest.simulator import BacktestHistory
+from state_store import CoinStateStore
+from order_tracker import OrderTracker
+
+# 업비트 일봉 경계 (KST 09:00)
+DAY_OFFSET = pd.Timedelta(hours=9).value
+DAY = pd.Timedelta(days=1).value
+MINUTE = pd.Timedelta(minutes=1).value
+MIN_ORDER_KRW = 5000  # 업비트 최소 주문 금액
+
+
+class VirtualClock:
+    """
+    리플레이용 가상 시계 (KST, tz 없는 ns 시각)
+    - time()/sleep() 은 time 모듈, datetime.now() 는 datetime 모듈 자리에 끼워 넣어 사용
+    - sleep 은 실제로 기다리지 않고 시각만 앞으로 이동
+    """
+    def __init__(self, start):
+        self.now_ns = pd.Timestamp(start).value
+        clock = self
+
+        class _Datetime(datetime.datetime):
+            @classmethod
+            def now(cls, tz=None):
+                return pd.Timestamp(clock.now_ns).to_pydatetime()
+
+        self.datetime = _Datetime
+
+    def time(self):
+        return self.now_ns / 1e9
+
+    def sleep(self, seconds):
+        self.now_ns += int(seconds * 1e9)
+
+    def timestamp(self):
+        return pd.Timestamp(self.now_ns)
+
+
+class SimulatedExchange:
+    """
+    분봉 데이터 기반 가상 거래소 (UpbitAPI 와 같은 메서드/응답 형식)
+    - data: {market: 분봉 DataFrame(open/high/low/close/volume/value, 인덱스 KST)} (DataLoader.get_ohlcv 형식)
+    - 시세는 가상 시각 기준 직전에 마감된 분봉 종가 (미래 데이터 사용 없음)
+    - 시장가 주문은 즉시 체결, 응답은 실제 API 처럼 state='wait' 로 반환하고 get_order 로 체결 내역 조회
+    - get_candles 로 CandleStore 자리(일봉, 진행 중인 당일 캔들 포함)도 대신함
+    """
+    def __init__(self, data, clock, krw=1000000, fee_rate=main.TRADING_FEE, slippage=0.0):
+        self.clock = clock
+        self.markets = list(data)
+        self.fee_rate = fee_rate
+        self.slippage = slippage
+        self.krw = float(krw)
+        self.holdings = {}   # currency -> 수량
+        self.avg_price = {}  # currency -> 평균 매수가
+        self.orders = {}
+        self.turnover = 0.0
+        self.fees = 0.0
+        self.rejected = Counter()
+        self.series = {}
+        for market, df in data.items():
+            times = df.index.values.astype('datetime64[ns]').astype(np.int64)
+            s = {name: df[name].to_numpy(dtype=float) for name in ('open', 'high', 'low', 'close', 'volume', 'value')}
+            s['time'] = times
+            s['cum_value'] = np.concatenate([[0.0], np.cumsum(s['value'])])
+            s['cum_volume'] = np.concatenate([[0.0], np.cumsum(s['volume'])])
+            day_id = (times - DAY_OFFSET) // DAY
+            s['days'], s['day_first'] = np.unique(day_id, return_index=True)
+            s['day_id'] = day_id
+            s['day_candles'] = self._daily_candles(market, s)
+            self.series[market] = s
+        self._candle_cache = {}
+
+    @staticmethod
+    def _daily_candles(market, s):
+        # 분봉 → 완성된 일봉 dict 리스트 (과거→최근), 캔들 저장소와 같은 필드
+        bounds = np.append(s['day_first'], len(s['time']))
+        candles = []
+        for k, day in enumerate(s['days']):
+            lo, hi = bounds[k], bounds[k + 1]
+            candles.append(SimulatedExchange._candle(market, day, s, lo, hi - 1))
+        return candles
+
+    @staticmethod
+    def _candle(market, day, s, lo, i):
+        start = pd.Timestamp(int(day) * DAY + DAY_OFFSET)
+        return {
+            "market": market,
+            "candle_date_time_utc": (start - pd.Timedelta(hours=9)).strftime('%Y-%m-%dT%H:%M:%S'),
+            "candle_date_time_kst": start.strftime('%Y-%m-%dT%H:%M:%S'),
+            "opening_price": s['open'][lo],
+            "high_price": s['high'][lo:i + 1].max(),
+            "low_price": s['low'][lo:i + 1].min(),
+            "trade_price": s['close'][i],
+            "timestamp": int(s['time'][i] // 1000000),
+            "candle_acc_trade_price": s['cum_value'][i + 1] - s['cum_value'][lo],
+            "candle_acc_trade_volume": s['cum_volume'][i + 1] - s['cum_volume'][lo],
+        }
+
+    def _index(self, market):
+        # 가상 시각 직전에 마감된 분봉 위치 (없으면 -1)
+        s = self.series.get(market)
+        if s is None:
+            return -1
+        return int(np.searchsorted(s['time'], self.clock.now_ns - MINUTE, side='right')) - 1
+
+    def price(self, market):
+        i = self._index(market)
+        return self.series[market]['close'][i] if i >= 0 else None
+
+    # --- 시세 (UpbitAPI/CandleStore 호환) ---
+    def get_candles(self, market, count=30, unit="days"):
+        i = self._index(market)
+        if i < 0:
+            return []
+        s = self.series[market]
+        k = int(np.searchsorted(s['days'], s['day_id'][i]))
+        today = self._candle(market, s['days'][k], s, s['day_first'][k], i)
+        key = (market, k, count)
+        past = self._candle_cache.get(key)
+        if past is None:
+            past = self._candle_cache[key] = s['day_candles'][max(0, k - count + 1):k][::-1]
+        return [today] + past
+
+    def get_ticker(self, market):
+        i = self._index(market)
+        if i < 0:
+            return None
+        s = self.series[market]
+        k = int(np.searchsorted(s['days'], s['day_id'][i]))
+        today = self._candle(market, s['days'][k], s, s['day_first'][k], i)
+        prev_close = s['close'][s['day_first'][k] - 1] if s['day_first'][k] > 0 else today['opening_price']
+        return {
+            "market": market,
+            "trade_price": today['trade_price'],
+            "opening_price": today['opening_price'],
+            "high_price": today['high_price'],
+            "low_price": today['low_price'],
+            "prev_closing_price": prev_close,
+            "acc_trade_price": today['candle_acc_trade_price'],
+            "acc_trade_volume": today['candle_acc_trade_volume'],
+            "timestamp": today['timestamp'],
+        }
+
+    def get_tickers(self, markets):
+        tickers = {}
+        for market in markets:
+            ticker = self.get_ticker(market)
+            if ticker is not None:
+                tickers[market] = ticker
+        return tickers
+
+    # --- 잔고/주문 ---
+    def get_balance(self):
+        balances = [{"currency": "KRW", "balance": str(self.krw), "locked": "0.0",
+                     "avg_buy_price": "0", "unit_currency": "KRW"}]
+        for currency, volume in self.holdings.items():
+            balances.append({"currency": currency, "balance": str(volume), "locked": "0.0",
+                             "avg_buy_price": str(self.avg_price.get(currency, 0)), "unit_currency": "KRW"})
+        return balances
+
+    def total_value(self):
+        total = self.krw
+        for currency, volume in self.holdings.items():
+            price = self.price(f"KRW-{currency}")
+            if price:
+                total += volume * price
+        return total
+
+    def _error(self, name, message):
+        self.rejected[name] += 1
+        return {"error": {"name": name, "message": message}}
+
+    def _order(self, market, side, ord_type, price, volume, fill_price, fill_volume, funds, fee):
+        order_id = str(uuid.uuid4())
+        created = self.clock.timestamp().strftime('%Y-%m-%dT%H:%M:%S') + "+09:00"
+        response = {
+            "uuid": order_id, "side": side, "ord_type": ord_type, "price": price, "state": "wait",
+            "market": market, "created_at": created, "volume": volume, "remaining_volume": volume,
+            "reserved_fee": str(fee), "remaining_fee": str(fee), "paid_fee": "0",
+            "locked": str(funds + fee), "executed_volume": "0", "trades_count": 0,
+        }
+        self.orders[order_id] = dict(response, state="done", remaining_volume="0", remaining_fee="0",
+                                     paid_fee=str(fee), locked="0", executed_volume=str(fill_volume),
+                                     executed_funds=str(funds), trades_count=1,
+                                     trades=[{"market": market, "price": str(fill_price), "volume": str(fill_volume),
+                                              "funds": str(funds), "side": side, "created_at": created}])
+        self.turnover += funds
+        self.fees += fee
+        return response
+
+    def buy_market_order(self, market, amount):
+        price = self.price(market)
+        amount = float(amount)
+        if price is None:
+            return self._error("market_does_not_exist", f"{market} 시세 없음")
+        if amount < MIN_ORDER_KRW:
+            return self._error("under_min_total_bid", "최소주문금액 이상으로 주문해주세요")
+        fee = amount * self.fee_rate
+        if amount + fee > self.krw:
+            return self._error("insufficient_funds_bid", "주문가능한 금액(KRW)이 부족합니다.")
+        fill_price = price * (1 + self.slippage)
+        volume = amount / fill_price
+        currency = market.split('-')[1]
+        held = self.holdings.get(currency, 0.0)
+        self.avg_price[currency] = (held * self.avg_price.get(currency, 0.0) + amount) / (held + volume)
+        self.holdings[currency] = held + volume
+        self.krw -= amount + fee
+        return self._order(market, "bid", "price", str(amount), None, fill_price, volume, amount, fee)
+
+    def sell_market_order(self, market, volume):
+        price = self.price(market)
+        volume = float(volume)
+        currency = market.split('-')[1]
+        held = self.holdings.get(currency, 0.0)
+        if price is None:
+            return self._error("market_does_not_exist", f"{market} 시세 없음")
+        if volume <= 0 or volume > held * (1 + 1e-9):
+            return self._error("insufficient_funds_ask", "주문가능한 금액(코인)이 부족합니다.")
+        fill_price = price * (1 - self.slippage)
+        funds = min(volume, held) * fill_price
+        if funds < MIN_ORDER_KRW:
+            return self._error("under_min_total_ask", "최소주문금액 이상으로 주문해주세요")
+        fee = funds * self.fee_rate
+        remaining = held - volume
+        if remaining <= held * 1e-9:
+            self.holdings.pop(currency, None)
+            self.avg_price.pop(currency, None)
+        else:
+            self.holdings[currency] = remaining
+        self.krw += funds - fee
+        return self._order(market, "ask", "market", None, str(volume), fill_price, min(volume, held), funds, fee)
+
+    def get_order(self, order_id):
+        return self.orders.get(order_id) or {"error": {"name": "order_not_found", "message": "주문을 찾지 못함"}}
+
+    def get_orders_by_uuids(self, uuids):
+        # 일괄 조회는 체결 내역(trades) 없이 반환
+        return [{k: v for k, v in self.orders[u].items() if k != "trades"} for u in uuids if u in self.orders]
+
+
+class ReplayPriceFeed:
+    # UpbitWebSocketFeed 자리: 가상 거래소 시세를 바로 반환
+    def __init__(self, exchange):
+        self.exchange = exchange
+
+    def subscribe(self, markets):
+        pass
+
+    def get_ticker(self, market, max_age=None):
+        return self.exchange.get_ticker(market)
+
+    def get_price(self, market, max_age=None):
+        return self.exchange.price(market)
+
+    def stop(self):
+        pass
+
+
+class ReplayEngine:
+    """
+    UpbitBot.trade() 를 수정 없이 가상 거래소/가상 시계로 재생
+    - main 모듈의 time, datetime, get_krw_markets, save_trade_history 를 재생 중에만 교체
+    - 코인 상태는 임시 디렉터리의 CoinStateStore 에 기록 (실제 coin_states.json 은 건드리지 않음)
+    - 캔들은 메모리에 있으므로 스캔은 스레드 없이 순차 조회 (SCAN_MAX_WORKERS=1)
+    - 봇은 __init__ 없이 만들어 API 키/웹소켓/텔레그램 없이 실행
+    - 루프가 시각을 진행시키지 않고 끝나면(예외 등) loop_interval 만큼 진행
+    """
+    def __init__(self, data, krw=1000000, start=None, end=None, fee_rate=main.TRADING_FEE, slippage=0.0,
+                 loop_interval=60, warmup_days=30):
+        first = min(df.index[0] for df in data.values())
+        last = max(df.index[-1] for df in data.values())
+        self.start = pd.Timestamp(start) if start else first.normalize() + pd.Timedelta(days=warmup_days)
+        self.end = pd.Timestamp(end) if end else last + pd.Timedelta(minutes=1)
+        self.clock = VirtualClock(self.start)
+        self.exchange = SimulatedExchange(data, self.clock, krw, fee_rate, slippage)
+        self.initial_krw = float(krw)
+        self.loop_interval = loop_interval
+        self.trade_log = []
+        self.errors = Counter()
+
+    def make_bot(self, workdir):
+        bot = main.UpbitBot.__new__(main.UpbitBot)
+        bot.api = self.exchange
+        bot.tg = None
+        bot.state_store = CoinStateStore(os.path.join(workdir, "coin_states.json"))
+        bot.coin_states = bot.state_store.states
+        bot.candle_store = self.exchange
+        bot.price_feed = ReplayPriceFeed(self.exchange)
+        bot.order_tracker = OrderTracker(self.exchange, bot.state_store, record=lambda row: main.save_trade_history(row),
+                                         on_finish=bot.release_exit)
+        bot.exiting = {}
+        bot.exit_lock = threading.Lock()
+        return bot
+
+    @contextlib.contextmanager
+    def _patched(self):
+        replaced = {
+            'time': self.clock,
+            'datetime': self.clock,
+            'get_krw_markets': lambda: list(self.exchange.markets),
+            'save_trade_history': self.trade_log.append,
+            'last_trade_time': {},
+            'trade_count_per_day': {},
+            'SCAN_MAX_WORKERS': 1,
+        }
+        saved = {name: getattr(main, name) for name in replaced}
+        for name, value in replaced.items():
+            setattr(main, name, value)
+        try:
+            yield
+        finally:
+            for name, value in saved.items():
+                setattr(main, name, value)
+
+    def run(self, max_loops=None, quiet=True, progress_every=1440):
+        """
+        시작~끝 시각까지 trade() 반복
+        반환: 결과 dict (수익률/MDD 등 지표, 주문/거절/오류 수, 루프 수, 처리 속도)
+        """
+        end_ns = self.end.value
+        dates, equity, cash, turnover, fees = [], [], [], [], []
+        loops = 0
+        wall_start = time.perf_counter()
+        with tempfile.TemporaryDirectory() as workdir, self._patched():
+            bot = self.make_bot(workdir)
+            out = open(os.devnull, 'w') if quiet else None
+            try:
+                while self.clock.now_ns < end_ns and (max_loops is None or loops < max_loops):
+                    before = self.clock.now_ns
+                    traded, paid = self.exchange.turnover, self.exchange.fees
+                    try:
+                        with contextlib.redirect_stdout(out) if out else contextlib.nullcontext():
+                            bot.trade()
+                    except Exception as e:
+                        self.errors[f"{type(e).__name__}: {e}"] += 1
+                    if self.clock.now_ns == before:
+                        self.clock.sleep(self.loop_interval)
+                    loops += 1
+                    dates.append(self.clock.timestamp())
+                    equity.append(self.exchange.total_value())
+                    cash.append(self.exchange.krw)
+                    turnover.append(self.exchange.turnover - traded)
+                    fees.append(self.exchange.fees - paid)
+                    if progress_every and loops % progress_every == 0:
+                        print(f"[리플레이] {self.clock.timestamp():%Y-%m-%d %H:%M} 루프 {loops}회, "
+                              f"평가금액 {equity[-1]:,.0f} KRW, {loops / (time.perf_counter() - wall_start):.0f}루프/초")
+            finally:
+                bot.state_store.close()
+                if out:
+                    out.close()
+        wall = time.perf_counter() - wall_start
+        history = BacktestHistory([], loops, self.initial_krw)
+        history.dates = dates
+        history.total_value[:] = equity
+        history.balance[:] = cash
+        history.turnover[:] = turnover
+        history.fees[:] = fees
+        simulated = (self.clock.now_ns - self.start.value) / 1e9
+        return {
+            'history': history,
+            'metrics': compute_metrics(history, self.initial_krw) if loops else {},
+            'final_value': equity[-1] if equity else self.initial_krw,
+            'orders': len(self.exchange.orders),
+            'rejected': dict(self.exchange.rejected),
+            'errors': dict(self.errors),
+            'trades': self.trade_log,
+            'loops': loops,
+            'wall_time': wall,
+            'loops_per_sec': loops / wall if wall > 0 else 0.0,
+            'speedup': simulated / wall if wall > 0 else 0.0,
+        }
+
+
+def synthetic_minutes(n_markets=20, days=60, start='2024-01-01', seed=0, drift=0.0):
+    # 테스트용 가상 분봉 (랜덤워크, drift: 분당 평균 로그수익률, 거래 없는 분은 캔들 없음)
+    rng = np.random.default_rng(seed)
+    index = pd.date_range(start, periods=days * 1440, freq='min')
+    data = {}
+    for k in range(n_markets):
+        keep = rng.random(len(index)) > 0.05
+        close = rng.uniform(100, 100000) * np.exp(np.cumsum(rng.normal(drift, 0.001, len(index))))[keep]
+        volume = rng.uniform(0.1, 10, len(close))
+        data[f"KRW-S{k:03d}"] = pd.DataFrame({
+            'open': close, 'high': close, 'low': close, 'close': close,
+            'volume': volume, 'value': volume * close * rng.uniform(10, 1000),
+        }, index=pd.DatetimeIndex(index[keep], name='date'))
+    return data
+
+
+def print_report(result):
+    m = result['metrics']
+    print(f"[리플레이] 루프 {result['loops']}회, {result['wall_time']:.1f}초 "
+          f"({result['loops_per_sec']:.0f}루프/초, 실시간 대비 {result['speedup']:.0f}배)")
+    if m:
+        print(f"[리플레이] 최종 평가금액 {result['final_value']:,.0f} KRW, 수익률 {m['total_return']:.2%}, "
+              f"MDD {m['max_drawdown']:.2%}, 수수료 {m['fee_drag']:.2%}, 평균 코인 비중 {m['exposure']:.1%}")
+    print(f"[리플레이] 주문 {result['orders']}건, 거절 {result['rejected']}")
+    for message, count in sorted(result['errors'].items(), key=lambda x: -x[1]):
+        print(f"[리플레이] 오류 {count}회: {message}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="UpbitBot.trade() 오프라인 리플레이")
+    parser.add_argument('--markets', help="쉼표 구분 마켓 (지정 시 DataLoader 분봉 사용, 없으면 가상 데이터)")
+    parser.add_argument('--start', default='2024-01-01')
+    parser.add_argument('--end', default='2024-03-01')
+    parser.add_argument('--synthetic-markets', type=int, default=20)
+    parser.add_argument('--krw', type=float, default=1000000)
+    parser.add_argument('--max-loops', type=int)
+    parser.add_argument('--verbose', action='store_true', help="봇 출력 표시")
+    args = parser.parse_args()
+    if args.markets:
+        from backtest.data_loader import DataLoader
+        loader = DataLoader()
+        data = {m: loader.get_ohlcv(m, args.start, args.end, timeframe="minutes/1") for m in args.markets.split(',')}
+    else:
+        days = (pd.Timestamp(args.end) - pd.Timestamp(args.start)).days
+        data = synthetic_minutes(args.synthetic_markets, days, args.start)
+    result = ReplayEngine(data, krw=args.krw).run(max_loops=args.max_loops, quiet=not args.verbose)
+    print_report(result)
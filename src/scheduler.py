@@ -0,0 +1,189 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# 작업 우선순위 (숫자가 작을수록 높음)
+PRIORITY_HIGH = 0    # 손절/익절 등 보호 매도
+PRIORITY_NORMAL = 1  # 종목 스캔/매수
+PRIORITY_LOW = 2     # 잔고 갱신, 상태 저장 등 정리 작업
+
+# 높은 우선순위 작업이 실행 중이면 낮은 작업 시작을 미루는 최대 시간(초)
+MAX_DEFER = 5.0
+
+
+class Job:
+    """
+    스케줄러 작업 1개
+    - func: 인자 없는 동기 함수, 작업마다 전용 스레드에서 실행 (느린 작업이 다른 작업을 막지 않음)
+    - interval: 실행 주기(초), trigger() 로 주기 전에 바로 실행 가능 (min_gap 초 간격 이상)
+    - 실행 시간이 주기를 넘으면 overrun 으로 기록하고 밀린 회차는 건너뜀 (같은 작업은 겹쳐 실행하지 않음)
+    """
+    def __init__(self, name, func, interval, priority=PRIORITY_NORMAL, min_gap=0.0, run_at_start=True):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.priority = priority
+        self.min_gap = min_gap
+        self.run_at_start = run_at_start
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"job-{name}")
+        self.event = None
+        self.running = False
+        # 통계
+        self.runs = 0
+        self.triggered = 0
+        self.errors = 0
+        self.overruns = 0
+        self.skipped = 0
+        self.deferred = 0.0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.last_time = 0.0
+        self.last_run = None
+
+    def stats(self):
+        return {
+            "interval": self.interval,
+            "priority": self.priority,
+            "runs": self.runs,
+            "triggered": self.triggered,
+            "errors": self.errors,
+            "overruns": self.overruns,
+            "skipped": self.skipped,
+            "avg_time": round(self.total_time / self.runs, 4) if self.runs else 0.0,
+            "max_time": round(self.max_time, 4),
+            "last_time": round(self.last_time, 4),
+            "deferred": round(self.deferred, 3),
+        }
+
+
+class Scheduler:
+    """
+    asyncio 이벤트 루프 기반 작업 스케줄러
+    - 작업별로 주기/우선순위가 따로 있고, 각 작업은 전용 스레드에서 실행
+    - 낮은 우선순위 작업은 높은 우선순위 작업이 실행 중이면 최대 MAX_DEFER 초 늦게 시작
+    - trigger(name) 는 다른 스레드(웹소켓 수신 등)에서 호출해도 됨
+    - stats()/report(): 작업별 실행 횟수, 평균/최대 실행 시간, 주기 초과(overrun), 오류
+    """
+    def __init__(self, report_interval=None):
+        self.jobs = {}
+        self.loop = None
+        self.report_interval = report_interval
+        self._stop = None
+
+    def add(self, name, func, interval, priority=PRIORITY_NORMAL, min_gap=0.0, run_at_start=True):
+        job = Job(name, func, interval, priority, min_gap, run_at_start)
+        self.jobs[name] = job
+        return job
+
+    def trigger(self, name):
+        # 작업을 주기와 상관없이 바로 실행 요청 (스레드 안전)
+        job = self.jobs.get(name)
+        if job is None or self.loop is None or job.event is None:
+            return
+        self.loop.call_soon_threadsafe(job.event.set)
+
+    def _busy_above(self, priority):
+        return any(j.running for j in self.jobs.values() if j.priority < priority)
+
+    async def _execute(self, job):
+        # 높은 우선순위 작업이 실행 중이면 잠시 양보
+        waited = 0.0
+        while self._busy_above(job.priority) and waited < MAX_DEFER:
+            await asyncio.sleep(0.05)
+            waited += 0.05
+        job.deferred += waited
+        job.running = True
+        started = time.monotonic()
+        try:
+            await self.loop.run_in_executor(job.executor, job.func)
+        except Exception as e:
+            job.errors += 1
+            print(f"[스케줄러] {job.name} 오류: {e}")
+        finally:
+            job.running = False
+            elapsed = time.monotonic() - started
+            job.runs += 1
+            job.total_time += elapsed
+            job.max_time = max(job.max_time, elapsed)
+            job.last_time = elapsed
+            job.last_run = time.time()
+            if elapsed > job.interval:
+                job.overruns += 1
+                print(f"[스케줄러] {job.name} 실행 {elapsed:.1f}초 > 주기 {job.interval}초")
+        return started
+
+    async def _job_loop(self, job):
+        job.event = asyncio.Event()
+        next_run = time.monotonic() if job.run_at_start else time.monotonic() + job.interval
+        while not self._stop.is_set():
+            timeout = next_run - time.monotonic()
+            if timeout > 0:
+                try:
+                    await asyncio.wait_for(job.event.wait(), timeout)
+                    job.triggered += 1
+                except asyncio.TimeoutError:
+                    pass
+            job.event.clear()
+            if self._stop.is_set():
+                break
+            started = await self._execute(job)
+            # 다음 실행: 시작 시각 기준 주기, 밀린 회차는 건너뜀
+            now = time.monotonic()
+            next_run = started + job.interval
+            if next_run < now:
+                missed = int((now - next_run) // job.interval) + 1
+                job.skipped += missed
+                next_run += missed * job.interval
+            # 트리거로 바로 다시 실행되더라도 min_gap 은 쉼
+            if job.min_gap:
+                await asyncio.sleep(max(0.0, started + job.min_gap - time.monotonic()))
+
+    async def _report_loop(self):
+        while not self._stop.is_set():
+            try:
+                await asyncio.wait_for(self._stop.wait(), self.report_interval)
+            except asyncio.TimeoutError:
+                self.report()
+
+    async def run(self, duration=None):
+        """
+        등록된 작업 실행 (stop() 또는 duration 초 후 종료)
+        """
+        self.loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        tasks = [asyncio.create_task(self._job_loop(job), name=job.name)
+                 for job in sorted(self.jobs.values(), key=lambda j: j.priority)]
+        if self.report_interval:
+            tasks.append(asyncio.create_task(self._report_loop()))
+        try:
+            if duration is None:
+                await self._stop.wait()
+            else:
+                try:
+                    await asyncio.wait_for(self._stop.wait(), duration)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            # 실행 중인 작업 스레드는 끝까지 돌고, 루프는 기다리지 않고 종료
+            self._stop.set()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for job in self.jobs.values():
+                job.executor.shutdown(wait=False)
+
+    def run_forever(self, duration=None):
+        asyncio.run(self.run(duration))
+
+    def stop(self):
+        # 다른 스레드에서 호출 가능, 실행 중인 작업은 끝날 때까지 기다리지 않음
+        if self.loop is not None and self._stop is not None:
+            self.loop.call_soon_threadsafe(self._stop.set)
+
+    def stats(self):
+        return {name: job.stats() for name, job in self.jobs.items()}
+
+    def report(self):
+        for name, s in self.stats().items():
+            print(f"[스케줄러] {name}: {s['runs']}회 (트리거 {s['triggered']}), 평균 {s['avg_time']:.3f}초, "
+                  f"최대 {s['max_time']:.3f}초, 주기 초과 {s['overruns']}, 건너뜀 {s['skipped']}, 오류 {s['errors']}")
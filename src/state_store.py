@@ -0,0 +1,145 @@
+import json
+import os
+import threading
+
+COIN_STATE_PATH = os.path.join(os.path.dirname(__file__), "coin_states.json")
+COMPACT_EVERY = 200  # 저널 항목이 이만큼 쌓이면 스냅샷으로 합침
+
+
+def default_state():
+    return {
+        "buy_price": None,
+        "bought_volume": 0,
+        "last_trade_time": 0,
+        "trade_count_today": 0,
+        "order_status": "",
+    }
+
+
+def atomic_write_json(path, data, **kwargs):
+    # 임시 파일에 쓰고 fsync 후 rename (쓰는 도중 종료돼도 기존 파일 유지)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, ensure_ascii=False, **kwargs)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _read_snapshot(path):
+    try:
+        with open(path) as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"[상태] 스냅샷 읽기 실패, 빈 상태로 시작: {e}")
+        return {}
+
+
+def _replay_journal(states, journal_path):
+    """
+    저널(JSON lines) 적용, 마지막 줄이 잘려 있으면(쓰는 중 종료) 그 앞까지만 적용
+    반환: (적용한 항목 수, 정상 항목 끝 위치(바이트))
+    """
+    applied = 0
+    good = 0
+    try:
+        with open(journal_path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return 0, 0
+    for line in data.splitlines(keepends=True):
+        try:
+            if not line.endswith(b"\n"):
+                raise ValueError("잘린 항목")
+            entry = json.loads(line)
+        except ValueError:
+            break
+        market = entry["m"]
+        if entry.get("del"):
+            states.pop(market, None)
+        else:
+            states.setdefault(market, default_state()).update(entry["set"])
+        applied += 1
+        good += len(line)
+    return applied, good
+
+
+def load_states(path=COIN_STATE_PATH):
+    # 읽기 전용 로드 (스냅샷 + 저널), 대시보드 등 다른 프로세스용
+    states = _read_snapshot(path)
+    _replay_journal(states, path + ".journal")
+    return states
+
+
+class CoinStateStore:
+    """
+    코인별 상태(coin_states)를 메모리에 두고 변경분만 저널에 추가하는 저장소
+    - coin_states.json: 스냅샷 (임시 파일 + rename 으로 원자적 저장)
+    - coin_states.json.journal: 변경분 JSON lines ({"m": 마켓, "set": {필드: 값}})
+    - 재시작 시 스냅샷 + 저널 재적용으로 복구, 저널이 COMPACT_EVERY 개 쌓이면 스냅샷으로 합침
+    - 저널 항목은 덮어쓰기(set)라 스냅샷 저장 후 저널 비우기 전에 종료돼도 다시 적용해도 같은 결과
+    """
+    def __init__(self, path=COIN_STATE_PATH, compact_every=COMPACT_EVERY):
+        self.path = path
+        self.journal_path = path + ".journal"
+        self.compact_every = compact_every
+        self.lock = threading.RLock()
+        self.states = _read_snapshot(path)
+        self.pending, good = _replay_journal(self.states, self.journal_path)
+        self.journal = open(self.journal_path, "a")
+        # 잘린 마지막 항목은 잘라내고 그 뒤에 이어 쓰기
+        if self.journal.tell() > good:
+            self.journal.truncate(good)
+        if self.pending >= compact_every:
+            self.compact()
+
+    def get(self, market, default=None):
+        return self.states.get(market, default)
+
+    def __contains__(self, market):
+        return market in self.states
+
+    def __getitem__(self, market):
+        return self.states[market]
+
+    def snapshot(self):
+        with self.lock:
+            return json.loads(json.dumps(self.states))
+
+    def _append(self, entry):
+        self.journal.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self.journal.flush()
+        os.fsync(self.journal.fileno())
+        self.pending += 1
+        if self.pending >= self.compact_every:
+            self.compact()
+
+    def update(self, market, **fields):
+        # 한 종목 필드 갱신 (없으면 기본 상태로 생성), 디스크 쓰기는 변경분 1줄
+        with self.lock:
+            state = self.states.setdefault(market, default_state())
+            state.update(fields)
+            self._append({"m": market, "set": fields})
+            return state
+
+    def delete(self, market):
+        with self.lock:
+            if self.states.pop(market, None) is not None:
+                self._append({"m": market, "del": True})
+
+    def compact(self):
+        # 전체 스냅샷 원자적 저장 후 저널 비우기
+        with self.lock:
+            atomic_write_json(self.path, self.states, indent=2)
+            self.journal.close()
+            self.journal = open(self.journal_path, "w")
+            self.pending = 0
+
+    def close(self):
+        with self.lock:
+            if self.pending:
+                self.compact()
+            self.journal.close()
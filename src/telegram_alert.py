@@ -1,20 +1,212 @@
+import atexit
+import collections
+import threading
+import time
+
 import requests
 
+from rate_limiter import TokenBucket
+
+# 우선순위 (숫자가 작을수록 먼저 전송)
+PRIORITY_CRITICAL = 0  # 오류/정지/손절
+PRIORITY_ORDER = 1     # 주문/체결/수익실현
+PRIORITY_INFO = 2      # 매수 생략, 평가금액 등 상태 알림
+
+MAX_MESSAGE_LEN = 4096   # 텔레그램 메시지 최대 길이
+QUEUE_SIZE = 500         # 대기 메시지 최대 개수 (넘으면 낮은 우선순위부터 버림)
+COALESCE_WINDOW = 2.0    # 첫 메시지 후 이 시간(초) 동안 모아서 한 번에 전송 (CRITICAL 은 바로)
+SEND_TIMEOUT = (3, 10)   # 연결, 응답 타임아웃(초)
+SEND_RETRIES = 2         # 전송 실패 시 재시도 횟수
+FLUSH_TIMEOUT = 5.0      # 종료 시 남은 메시지 전송 대기 시간(초)
+
+# 텔레그램 전송 한도: 채팅당 초당 1건, 분당 20건(그룹 기준)
+RATE_PER_SEC = 1
+RATE_PER_MIN = 20
+
+
+def split_message(text, limit=MAX_MESSAGE_LEN):
+    # 길이 제한을 넘는 메시지를 줄 단위(안 되면 글자 단위)로 나눔
+    parts = []
+    while len(text) > limit:
+        cut = text.rfind("\n", 0, limit)
+        if cut <= 0:
+            cut = limit
+        parts.append(text[:cut])
+        text = text[cut:].lstrip("\n")
+    if text:
+        parts.append(text)
+    return parts
+
+
 class TelegramAlert:
-    def __init__(self, token, chat_id):
+    """
+    텔레그램 알림 (비동기 전송)
+    - send() 는 큐에 넣고 바로 반환 (매매 스레드를 막지 않음), 백그라운드 스레드가 전송
+    - COALESCE_WINDOW 동안 쌓인 메시지를 우선순위 순으로 MAX_MESSAGE_LEN 이하 한 메시지로 합침
+    - 전송 한도(초당/분당)는 토큰 버킷으로 지키고, 429 응답이면 retry_after 만큼 쉬고 재시도
+    - 큐가 가득 차면 더 낮은 우선순위의 오래된 메시지를 버림 (없으면 새 메시지를 버림)
+    - 프로세스 종료 시 남은 메시지를 FLUSH_TIMEOUT 까지 전송
+    """
+    def __init__(self, token, chat_id, coalesce_window=COALESCE_WINDOW, queue_size=QUEUE_SIZE):
         self.token = token
         self.chat_id = chat_id
+        self.url = f"https://api.telegram.org/bot{token}/sendMessage"
+        self.coalesce_window = coalesce_window
+        self.queue_size = queue_size
+        self.queues = [collections.deque() for _ in (PRIORITY_CRITICAL, PRIORITY_ORDER, PRIORITY_INFO)]
+        self.cond = threading.Condition()
+        self.buckets = [TokenBucket(RATE_PER_SEC), TokenBucket(RATE_PER_MIN / 60, capacity=RATE_PER_MIN)]
+        self.session = requests.Session()
+        self.worker = None
+        self.sending = False
+        self.flushing = 0
+        self.closed = False
+        # 통계
+        self.queued = 0
+        self.sent = 0
+        self.batches = 0
+        self.dropped = 0
+        self.failed = 0
+        atexit.register(self.close)
 
-    def send(self, message):
-        url = f"https://api.telegram.org/bot{self.token}/sendMessage"
-        data = {"chat_id": self.chat_id, "text": message}
-        try:
-            r = requests.post(url, data=data)
+    def _size(self):
+        return sum(len(q) for q in self.queues)
+
+    def send(self, message, priority=PRIORITY_INFO):
+        # 큐에 넣고 바로 반환, 큐가 가득 차 버려지면 False
+        priority = min(max(int(priority), PRIORITY_CRITICAL), PRIORITY_INFO)
+        with self.cond:
+            if self.closed:
+                return False
+            if self._size() >= self.queue_size:
+                victim = next((q for q in reversed(self.queues[priority + 1:]) if q), None)
+                self.dropped += 1
+                if victim is None:
+                    return False
+                victim.popleft()
+            self.queues[priority].append((time.monotonic(), str(message)))
+            self.queued += 1
+            if self.worker is None:
+                self.worker = threading.Thread(target=self._run, name="telegram-alert", daemon=True)
+                self.worker.start()
+            self.cond.notify()
+        return True
+
+    def _next_batch(self):
+        # 우선순위 순으로 꺼내 길이 제한 안에서 합침 (cond 잠금 상태에서 호출)
+        lines = []
+        length = 0
+        count = 0
+        for q in self.queues:
+            while q:
+                text = q[0][1]
+                if len(text) > MAX_MESSAGE_LEN:
+                    # 긴 메시지는 나눠서 앞부분만 이번에 보내고 나머지는 큐 앞에 둠
+                    head, *rest = split_message(text)
+                    q[0] = (q[0][0], "\n".join(rest))
+                    if lines:
+                        return "\n\n".join(lines), count
+                    return head, count
+                added = len(text) + (2 if lines else 0)
+                if length + added > MAX_MESSAGE_LEN:
+                    return "\n\n".join(lines), count
+                lines.append(text)
+                length += added
+                count += 1
+                q.popleft()
+        return "\n\n".join(lines), count
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self._size() and not self.closed:
+                    self.cond.wait()
+                if not self._size():
+                    return
+                # 첫 메시지 후 잠시 모으기 (CRITICAL 이 있거나 flush/종료 중이면 바로)
+                oldest = min(q[0][0] for q in self.queues if q)
+                deadline = oldest + self.coalesce_window
+                while not (self.queues[PRIORITY_CRITICAL] or self.flushing or self.closed):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.cond.wait(remaining)
+                text, count = self._next_batch()
+                self.sending = True
+            try:
+                if self._post(text):
+                    self.sent += count
+                    self.batches += 1
+                else:
+                    self.failed += count
+            finally:
+                with self.cond:
+                    self.sending = False
+                    self.cond.notify_all()
+
+    def _post(self, text):
+        for attempt in range(SEND_RETRIES + 1):
+            for bucket in self.buckets:
+                bucket.acquire()
+            try:
+                r = self.session.post(self.url, data={"chat_id": self.chat_id, "text": text}, timeout=SEND_TIMEOUT)
+            except requests.RequestException as e:
+                print(f"[텔레그램] 전송 예외 ({attempt + 1}/{SEND_RETRIES + 1}): {e}")
+                time.sleep(2 ** attempt)
+                continue
             if r.status_code == 200:
-                print("[텔레그램] 전송 성공:", r.text)
-            else:
-                print(f"[텔레그램] 전송 실패 (status {r.status_code}):", r.text)
-        except Exception as e:
-            import traceback
-            print("[텔레그램] 전송 예외 발생:", e)
-            traceback.print_exc()
+                return True
+            if r.status_code == 429:
+                try:
+                    retry_after = float(r.json().get("parameters", {}).get("retry_after", 1))
+                except ValueError:
+                    retry_after = 1.0
+                print(f"[텔레그램] 전송 한도 초과, {retry_after:.0f}초 후 재시도")
+                for bucket in self.buckets:
+                    bucket.penalize(retry_after)
+                continue
+            print(f"[텔레그램] 전송 실패 (status {r.status_code}):", r.text[:200])
+            if r.status_code < 500:
+                return False
+        return False
+
+    def flush(self, timeout=None):
+        # 큐가 빌 때까지 대기 (timeout 초 후 포기), 모두 보냈으면 True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.cond:
+            # 모으는 중인 메시지는 기다리지 않고 바로 보내도록 깨움
+            self.flushing += 1
+            self.cond.notify_all()
+            try:
+                while (self._size() or self.sending) and self.worker is not None:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self.cond.wait(remaining)
+                return not self._size()
+            finally:
+                self.flushing -= 1
+
+    def close(self, timeout=FLUSH_TIMEOUT):
+        # 새 메시지 받지 않고 남은 메시지 전송 후 종료
+        with self.cond:
+            if self.closed:
+                return
+            self.closed = True
+            self.cond.notify_all()
+        if self.worker is not None:
+            self.worker.join(timeout)
+            if self.worker.is_alive():
+                print(f"[텔레그램] 종료 시 미전송 {self._size()}건")
+        self.session.close()
+
+    def stats(self):
+        with self.cond:
+            return {
+                "pending": self._size(),
+                "queued": self.queued,
+                "sent": self.sent,
+                "batches": self.batches,
+                "dropped": self.dropped,
+                "failed": self.failed,
+            }
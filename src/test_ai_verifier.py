@@ -0,0 +1,82 @@
+import os
+import tempfile
+import time
+
+from ai_verifier import AIVerifier, StubLLM, price_bucket
+
+BTC_PROMPT = "비트코인 시장 상황을 분석하고 매수 신호가 있는지 한 문장으로 답해줘."
+XRP_PROMPT = "리플의 변동성에 주의해야 할지 한 문장으로 알려줘."
+
+
+def make_verifier(cache_path=None, **kwargs):
+    stub = StubLLM({"리플": "변동성 주의, 관망"})
+    return AIVerifier(None, cache_path=cache_path, llm=stub, **kwargs), stub
+
+
+def test_cache_hits_and_misses():
+    ai, stub = make_verifier()
+    context = {"price": price_bucket(100_000_000)}
+    assert ai.llm_check(BTC_PROMPT, "KRW-BTC", context) == (True, stub.default)
+    assert ai.llm_check(BTC_PROMPT, "KRW-BTC", context)[0]
+    # 같은 가격 구간이면 캐시, 구간이 바뀌면 다시 질문
+    assert ai.llm_check(BTC_PROMPT, "KRW-BTC", {"price": price_bucket(100_100_000)})[0]
+    ai.llm_check(BTC_PROMPT, "KRW-BTC", {"price": price_bucket(103_000_000)})
+    assert ai.llm_check(XRP_PROMPT, "KRW-XRP", context) == (False, "변동성 주의, 관망")
+    stats = ai.stats()
+    assert (stats["hits"], stats["misses"]) == (2, 3)
+    assert stub.calls == 3
+
+
+def test_per_market_ttl_expiry():
+    ai, stub = make_verifier(ttl={"KRW-XRP": 0.2, "default": 60})
+    for _ in range(2):
+        ai.llm_check(BTC_PROMPT, "KRW-BTC")
+        ai.llm_check(XRP_PROMPT, "KRW-XRP")
+    assert stub.calls == 2
+    time.sleep(0.3)
+    ai.llm_check(BTC_PROMPT, "KRW-BTC")
+    assert ai.cached(XRP_PROMPT, "KRW-XRP") is None
+    ai.llm_check(XRP_PROMPT, "KRW-XRP")
+    assert stub.calls == 3  # XRP 만 만료되어 다시 질문
+
+
+def test_warm_reload_from_cache_path():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "ai_cache.json")
+        ai, stub = make_verifier(cache_path=path)
+        ai.llm_check(BTC_PROMPT, "KRW-BTC", {"price": 1})
+        assert os.path.exists(path)
+        # 재시작: 새 인스턴스는 파일에서 읽은 응답 사용 (LLM 호출 없음)
+        reloaded, stub2 = make_verifier(cache_path=path)
+        assert reloaded.cached(BTC_PROMPT, "KRW-BTC", {"price": 1}) == (True, stub.default)
+        assert reloaded.llm_check(BTC_PROMPT, "KRW-BTC", {"price": 1})[0]
+        assert stub2.calls == 0
+        assert reloaded.stats()["hits"] == 1
+
+
+def test_verify_many_falls_back_to_last_verdict():
+    ai, stub = make_verifier()
+    requests = {"KRW-BTC": (BTC_PROMPT, {"price": 1}), "KRW-XRP": (XRP_PROMPT, {"price": 1})}
+    first = ai.verify_many(requests, deadline=5)
+    assert first == {"KRW-BTC": (True, stub.default), "KRW-XRP": (False, "변동성 주의, 관망")}
+    # 시장 상황이 바뀌고 LLM 이 느리면 시간 초과 → 이전 판단 사용
+    stub.delay = 1.0
+    moved = {m: (prompt, {"price": 2}) for m, (prompt, _) in requests.items()}
+    started = time.monotonic()
+    result = ai.verify_many(moved, deadline=0.2)
+    assert time.monotonic() - started < 0.9
+    assert result == first
+    assert ai.stats()["timeouts"] == 2
+    assert ai.stats()["fallbacks"] == 2
+    # 이전 판단이 없는 종목은 매수하지 않음
+    stub.delay = 0.5
+    result = ai.verify_many({"KRW-ETH": ("이더리움", None)}, deadline=0.1)
+    assert result["KRW-ETH"][0] is False
+    ai.close()
+
+
+if __name__ == "__main__":
+    for test in (test_cache_hits_and_misses, test_per_market_ttl_expiry, test_warm_reload_from_cache_path,
+                 test_verify_many_falls_back_to_last_verdict):
+        test()
+        print(f"[테스트] {test.__name__} 통과")
@@ -0,0 +1,168 @@
+import datetime
+import json
+import os
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+import backtest.data_loader as data_loader
+from backtest.data_loader import DataLoader, COLUMNS
+
+
+class FakeCandleServer:
+    """
+    업비트 /v1/candles/{timeframe} 대용 로컬 서버
+    - to(미포함) 이전 캔들을 최신순으로 count 개, listed 이전 캔들은 없음
+    - requests: 받은 요청 (경로, to) 기록
+    """
+    def __init__(self, listed=datetime.datetime(2024, 1, 1)):
+        self.listed = listed
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                to = datetime.datetime.fromisoformat(query['to'][0]).replace(tzinfo=None)
+                server.requests.append((url.path, to))
+                body = json.dumps(server.candles(url.path, to, int(query['count'][0]))).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    @staticmethod
+    def price(t):
+        return 1000.0 + t.hour * 10 + t.minute
+
+    def candles(self, path, to, count):
+        minutes = int(path.rsplit('/', 1)[1])
+        step = datetime.timedelta(minutes=minutes)
+        t = to.replace(second=0, microsecond=0)
+        t -= datetime.timedelta(minutes=t.minute % minutes)
+        if t >= to:
+            t -= step
+        out = []
+        while len(out) < count and t >= self.listed:
+            p = self.price(t)
+            out.append({
+                "candle_date_time_kst": t.strftime('%Y-%m-%dT%H:%M:%S'),
+                "opening_price": p, "high_price": p + 5, "low_price": p - 5, "trade_price": p,
+                "candle_acc_trade_volume": 1.0, "candle_acc_trade_price": p,
+            })
+            t -= step
+        return out
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def check_frame(df, start, end):
+    # start~end(미포함) 1분봉이 빠짐없이 시간순으로 있고 종가가 서버 값과 같은지
+    expected = pd.date_range(start, end, freq='min', inclusive='left')
+    assert list(df.index) == list(expected)
+    assert np.array_equal(df['close'].to_numpy(), [FakeCandleServer.price(t) for t in expected])
+
+
+def test_paging_topup_and_merge():
+    server = FakeCandleServer()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            loader = DataLoader(tmp, base_url=server.url)
+            # 1. 빈 캐시: 1,440개 → 200개씩 8페이지
+            df = loader.get_ohlcv('KRW-BTC', '2024-01-02', '2024-01-02', timeframe='minutes/1')
+            check_frame(df, '2024-01-02', '2024-01-03')
+            assert len(server.requests) == 8
+            # 2. 같은 구간 다시: 요청 없음 (캐시)
+            del server.requests[:]
+            loader.get_ohlcv('KRW-BTC', '2024-01-02', '2024-01-02', timeframe='minutes/1')
+            assert server.requests == []
+            # 3. 뒤로 하루 연장: 뒤쪽 구간만 (마지막 캐시 캔들부터) 조회
+            df = loader.get_ohlcv('KRW-BTC', '2024-01-02', '2024-01-03', timeframe='minutes/1')
+            check_frame(df, '2024-01-02', '2024-01-04')
+            assert all(to > datetime.datetime(2024, 1, 3) for _, to in server.requests)
+            # 4. 앞으로 연장 (상장일 이전 포함): 앞쪽 구간만 조회해 병합
+            del server.requests[:]
+            df = loader.get_ohlcv('KRW-BTC', '2023-12-31', '2024-01-03', timeframe='minutes/1')
+            check_frame(df, '2024-01-01', '2024-01-04')
+            assert all(to <= datetime.datetime(2024, 1, 2) for _, to in server.requests)
+            arrays = loader.load_arrays('KRW-BTC', 'minutes/1')
+            assert {len(a) for a in arrays.values()} == {3 * 1440}
+    finally:
+        server.close()
+
+
+def test_crash_during_save_keeps_previous_cache():
+    server = FakeCandleServer()
+    original = np.save
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            loader = DataLoader(tmp, base_url=server.url)
+            loader.get_ohlcv('KRW-BTC', '2024-01-02', '2024-01-02', timeframe='minutes/60')
+            calls = []
+
+            def failing_save(path, array):
+                calls.append(path)
+                if len(calls) == 3:
+                    raise OSError("디스크 오류 (테스트)")
+                original(path, array)
+
+            data_loader.np.save = failing_save
+            try:
+                loader.get_ohlcv('KRW-BTC', '2024-01-01', '2024-01-03', timeframe='minutes/60')
+            except OSError:
+                pass
+            else:
+                raise AssertionError("저장 실패가 전달되지 않음")
+            finally:
+                data_loader.np.save = original
+            # 이전 캐시(하루치)가 그대로, 모든 컬럼 길이 동일
+            arrays = loader.load_arrays('KRW-BTC', 'minutes/60')
+            assert {len(a) for a in arrays.values()} == {24}
+            # 다시 시도하면 정상 보충
+            df = loader.get_ohlcv('KRW-BTC', '2024-01-01', '2024-01-03', timeframe='minutes/60')
+            assert len(df) == 72
+    finally:
+        data_loader.np.save = original
+        server.close()
+
+
+def test_mismatched_columns_are_discarded():
+    server = FakeCandleServer()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            loader = DataLoader(tmp, base_url=server.url)
+            # 이전 형식(종목 디렉터리 바로 아래) 캐시에서 컬럼 하나가 짧게 남은 경우
+            path = os.path.join(tmp, 'minutes_60', 'KRW-BTC')
+            os.makedirs(path)
+            np.save(os.path.join(path, 'time.npy'), np.arange(5, dtype='int64'))
+            for col in COLUMNS:
+                np.save(os.path.join(path, f'{col}.npy'), np.zeros(3 if col == 'close' else 5))
+            with open(os.path.join(path, 'meta.json'), 'w') as f:
+                json.dump({'start': '2024-01-02 00:00:00', 'end': '2024-01-03 00:00:00'}, f)
+            assert len(loader.load_arrays('KRW-BTC', 'minutes/60')['time']) == 0
+            df = loader.get_ohlcv('KRW-BTC', '2024-01-02', '2024-01-02', timeframe='minutes/60')
+            assert len(df) == 24
+            assert server.requests
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    for test in (test_paging_topup_and_merge, test_crash_during_save_keeps_previous_cache,
+                 test_mismatched_columns_are_discarded):
+        test()
+        print(f"[테스트] {test.__name__} 통과")
@@ -0,0 +1,101 @@
+import email
+import socket
+import time
+
+from aiosmtpd.controller import Controller
+
+from email_alert import EmailAlert
+
+
+class RecordingHandler:
+    # 받은 메일(email.message.Message)과 메일을 보낸 연결(peer 주소) 기록
+    def __init__(self):
+        self.messages = []
+        self.peers = set()
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(email.message_from_bytes(envelope.content))
+        self.peers.add(session.peer)
+        return "250 OK"
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(handler, port):
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    return controller
+
+
+def make_alert(port, **kwargs):
+    # 로컬 aiosmtpd 서버에 평문 연결 (password 없으면 로그인 생략)
+    return EmailAlert("127.0.0.1", port, "bot@example.com", None, "me@example.com", **kwargs)
+
+
+def test_urgent_burst_uses_one_connection():
+    handler = RecordingHandler()
+    port = free_port()
+    server = start_server(handler, port)
+    alert = make_alert(port)
+    try:
+        for i in range(30):
+            alert.send("[치명적 오류]", f"오류 {i}", urgent=True)
+        assert alert.flush(10)
+        assert len(handler.messages) == 30
+        assert len(handler.peers) == 1
+        assert alert.stats()["connects"] == 1
+    finally:
+        alert.close()
+        server.stop()
+
+
+def test_normal_alerts_become_one_digest():
+    handler = RecordingHandler()
+    port = free_port()
+    server = start_server(handler, port)
+    alert = make_alert(port, digest_interval=3600)
+    try:
+        for i in range(10):
+            alert.send("평가금액", f"알림 {i}")
+        time.sleep(0.2)
+        assert handler.messages == []  # 요약 주기 전에는 보내지 않음
+        assert alert.flush(10)
+        assert len(handler.messages) == 1
+        assert alert.stats()["digests"] == 1
+        assert alert.stats()["sent"] == 10
+        body = handler.messages[0].get_payload(decode=True).decode("utf-8")
+        assert all(f"알림 {i}" in body for i in range(10))
+    finally:
+        alert.close()
+        server.stop()
+
+
+def test_reconnects_after_server_restart():
+    handler = RecordingHandler()
+    port = free_port()
+    server = start_server(handler, port)
+    alert = make_alert(port)
+    try:
+        alert.send("재시작 전", "1", urgent=True)
+        assert alert.flush(10)
+        server.stop()
+        server = start_server(handler, port)
+        alert.send("재시작 후", "2", urgent=True)
+        assert alert.flush(10)
+        assert len(handler.messages) == 2
+        assert alert.stats()["connects"] == 2
+        assert alert.stats()["failed"] == 0
+    finally:
+        alert.close()
+        server.stop()
+
+
+if __name__ == "__main__":
+    for test in (test_urgent_burst_uses_one_connection, test_normal_alerts_become_one_digest,
+                 test_reconnects_after_server_restart):
+        test()
+        print(f"[테스트] {test.__name__} 통과")
@@ -0,0 +1,227 @@
+import argparse
+import contextlib
+import csv
+import os
+import sqlite3
+import threading
+
+import pandas as pd
+
+TRADE_DB_PATH = os.path.join(os.path.dirname(__file__), "trades.db")
+TRADE_CSV_PATH = os.path.join(os.path.dirname(__file__), "trade_history.csv")
+
+# 거래내역 필드 (기존 trade_history.csv 컬럼 순서)
+TRADE_FIELDS = ["datetime", "type", "market", "amount", "price", "volume", "result"]
+NUMERIC_FIELDS = ("amount", "price", "volume")
+
+
+class TradeJournal:
+    """
+    SQLite(WAL) 추가 전용 거래 기록 (trade_history.csv 대체)
+    - (datetime), (market, datetime) 인덱스로 기간/종목 조회와 집계를 SQL 에서 처리
+    - append 는 기본 즉시 커밋, with journal.batch(): 안에서는 블록 끝에 한 번만 커밋
+    - WAL 모드라 대시보드/분석 프로세스가 기록 중에도 동시에 읽을 수 있음
+    """
+    def __init__(self, db_path=TRADE_DB_PATH):
+        self.db_path = db_path
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS trades (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                datetime TEXT NOT NULL,
+                type TEXT,
+                market TEXT,
+                amount REAL,
+                price REAL,
+                volume REAL,
+                result TEXT
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_trades_datetime ON trades (datetime)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_trades_market ON trades (market, datetime)")
+        # CSV 이전 기록 (파일별 가져온 행 수)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS migrations (path TEXT PRIMARY KEY, rows INTEGER)")
+        self.conn.commit()
+        self._batch_depth = 0
+
+    @staticmethod
+    def _row(row):
+        values = []
+        for f in TRADE_FIELDS:
+            v = row.get(f)
+            if f in NUMERIC_FIELDS:
+                try:
+                    v = float(v) if v not in (None, "") else None
+                except (TypeError, ValueError):
+                    v = None
+            elif v is not None:
+                v = str(v)
+            values.append(v)
+        return tuple(values)
+
+    def append(self, row):
+        self.append_many([row])
+
+    def append_many(self, rows):
+        rows = [self._row(r) for r in rows]
+        if not rows:
+            return 0
+        with self.lock:
+            self.conn.executemany(
+                f"INSERT INTO trades ({', '.join(TRADE_FIELDS)}) VALUES ({', '.join('?' * len(TRADE_FIELDS))})",
+                rows,
+            )
+            if self._batch_depth == 0:
+                self.conn.commit()
+        return len(rows)
+
+    @contextlib.contextmanager
+    def batch(self):
+        # 블록 안의 append 를 모아 한 번에 커밋
+        with self.lock:
+            self._batch_depth += 1
+            try:
+                yield self
+            except Exception:
+                # 블록 중 오류면 블록 전체 취소
+                if self._batch_depth == 1:
+                    self.conn.rollback()
+                raise
+            finally:
+                self._batch_depth -= 1
+                if self._batch_depth == 0:
+                    self.conn.commit()
+
+    def _where(self, start=None, end=None, market=None, type=None):
+        # start 포함, end 미포함 ('YYYY-MM-DD' 또는 'YYYY-MM-DD HH:MM:SS')
+        clauses, params = [], []
+        if start is not None:
+            clauses.append("datetime >= ?")
+            params.append(str(start))
+        if end is not None:
+            clauses.append("datetime < ?")
+            params.append(str(end))
+        if market is not None:
+            markets = [market] if isinstance(market, str) else list(market)
+            clauses.append(f"market IN ({', '.join('?' * len(markets))})")
+            params.extend(markets)
+        if type is not None:
+            clauses.append("type = ?")
+            params.append(type)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query(self, start=None, end=None, market=None, type=None, columns=None, limit=None):
+        """
+        기간/종목/유형 조건 거래내역 DataFrame (시간순)
+        - columns: 읽을 컬럼 (기본: result 제외 전체)
+        """
+        columns = columns or [f for f in TRADE_FIELDS if f != "result"]
+        where, params = self._where(start, end, market, type)
+        sql = f"SELECT {', '.join(columns)} FROM trades{where} ORDER BY datetime, id"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        with self.lock:
+            return pd.read_sql_query(sql, self.conn, params=params)
+
+    def aggregate(self, by="market", start=None, end=None, market=None):
+        """
+        SQL 집계: by = 'market' | 'day' | 'month'
+        반환 컬럼: trades, buy_amount, sell_amount, profit(매도 금액 - 매수 금액, price × volume 기준)
+        """
+        key = {"market": "market", "day": "substr(datetime, 1, 10)", "month": "substr(datetime, 1, 7)"}[by]
+        where, params = self._where(start, end, market)
+        sql = f"""
+            SELECT {key} AS {by},
+                   COUNT(*) AS trades,
+                   SUM(CASE WHEN type = 'buy' THEN amount ELSE 0 END) AS buy_amount,
+                   SUM(CASE WHEN type = 'sell' THEN amount ELSE 0 END) AS sell_amount,
+                   SUM(CASE WHEN type = 'sell' THEN price * volume ELSE -price * volume END) AS profit
+            FROM trades{where}
+            GROUP BY {key}
+            ORDER BY {key}
+        """
+        with self.lock:
+            return pd.read_sql_query(sql, self.conn, params=params).set_index(by)
+
+    def count(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM trades").fetchone()[0]
+
+    def migrate_csv(self, csv_path=TRADE_CSV_PATH):
+        """
+        trade_history.csv 가져오기 (여러 번 실행해도 이전에 가져온 행 이후만 추가)
+        반환: 새로 가져온 행 수
+        """
+        if not os.path.exists(csv_path):
+            return 0
+        key = os.path.abspath(csv_path)
+        with self.lock:
+            row = self.conn.execute("SELECT rows FROM migrations WHERE path=?", (key,)).fetchone()
+            done = row[0] if row else 0
+            added = 0
+            with self.batch(), open(csv_path, newline='') as f:
+                chunk = []
+                for i, r in enumerate(csv.DictReader(f)):
+                    if i < done:
+                        continue
+                    chunk.append(r)
+                    if len(chunk) >= 10000:
+                        added += self.append_many(chunk)
+                        chunk = []
+                added += self.append_many(chunk)
+                self.conn.execute("INSERT OR REPLACE INTO migrations (path, rows) VALUES (?, ?)", (key, done + added))
+        return added
+
+    def export_csv(self, path, start=None, end=None, market=None):
+        # 기존 trade_history.csv 형식으로 내보내기 (result 포함)
+        frame = self.query(start, end, market, columns=TRADE_FIELDS)
+        frame.to_csv(path, index=False)
+        return len(frame)
+
+    def close(self):
+        with self.lock:
+            self.conn.commit()
+            self.conn.close()
+
+
+_default_journal = None
+_default_lock = threading.Lock()
+
+
+def get_default_journal():
+    # 프로세스 공용 거래 기록 (src/trades.db), 처음 열 때 기존 trade_history.csv 의 새 행을 가져옴
+    global _default_journal
+    with _default_lock:
+        if _default_journal is None:
+            _default_journal = TradeJournal()
+            added = _default_journal.migrate_csv()
+            if added:
+                print(f"[거래기록] trade_history.csv {added}건 가져옴")
+        return _default_journal
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="거래 기록(trades.db) 관리")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("migrate", help="CSV 가져오기")
+    p.add_argument("csv", nargs="?", default=TRADE_CSV_PATH)
+    p = sub.add_parser("export", help="CSV 내보내기")
+    p.add_argument("csv")
+    for p in (p, sub.add_parser("summary", help="집계")):
+        p.add_argument("--start")
+        p.add_argument("--end")
+        p.add_argument("--market")
+    p.add_argument("--by", choices=["market", "day", "month"], default="market")
+    args = parser.parse_args()
+
+    journal = TradeJournal()
+    if args.command == "migrate":
+        print(f"[거래기록] {journal.migrate_csv(args.csv)}건 가져옴 (전체 {journal.count()}건)")
+    elif args.command == "export":
+        print(f"[거래기록] {journal.export_csv(args.csv, args.start, args.end, args.market)}건 내보냄")
+    else:
+        print(journal.aggregate(args.by, args.start, args.end, args.market))
+    journal.close()
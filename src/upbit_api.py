@@ -1,18 +1,24 @@
 import hashlib
-import requests
 import jwt
 import uuid
 import time
 import os
-from urllib.parse import urlencode
+from urllib.parse import urlencode, unquote
 
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
+
+import http_client
+
+# 현재가 일괄 조회 시 요청 1회당 종목 수
+TICKER_CHUNK_SIZE = 100
+# 주문 uuid 일괄 조회 시 요청 1회당 주문 수
+ORDER_UUIDS_CHUNK_SIZE = 100
 
 class UpbitAPI:
     def __init__(self, access_key: str, secret_key: str) -> None:
         self.access_key = access_key
         self.secret_key = secret_key
-        self.server_url = "https://api.upbit.com"
+        self.server_url = http_client.UPBIT_API_URL
 
     def _get_headers(self, query: Optional[str] = None) -> Dict[str, str]:
         payload: Dict[str, Any] = {
@@ -33,14 +39,60 @@ class UpbitAPI:
     def get_balance(self) -> Any:
         url = self.server_url + "/v1/accounts"
         headers = self._get_headers()
-        res = requests.get(url, headers=headers)
+        res = http_client.get(url, headers=headers, group="exchange")
         return res.json()
 
     def get_ticker(self, market: str) -> Any:
         url = self.server_url + f"/v1/ticker?markets={market}"
-        res = requests.get(url)
+        res = http_client.get(url, group="quotation")
         return res.json()[0]
 
+    def get_tickers(self, markets: List[str]) -> Dict[str, Any]:
+        """
+        여러 종목 현재가 일괄 조회 (TICKER_CHUNK_SIZE 개씩 나눠 요청)
+        - 업비트는 요청에 상장되지 않은(상장 폐지 등) 종목이 하나라도 있으면 전체를 거절하므로,
+          거절되면 상장 종목만 남겨 한 번 더 요청 (제외한 종목은 결과에 없음)
+        반환: {market: ticker}
+        """
+        markets = list(dict.fromkeys(markets))
+        result: Dict[str, Any] = {}
+        for i in range(0, len(markets), TICKER_CHUNK_SIZE):
+            chunk = markets[i:i + TICKER_CHUNK_SIZE]
+            data = self._request_tickers(chunk)
+            if not isinstance(data, list):
+                listed = self.get_markets()
+                known = [m for m in chunk if m in listed]
+                if len(known) == len(chunk):
+                    raise RuntimeError(f"시세 조회 실패: {data}")
+                print(f"[시세] 상장되지 않은 종목 제외: {', '.join(m for m in chunk if m not in listed)}")
+                data = self._request_tickers(known) if known else []
+                if not isinstance(data, list):
+                    raise RuntimeError(f"시세 조회 실패: {data}")
+            for ticker in data:
+                result[ticker["market"]] = ticker
+        return result
+
+    def _request_tickers(self, markets: List[str]) -> Any:
+        res = http_client.get(self.server_url + "/v1/ticker", params={"markets": ",".join(markets)}, group="quotation")
+        return res.json()
+
+    def get_markets(self) -> set:
+        # 상장된 전체 마켓 코드 (KRW/BTC/USDT 마켓 포함)
+        res = http_client.get(self.server_url + "/v1/market/all", group="quotation")
+        data = res.json()
+        if not isinstance(data, list):
+            raise RuntimeError(f"마켓 조회 실패: {data}")
+        return {m["market"] for m in data}
+
+    def get_all_tickers(self, quote: str = "KRW") -> Dict[str, Any]:
+        # 마켓 전체 현재가 스냅샷 (요청 1회)
+        url = self.server_url + "/v1/ticker/all"
+        res = http_client.get(url, params={"quote_currencies": quote}, group="quotation")
+        data = res.json()
+        if not isinstance(data, list):
+            raise RuntimeError(f"시세 조회 실패: {data}")
+        return {ticker["market"]: ticker for ticker in data}
+
     def buy_market_order(self, market: str, amount: float) -> Any:
         url = self.server_url + "/v1/orders"
         params = {
@@ -51,7 +103,7 @@ class UpbitAPI:
         }
         query = urlencode(params)
         headers = self._get_headers(query)
-        res = requests.post(url, params=params, headers=headers)
+        res = http_client.post(url, params=params, headers=headers, group="order")
         return res.json()
 
     def sell_market_order(self, market: str, volume: float) -> Any:
@@ -64,5 +116,40 @@ class UpbitAPI:
         }
         query = urlencode(params)
         headers = self._get_headers(query)
-        res = requests.post(url, params=params, headers=headers)
+        res = http_client.post(url, params=params, headers=headers, group="order")
         return res.json()
+
+    def _private_get(self, path: str, params: Dict[str, Any]) -> Any:
+        # 인증 GET (배열 파라미터는 key[]=v1&key[]=v2, 서명한 쿼리 문자열 그대로 요청)
+        query = unquote(urlencode(params, doseq=True))
+        headers = self._get_headers(query)
+        res = http_client.get(f"{self.server_url}{path}?{query}", headers=headers, group="exchange")
+        return res.json()
+
+    def get_order(self, uuid: str) -> Any:
+        # 개별 주문 조회 (체결 내역 trades 포함)
+        return self._private_get("/v1/order", {"uuid": uuid})
+
+    def get_orders_by_uuids(self, uuids: List[str]) -> List[Any]:
+        """
+        여러 주문 일괄 조회 (ORDER_UUIDS_CHUNK_SIZE 개씩 나눠 요청, 체결 내역 trades 는 없음)
+        반환: 주문 목록 (찾은 주문만)
+        """
+        uuids = list(dict.fromkeys(uuids))
+        orders: List[Any] = []
+        for i in range(0, len(uuids), ORDER_UUIDS_CHUNK_SIZE):
+            data = self._private_get("/v1/orders/uuids", {"uuids[]": uuids[i:i + ORDER_UUIDS_CHUNK_SIZE]})
+            if not isinstance(data, list):
+                raise RuntimeError(f"주문 조회 실패: {data}")
+            orders.extend(data)
+        return orders
+
+    def get_open_orders(self, market: Optional[str] = None, states: List[str] = ("wait", "watch")) -> List[Any]:
+        # 미체결 주문 목록
+        params: Dict[str, Any] = {"states[]": list(states)}
+        if market:
+            params["market"] = market
+        data = self._private_get("/v1/orders/open", params)
+        if not isinstance(data, list):
+            raise RuntimeError(f"주문 조회 실패: {data}")
+        return data
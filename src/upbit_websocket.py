@@ -0,0 +1,163 @@
+import asyncio
+import json
+import os
+import threading
+import time
+import uuid
+
+import websockets
+
+UPBIT_WS_URL = os.getenv("UPBIT_WS_URL", "wss://api.upbit.com/websocket/v1")
+# 실시간 시세를 신뢰하는 최대 경과 시간(초), 초과 시 REST 시세로 대체
+PRICE_MAX_AGE = 10
+
+
+class UpbitWebSocketFeed:
+    """
+    업비트 실시간 시세(WebSocket) 수신기
+    - 별도 스레드의 이벤트 루프에서 ticker/trade/orderbook 스트림 구독
+    - 종목별 최신 시세를 메모리 테이블에 유지 (get_price/get_ticker 로 조회)
+    - 연결이 끊기면 지수 백오프로 재연결 후 전체 종목 재구독
+    - url 에 로컬 테스트 서버(ws://127.0.0.1:포트) 지정 가능
+    - add_listener(callback): 시세(ticker/trade) 수신 때마다 수신 스레드에서 callback(market, price) 호출
+    """
+    def __init__(self, markets=(), url=UPBIT_WS_URL, types=("ticker",), reconnect_delay=1.0, max_reconnect_delay=30.0):
+        self.url = url
+        self.types = tuple(types)
+        self.markets = set(markets)
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.tickers = {}     # market -> 최신 ticker (REST ticker 와 같은 키 + received_at)
+        self.orderbooks = {}  # market -> 최신 orderbook
+        self.lock = threading.Lock()
+        self.connected = threading.Event()
+        self.reconnects = 0
+        self.listeners = []
+        self._stop = threading.Event()
+        self._loop = None
+        self._ws = None
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._thread_main, name="upbit-ws", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        if self._loop and self._ws is not None:
+            asyncio.run_coroutine_threadsafe(self._ws.close(), self._loop)
+        if self._thread:
+            self._thread.join(timeout)
+
+    def subscribe(self, markets):
+        # 구독 종목 추가 (연결 중이면 즉시 재구독)
+        with self.lock:
+            new = set(markets) - self.markets
+            if not new:
+                return
+            self.markets |= new
+        if self._loop and self._ws is not None:
+            asyncio.run_coroutine_threadsafe(self._send_subscription(self._ws), self._loop)
+
+    def add_listener(self, callback):
+        # callback 은 빨리 끝나야 함 (수신 스레드를 막지 않도록 이벤트 전달 정도만)
+        self.listeners.append(callback)
+
+    def get_ticker(self, market, max_age=None):
+        # 최신 ticker (max_age 초보다 오래되었거나 없으면 None)
+        with self.lock:
+            ticker = self.tickers.get(market)
+        if ticker is None:
+            return None
+        if max_age is not None and time.time() - ticker["received_at"] > max_age:
+            return None
+        return ticker
+
+    def get_price(self, market, max_age=None):
+        ticker = self.get_ticker(market, max_age)
+        return ticker["trade_price"] if ticker else None
+
+    def snapshot(self):
+        with self.lock:
+            return {m: t["trade_price"] for m, t in self.tickers.items()}
+
+    def _thread_main(self):
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._loop.run_until_complete(self._run())
+        finally:
+            self._loop.close()
+
+    async def _run(self):
+        delay = self.reconnect_delay
+        while not self._stop.is_set():
+            try:
+                async with websockets.connect(self.url, ping_interval=20, max_size=None) as ws:
+                    self._ws = ws
+                    await self._send_subscription(ws)
+                    self.connected.set()
+                    delay = self.reconnect_delay
+                    async for message in ws:
+                        self._handle(message)
+            except (OSError, asyncio.TimeoutError, websockets.WebSocketException) as e:
+                if not self._stop.is_set():
+                    print(f"[웹소켓] 연결 끊김: {e}")
+            finally:
+                self._ws = None
+                self.connected.clear()
+            if self._stop.is_set():
+                break
+            self.reconnects += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def _send_subscription(self, ws):
+        # subscribe() 가 다른 스레드에서 종목을 추가하므로 잠금 상태에서 복사 후 전송
+        with self.lock:
+            codes = sorted(self.markets)
+        if not codes:
+            return
+        request = [{"ticket": str(uuid.uuid4())}]
+        request += [{"type": t, "codes": codes} for t in self.types]
+        request.append({"format": "DEFAULT"})
+        await ws.send(json.dumps(request))
+
+    def _handle(self, message):
+        try:
+            data = json.loads(message)
+        except ValueError:
+            return
+        market = data.get("code")
+        msg_type = data.get("type")
+        if not market:
+            return
+        now = time.time()
+        price = None
+        with self.lock:
+            if msg_type == "ticker":
+                ticker = dict(data)
+                ticker["market"] = market
+                ticker["received_at"] = now
+                self.tickers[market] = ticker
+                price = ticker.get("trade_price")
+            elif msg_type == "trade":
+                ticker = dict(self.tickers.get(market, {"market": market}))
+                ticker["trade_price"] = data.get("trade_price")
+                ticker["trade_timestamp"] = data.get("trade_timestamp")
+                ticker["received_at"] = now
+                self.tickers[market] = ticker
+                price = ticker["trade_price"]
+            elif msg_type == "orderbook":
+                orderbook = dict(data)
+                orderbook["received_at"] = now
+                self.orderbooks[market] = orderbook
+        if price is not None:
+            for callback in self.listeners:
+                try:
+                    callback(market, price)
+                except Exception as e:
+                    print(f"[웹소켓] 리스너 오류: {e}")
@@ -0,0 +1,193 @@
+import hashlib
+import inspect
+import json
+import os
+import sys
+
+import numpy as np
+
+import auto_optimizer
+import backtest.features
+import backtest.metrics
+import backtest.simulator
+from backtest.simulator import MarketArrays
+from auto_optimizer import prepare_strategy, evaluate_params, evaluate_tasks_parallel, print_progress
+
+WALK_FORWARD_CACHE_PATH = os.path.join(os.path.dirname(__file__), "data", "walk_forward_cache.json")
+
+
+def make_windows(dates, train_size, test_size, step=None):
+    """
+    롤링 학습/검증 구간 분할 (rebalance_dates 인덱스 기준)
+    - train_size, test_size: 구간 길이(날짜 개수), step: 이동 간격 (기본: test_size)
+    반환: [(train_lo, train_hi, test_lo, test_hi), ...] (hi 미포함)
+    """
+    step = step or test_size
+    windows = []
+    lo = 0
+    while lo + train_size + test_size <= len(dates):
+        windows.append((lo, lo + train_size, lo + train_size, lo + train_size + test_size))
+        lo += step
+    return windows
+
+
+def data_fingerprint(data_dict):
+    # 종목 목록/데이터 크기/날짜·종가 해시 (캔들이 바뀌거나 종목 구성이 달라지면 캐시 키가 바뀜)
+    h = hashlib.sha1()
+    for market in sorted(data_dict):
+        df = data_dict[market]
+        h.update(f"{market}:{df.shape}".encode())
+        h.update(np.ascontiguousarray(df.index.asi8 if hasattr(df.index, 'asi8') else df.index.astype(str)).tobytes())
+        h.update(np.ascontiguousarray(df['close'].to_numpy(dtype=float)).tobytes())
+    return h.hexdigest()[:16]
+
+
+# 결과에 영향을 주는 백테스트 엔진 모듈 (소스가 바뀌면 캐시 무효화)
+ENGINE_MODULES = (backtest.simulator, backtest.features, backtest.metrics, auto_optimizer)
+
+
+def _source(obj):
+    # 소스 코드 (없으면 바이트코드/repr)
+    try:
+        return inspect.getsource(obj).encode()
+    except (OSError, TypeError):
+        func = getattr(obj, '__code__', None)
+        return func.co_code + repr(func.co_consts).encode() if func is not None else repr(obj).encode()
+
+
+def strategy_fingerprint(strategy_fn):
+    """
+    전략/엔진 코드 해시
+    - 전략 함수가 정의된 모듈 전체(같은 모듈의 보조 함수 포함)와 ENGINE_MODULES 소스
+    - 다른 모듈의 보조 함수/데이터에 의존하는 전략은 그 코드가 바뀔 때 strategy_fn.version 을 올려야 함
+    """
+    h = hashlib.sha1()
+    module = sys.modules.get(getattr(strategy_fn, '__module__', None) or '')
+    for obj in (module or strategy_fn,) + ENGINE_MODULES:
+        h.update(_source(obj))
+    h.update(f"\nversion={getattr(strategy_fn, 'version', '')}".encode())
+    return h.hexdigest()[:16]
+
+
+class WalkForwardCache:
+    """
+    (전략, 구간, 파라미터) → 수익률 메모 (json 파일로 저장해 재실행 시 재사용)
+    - 같은 구간이 다른 창에서 다시 나오거나 재실행하면 시뮬레이션 생략
+    - 키에 데이터 지문(data_fingerprint)과 코드 지문(strategy_fingerprint)이 들어가므로 캔들/종목 구성,
+      전략 모듈, 백테스트 엔진(ENGINE_MODULES) 코드가 바뀌면 예전 결과를 쓰지 않음
+    - 그 밖의 모듈에 있는 코드가 바뀐 경우는 감지하지 못하므로 strategy_fn.version 을 올리거나 파일 삭제
+    """
+    def __init__(self, path=WALK_FORWARD_CACHE_PATH):
+        self.path = path
+        self.results = {}
+        self.hits = 0
+        self.misses = 0
+        if path and os.path.exists(path):
+            try:
+                with open(path) as f:
+                    self.results = json.load(f)
+            except (OSError, ValueError):
+                self.results = {}
+
+    @staticmethod
+    def key(strategy_name, dates, params, data_fp="", code_fp=""):
+        return json.dumps([strategy_name, code_fp, data_fp, str(dates[0]), str(dates[-1]), len(dates),
+                           sorted(params.items())])
+
+    def get(self, key):
+        if key in self.results:
+            self.hits += 1
+            return self.results[key]
+        self.misses += 1
+        return None
+
+    def put(self, key, ret):
+        self.results[key] = ret
+
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.results, f)
+        os.replace(tmp, self.path)
+
+
+def _evaluate(strategy_fn, data_dict, rebalance_dates, tasks, cache, workers, progress):
+    # (파라미터, lo, hi) 작업 수익률 리스트, 캐시에 없는 작업만 (병렬) 시뮬레이션
+    name = getattr(strategy_fn, '__name__', repr(strategy_fn))
+    data_fp = data_fingerprint(data_dict)
+    code_fp = strategy_fingerprint(strategy_fn)
+    keys = [cache.key(name, rebalance_dates[lo:hi], params, data_fp, code_fp) for params, lo, hi in tasks]
+    rets = [cache.get(k) for k in keys]
+    todo = [i for i, r in enumerate(rets) if r is None]
+    # 같은 키는 한 번만 계산
+    unique = {}
+    for i in todo:
+        unique.setdefault(keys[i], i)
+    pending = [tasks[i] for i in unique.values()]
+    if pending:
+        if workers > 1 and len(pending) > 1:
+            results = evaluate_tasks_parallel(strategy_fn, data_dict, rebalance_dates, pending, workers, progress)
+        else:
+            prepared = prepare_strategy(strategy_fn, data_dict)
+            arrays = MarketArrays(data_dict, rebalance_dates)
+            results = []
+            for done, (params, lo, hi) in enumerate(pending, 1):
+                ret, _ = evaluate_params(prepared, data_dict, rebalance_dates[lo:hi], params, arrays)
+                results.append(ret)
+                if progress:
+                    progress(done, len(pending))
+        for key, ret in zip(unique, results):
+            cache.put(key, ret)
+    return [cache.results[k] for k in keys]
+
+
+def walk_forward(strategy_fn, data_dict, rebalance_dates, param_grid, train_size=365, test_size=90, step=None,
+                 workers=1, cache=None, progress=print_progress):
+    """
+    워크포워드 최적화: 학습 구간에서 param_grid 최적화 → 바로 뒤 검증 구간에서 표본 외 평가
+    - 모든 창의 학습 평가를 한 번에 (병렬) 실행한 뒤, 창별 최적 조합의 검증 평가를 한 번에 실행
+    - cache: WalkForwardCache (기본: 파일 캐시), 창/파라미터별 결과 재사용
+    반환: (창별 결과 리스트, 표본 외 누적 수익률)
+    """
+    rebalance_dates = list(rebalance_dates)
+    cache = cache if cache is not None else WalkForwardCache()
+    windows = make_windows(rebalance_dates, train_size, test_size, step)
+    if not windows:
+        print(f"[워크포워드] 기간 부족: {len(rebalance_dates)}일 < 학습 {train_size}일 + 검증 {test_size}일")
+        return [], 0.0
+
+    # 1. 창별 학습 구간 최적화 (순서/동률 처리는 auto_optimize 와 동일)
+    train_tasks = [(params, tr_lo, tr_hi) for tr_lo, tr_hi, _, _ in windows for params in param_grid]
+    train_rets = _evaluate(strategy_fn, data_dict, rebalance_dates, train_tasks, cache, workers, progress)
+    best = []
+    for w in range(len(windows)):
+        rets = train_rets[w * len(param_grid):(w + 1) * len(param_grid)]
+        k = max(range(len(rets)), key=lambda i: (rets[i], -i))
+        best.append((param_grid[k], rets[k]))
+
+    # 2. 검증 구간 표본 외 평가
+    test_tasks = [(params, te_lo, te_hi) for (_, _, te_lo, te_hi), (params, _) in zip(windows, best)]
+    test_rets = _evaluate(strategy_fn, data_dict, rebalance_dates, test_tasks, cache, workers, None)
+    cache.save()
+
+    results = []
+    equity = 1.0
+    for (tr_lo, tr_hi, te_lo, te_hi), (params, train_ret), test_ret in zip(windows, best, test_rets):
+        equity *= 1 + test_ret
+        results.append({
+            'train_start': rebalance_dates[tr_lo],
+            'train_end': rebalance_dates[tr_hi - 1],
+            'test_start': rebalance_dates[te_lo],
+            'test_end': rebalance_dates[te_hi - 1],
+            'best_param': params,
+            'train_return': train_ret,
+            'test_return': test_ret,
+        })
+        print(f"[워크포워드] {rebalance_dates[te_lo]:%Y-%m-%d}~{rebalance_dates[te_hi - 1]:%Y-%m-%d} "
+              f"{params} 학습 {train_ret:.2%} / 검증 {test_ret:.2%}")
+    print(f"[워크포워드] 창 {len(windows)}개, 표본 외 누적 수익률: {equity - 1:.2%} "
+          f"(캐시 적중 {cache.hits}, 계산 {cache.misses})")
+    return results, equity - 1